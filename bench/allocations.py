@@ -0,0 +1,98 @@
+"""
+Measures the memory allocated while a single check is made.
+
+For each scenario the check is warmed up and then made once with tracemalloc
+running, reporting the peak number of bytes allocated during the check and
+the number of bytes still allocated once it returns::
+
+    python bench/allocations.py
+
+Peak allocations shouldn't grow with the number of requirements in a check or
+the width of conditional requirements while the override and additional
+contexts are empty, and nothing should be retained once a check finishes.
+"""
+
+import sys
+import tracemalloc
+from collections import namedtuple
+
+from flask import Flask
+
+from flask_allows import Allows, And, Or, Requirement
+
+User = namedtuple("User", ["id", "permlevel"])
+
+
+def is_member(user):
+    return user.permlevel >= 0
+
+
+def is_admin(user):
+    return user.permlevel >= 2
+
+
+class IsMember(Requirement):
+    def fulfill(self, user):
+        return user.permlevel >= 0
+
+
+#: name, requirements, override, additional
+SCENARIOS = [
+    ("function", [is_member], None, None),
+    ("10 functions", [is_member] * 10, None, None),
+    ("requirement", [IsMember()], None, None),
+    ("10 requirements", [IsMember()] * 10, None, None),
+    ("Or of 2", [Or(is_admin, is_member)], None, None),
+    ("Or of 20", [Or(*([is_admin] * 19 + [is_member]))], None, None),
+    ("And depth 5", [And(And(And(And(And(is_member)))))], None, None),
+    ("override", [is_admin, is_member], is_admin, None),
+    ("additional", [is_member], None, is_member),
+]
+
+
+def measure(check, warmup=100):
+    """
+    Returns the peak bytes allocated while calling ``check`` once and the
+    bytes still allocated after it returns.
+    """
+    for _ in range(warmup):
+        check()
+
+    tracemalloc.start()
+    try:
+        check()
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        check()
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return peak - before, after - before
+
+
+def main():
+    app = Flask(__name__)
+    user = User(1, 0)
+    allows = Allows(app, identity_loader=lambda: user)
+
+    print("{:<20} {:>10} {:>10}".format("scenario", "peak B", "retained B"))
+
+    for name, requirements, override, additional in SCENARIOS:
+        with app.test_request_context("/"):
+            app.preprocess_request()
+
+            if override is not None:
+                allows.overrides.current.add(override)
+            if additional is not None:
+                allows.additional.current.add(additional)
+
+            peak, retained = measure(lambda: allows.fulfill(requirements))
+
+        print("{:<20} {:>10} {:>10}".format(name, peak, retained))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
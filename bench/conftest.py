@@ -0,0 +1,66 @@
+from collections import namedtuple
+
+import pytest
+from flask import Flask
+
+from flask_allows import Allows, And, Or
+from flask_allows.additional import _additional_ctx_stack
+from flask_allows.overrides import _override_ctx_stack
+
+User = namedtuple("User", ["id", "name", "permlevel"])
+
+
+def is_member(user):
+    return user.permlevel >= 0
+
+
+def is_admin(user):
+    return user.permlevel >= 2
+
+
+def legacy_is_member(user, request):
+    return user.permlevel >= 0
+
+
+def deep_tree(depth):
+    "A chain of ``depth`` nested conjunctions that are all fulfilled"
+    tree = is_member
+    for _ in range(depth):
+        tree = And(tree, is_member)
+    return tree
+
+
+def wide_tree(width):
+    "A disjunction of ``width`` requirements where only the last is fulfilled"
+    return Or(*([is_admin] * (width - 1) + [is_member]))
+
+
+@pytest.fixture
+def member():
+    return User(1, "member", 0)
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+@pytest.fixture
+def allows(app, member):
+    return Allows(app, identity_loader=lambda: member)
+
+
+@pytest.fixture
+def ctx(app, allows):
+    with app.test_request_context("/"):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def pop_til_you_stop():
+    yield
+    while _override_ctx_stack.top is not None:
+        _override_ctx_stack.pop()
+
+    while _additional_ctx_stack.top is not None:
+        _additional_ctx_stack.pop()
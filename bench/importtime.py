@@ -0,0 +1,63 @@
+"""
+Reports how long importing parts of Flask-Allows takes, as measured by
+``python -X importtime`` in fresh interpreters::
+
+    python bench/importtime.py
+    python bench/importtime.py --runs 20
+
+Each statement is run several times and the fastest total is reported, along
+with the share of it spent importing Flask-Allows' own modules.
+"""
+
+import argparse
+import subprocess
+import sys
+
+STATEMENTS = [
+    "import flask_allows",
+    "from flask_allows import Requirement",
+    "from flask_allows import Permission",
+    "from flask_allows import Allows, requires",
+    "import flask_allows.metrics",
+]
+
+
+def measure(statement):
+    """
+    Returns the total and Flask-Allows only import time of the statement in
+    microseconds.
+    """
+    output = subprocess.check_output(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        stderr=subprocess.STDOUT,
+        universal_newlines=True,
+    )
+
+    total = own = 0
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, cumulative, name = line[len("import time:") :].split("|")
+        if not name.startswith("  "):
+            total += int(cumulative)
+        if name.strip().startswith("flask_allows"):
+            own += int(self_time)
+
+    return total, own
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print("{:<45} {:>10} {:>14}".format("statement", "total ms", "flask_allows ms"))
+    for statement in STATEMENTS:
+        total, own = min(measure(statement) for _ in range(args.runs))
+        print("{:<45} {:>10.2f} {:>14.2f}".format(statement, total / 1e3, own / 1e3))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
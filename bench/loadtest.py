@@ -0,0 +1,322 @@
+"""
+Multi-threaded load test of authorization in a sample application.
+
+Drives a small application protected by ``requires``, ``guard_entire`` and
+``Permission`` with many concurrent threads and reports requests per second
+and latency percentiles for each scenario. Everything runs locally, either
+through the Flask test client or a local threaded WSGI server::
+
+    python bench/loadtest.py
+    python bench/loadtest.py --threads 32 --requests 500 --server
+    python bench/loadtest.py --scenario off --scenario requires
+
+The ``contexts`` scenario pushes a per request override and additional
+context, yields to other threads and then verifies it still sees only its own
+contexts. Requests that observe another request's contexts are reported as
+leaks and make the script exit with a non-zero status.
+"""
+
+import argparse
+import logging
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+
+from flask import Blueprint, Flask, request
+
+from flask_allows import (
+    Additional,
+    Allows,
+    Override,
+    Permission,
+    Requirement,
+    guard_entire,
+    requires,
+)
+
+User = namedtuple("User", ["id", "permlevel"])
+
+
+def is_member(user):
+    return user.permlevel >= 0
+
+
+def is_active(user):
+    return user.id > 0
+
+
+class Marker(Requirement):
+    "Requirement used to tag the contexts of a single request"
+
+    def __init__(self, n):
+        self.n = n
+
+    def fulfill(self, user):
+        return True
+
+    def __eq__(self, other):
+        return isinstance(other, Marker) and self.n == other.n
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.n)
+
+
+def load_user():
+    user_id = int(request.headers.get("X-User-Id", 1))
+    # every tenth user is a guest so that a share of checks are denied
+    return User(user_id, -1 if user_id % 10 == 0 else 0)
+
+
+def _open_app(app, allows):
+    @app.route("/")
+    def index():
+        return "ok"
+
+
+def _requires_app(app, allows):
+    @app.route("/")
+    @requires(is_member, is_active)
+    def index():
+        return "ok"
+
+
+def _guard_entire_app(app, allows):
+    bp = Blueprint("guarded", __name__)
+    bp.before_request(guard_entire([is_member, is_active]))
+
+    @bp.route("/")
+    def index():
+        return "ok"
+
+    app.register_blueprint(bp)
+
+
+def _permission_app(cache):
+    def setup(app, allows):
+        @app.route("/")
+        def index():
+            # mimics a template checking the same permission several times
+            allowed = [
+                bool(Permission(is_member, is_active, cache=cache)) for _ in range(5)
+            ]
+            return "ok" if all(allowed) else ("denied", 403)
+
+    return setup
+
+
+def _contexts_app(app, allows):
+    @app.route("/")
+    def index():
+        n = int(request.headers["X-Request-Id"])
+        if allows.overrides.current != Override():
+            return "leak", 500
+        if allows.additional.current != Additional():
+            return "leak", 500
+
+        allows.overrides.current.add(Marker(n))
+        allows.additional.current.add(Marker(n))
+        # give other threads the chance to interfere
+        time.sleep(0)
+
+        if allows.overrides.current != Override(Marker(n)):
+            return "leak", 500
+        if allows.additional.current != Additional(Marker(n)):
+            return "leak", 500
+        if not allows.fulfill([Marker(n)]):
+            return "leak", 500
+        return "ok"
+
+
+#: Maps scenario names to functions that add the ``/`` route to an app
+SCENARIOS = {
+    "off": _open_app,
+    "requires": _requires_app,
+    "guard_entire": _guard_entire_app,
+    "permission": _permission_app(cache=False),
+    "permission-cached": _permission_app(cache=True),
+    "contexts": _contexts_app,
+}
+
+
+def make_app(scenario):
+    app = Flask(__name__)
+    allows = Allows(app, identity_loader=load_user)
+    SCENARIOS[scenario](app, allows)
+    return app
+
+
+class Result(object):
+    def __init__(self, scenario, elapsed, latencies, statuses):
+        self.scenario = scenario
+        self.elapsed = elapsed
+        self.latencies = sorted(latencies)
+        self.statuses = statuses
+
+    @property
+    def throughput(self):
+        return len(self.latencies) / self.elapsed
+
+    @property
+    def leaks(self):
+        return self.statuses.get(500, 0)
+
+    def percentile(self, p):
+        index = int(round(p / 100.0 * (len(self.latencies) - 1)))
+        return self.latencies[index]
+
+    def format(self):
+        return "{:<20} {:>10.0f} {:>9.3f} {:>9.3f} {:>9.3f} {:>9.3f}  {}".format(
+            self.scenario,
+            self.throughput,
+            self.percentile(50) * 1e3,
+            self.percentile(90) * 1e3,
+            self.percentile(99) * 1e3,
+            self.latencies[-1] * 1e3,
+            " ".join(
+                "{}={}".format(status, count)
+                for status, count in sorted(self.statuses.items())
+            ),
+        )
+
+
+HEADER = "{:<20} {:>10} {:>9} {:>9} {:>9} {:>9}  {}".format(
+    "scenario", "req/s", "p50 ms", "p90 ms", "p99 ms", "max ms", "statuses"
+)
+
+
+def _test_client_getter(app):
+    client = app.test_client()
+
+    def get(headers):
+        return client.get("/", headers=headers).status_code
+
+    return get
+
+
+def _server_getter(port):
+    try:
+        from http.client import HTTPConnection
+    except ImportError:  # pragma: no cover
+        from httplib import HTTPConnection
+
+    def get(headers):
+        connection = HTTPConnection("127.0.0.1", port)
+        try:
+            connection.request("GET", "/", headers=headers)
+            response = connection.getresponse()
+            response.read()
+            return response.status
+        finally:
+            connection.close()
+
+    return get
+
+
+def _start_server(app):
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def run(scenario, threads, requests, server=False):
+    """
+    Sends ``requests`` requests from each of ``threads`` threads to an app
+    built for ``scenario`` and returns a :class:`Result`.
+    """
+    app = make_app(scenario)
+    wsgi_server = _start_server(app) if server else None
+    barrier = threading.Barrier(threads + 1)
+    latencies = [None] * threads
+    statuses = [None] * threads
+
+    def worker(index):
+        if wsgi_server is not None:
+            get = _server_getter(wsgi_server.server_port)
+        else:
+            get = _test_client_getter(app)
+
+        timings, seen = [], Counter()
+        barrier.wait()
+
+        for i in range(requests):
+            n = index * requests + i
+            headers = {"X-User-Id": str(n % 100), "X-Request-Id": str(n)}
+            start = time.perf_counter()
+            seen[get(headers)] += 1
+            timings.append(time.perf_counter() - start)
+
+        latencies[index] = timings
+        statuses[index] = seen
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in workers:
+        t.start()
+
+    barrier.wait()
+    start = time.perf_counter()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    if wsgi_server is not None:
+        wsgi_server.shutdown()
+
+    return Result(
+        scenario,
+        elapsed,
+        [latency for timings in latencies for latency in timings],
+        sum(statuses, Counter()),
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument(
+        "--requests", type=int, default=200, help="requests sent by each thread"
+    )
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=sorted(SCENARIOS),
+        help="scenario to run, may be repeated. Defaults to every scenario",
+    )
+    parser.add_argument(
+        "--server",
+        action="store_true",
+        help="send requests to a local threaded server instead of the test client",
+    )
+    parser.add_argument(
+        "--switch-interval",
+        type=float,
+        help="thread switch interval in seconds, lower values interleave more",
+    )
+    args = parser.parse_args(argv)
+
+    if args.switch_interval is not None:
+        sys.setswitchinterval(args.switch_interval)
+
+    print(HEADER)
+    leaks = 0
+    for scenario in args.scenario or sorted(SCENARIOS):
+        result = run(scenario, args.threads, args.requests, server=args.server)
+        leaks += result.leaks
+        print(result.format())
+
+    if leaks:
+        print("{} requests observed another request's contexts".format(leaks))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Reports the memory used by large numbers of Flask-Allows objects, measured
+with tracemalloc::
+
+    python bench/memory.py
+    python bench/memory.py --nodes 100000 --roles 100000 --tuples 1000000
+
+The policy tree is a balanced tree of ``And``, ``Or`` and ``Not`` nodes whose
+leaves are shared functions, so the footprint is that of the conditional
+requirements themselves.
+
+Role hierarchies are measured including their registry, as a tree where each
+role implies four others and as a chain where each role implies the next,
+the worst case for the size of the precomputed closure.
+
+Relationship tuples are measured in a graph where users are members of teams
+that may view folders, which in turn hold documents.
+"""
+
+import argparse
+import sys
+import tracemalloc
+
+from flask_allows import (
+    Additional,
+    And,
+    Not,
+    Or,
+    Override,
+    Permission,
+)
+from flask_allows.grants import GrantRegistry
+from flask_allows.hierarchy import RoleHierarchy
+from flask_allows.relations import MemoryTupleStore
+
+
+def is_member(user):
+    return user.permlevel >= 0
+
+
+def is_admin(user):
+    return user.permlevel >= 2
+
+
+def policy_tree(nodes):
+    "Builds a balanced tree of exactly ``nodes`` conditional requirements"
+    if nodes == 1:
+        return Not(is_admin)
+
+    left = (nodes - 1) // 2
+    right = nodes - 1 - left
+    children = [policy_tree(size) for size in (left, right) if size]
+    combine = And if nodes % 2 else Or
+    return combine(*children)
+
+
+def role_tree(roles, branching=4):
+    "Builds a hierarchy of ``roles`` roles where each role implies four others"
+    implied = {}
+    for parent in range(roles):
+        first = parent * branching + 1
+        children = range(first, min(roles, first + branching))
+        if children:
+            implied["role-{}".format(parent)] = ["role-{}".format(c) for c in children]
+    return RoleHierarchy(implied, registry=GrantRegistry(attribute="roles"))
+
+
+def role_chain(roles):
+    "Builds a hierarchy of ``roles`` roles where each role implies the next"
+    implied = {"role-{}".format(i): ["role-{}".format(i + 1)] for i in range(roles - 1)}
+    return RoleHierarchy(implied, registry=GrantRegistry(attribute="roles"))
+
+
+def tuple_graph(tuples):
+    "Builds a store of ``tuples`` tuples, half memberships, half sharing"
+    store = MemoryTupleStore()
+    half = tuples // 2
+    store.write_many(
+        ("team:{}".format(i % 1000), "member", "user:{}".format(i // 10))
+        for i in range(half)
+    )
+    store.write_many(
+        ("document:{}".format(i), "viewer", "team:{}#member".format(i % 1000))
+        for i in range(tuples - half)
+    )
+    return store
+
+
+def measure(factory):
+    "Returns the bytes allocated by ``factory`` that are still in use"
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        objects = factory()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    del objects
+    return after - before
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=10000)
+    parser.add_argument("--roles", type=int, default=10000)
+    parser.add_argument("--tuples", type=int, default=100000)
+    args = parser.parse_args(argv)
+    n = args.nodes
+
+    scenarios = [
+        ("policy tree", lambda: policy_tree(n), n),
+        ("Permission", lambda: [Permission(is_member, is_admin) for _ in range(n)], n),
+        ("Override", lambda: [Override(is_member) for _ in range(n)], n),
+        ("Additional", lambda: [Additional(is_member) for _ in range(n)], n),
+        ("role tree", lambda: role_tree(args.roles), args.roles),
+        ("role chain", lambda: role_chain(args.roles), args.roles),
+        ("tuple graph", lambda: tuple_graph(args.tuples), args.tuples),
+    ]
+
+    print(
+        "{:<15} {:>10} {:>12} {:>10}".format("objects", "count", "total KiB", "B/obj")
+    )
+    for name, factory, count in scenarios:
+        size = measure(factory)
+        print(
+            "{:<15} {:>10} {:>12.1f} {:>10.1f}".format(
+                name, count, size / 1024.0, size / float(count)
+            )
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
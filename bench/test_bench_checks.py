@@ -0,0 +1,70 @@
+import warnings
+
+import pytest
+
+from flask_allows import Additional, Override, Permission
+from flask_allows.engine import _call_requirement
+
+from conftest import deep_tree, is_admin, is_member, legacy_is_member, wide_tree
+
+
+def test_single_check(benchmark, allows, member):
+    assert benchmark(allows.fulfill, [is_member], member)
+
+
+def test_single_check_loaded_identity(benchmark, allows, ctx):
+    assert benchmark(allows.fulfill, [is_member])
+
+
+def test_several_requirements(benchmark, allows, member):
+    assert benchmark(allows.fulfill, [is_member] * 10, member)
+
+
+@pytest.mark.parametrize("depth", [10, 100])
+def test_deep_tree(benchmark, allows, member, depth):
+    assert benchmark(allows.fulfill, [deep_tree(depth)], member)
+
+
+@pytest.mark.parametrize("width", [10, 100])
+def test_wide_tree(benchmark, allows, member, width):
+    assert benchmark(allows.fulfill, [wide_tree(width)], member)
+
+
+def test_active_override(benchmark, allows, member):
+    allows.overrides.push(Override(is_admin))
+    assert benchmark(allows.fulfill, [is_admin, is_member], member)
+
+
+def test_active_override_in_tree(benchmark, allows, member):
+    allows.overrides.push(Override(is_admin))
+    assert benchmark(allows.fulfill, [wide_tree(10)], member)
+
+
+def test_active_additional(benchmark, allows, member):
+    allows.additional.push(Additional(is_member))
+    assert benchmark(allows.fulfill, [is_member], member)
+
+
+def test_legacy_requirement(benchmark, allows, ctx, member):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        assert benchmark(allows.fulfill, [legacy_is_member], member)
+
+
+def test_call_requirement(benchmark, member):
+    assert benchmark(_call_requirement, is_member, member, None)
+
+
+def test_override_push_pop(benchmark, allows):
+    override = Override(is_admin)
+
+    def push_pop():
+        allows.overrides.push(override)
+        allows.overrides.pop()
+
+    benchmark(push_pop)
+
+
+def test_permission(benchmark, allows, ctx):
+    permission = Permission(is_member)
+    assert benchmark(bool, permission)
@@ -0,0 +1,50 @@
+from collections import namedtuple
+
+import pytest
+
+from flask_allows import And, Or
+from flask_allows.grants import GrantRegistry, HasRole, compile_requirement
+from flask_allows.hierarchy import RoleHierarchy
+
+Principal = namedtuple("Principal", ["roles"])
+
+
+@pytest.fixture
+def registry():
+    return GrantRegistry(attribute="roles")
+
+
+def role_tree(registry, width):
+    "An And of two Ors of ``width`` roles where only the last role is held"
+    roles = [HasRole("role-{}".format(i), registry=registry) for i in range(width)]
+    return And(Or(*roles), Or(*roles))
+
+
+@pytest.fixture
+def principal(registry):
+    return Principal(registry.mask(["role-99"]))
+
+
+@pytest.mark.parametrize("compiled", [False, True], ids=["walked", "compiled"])
+def test_role_tree(benchmark, allows, registry, principal, compiled):
+    tree = role_tree(registry, 100)
+    if compiled:
+        tree = compile_requirement(tree)
+
+    assert benchmark(allows.fulfill, [tree], principal)
+
+
+def test_single_role(benchmark, allows, registry, principal):
+    assert benchmark(allows.fulfill, [HasRole("role-99", registry=registry)], principal)
+
+
+def test_role_hierarchy(benchmark, allows, registry):
+    # every role implies the next, the root implies all 10,000 roles
+    RoleHierarchy(
+        {"role-{}".format(i): ["role-{}".format(i + 1)] for i in range(9999)},
+        registry=registry,
+    )
+    root = Principal(registry.mask(["role-0"]))
+    requirement = HasRole("role-9999", registry=registry)
+
+    assert benchmark(allows.fulfill, [requirement], root)
@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from flask_allows.policy import PolicyLoader
+
+from conftest import is_admin, is_member
+
+FACTORIES = {
+    "is_member": lambda: is_member,
+    "is_admin": lambda: is_admin,
+    "at_least": lambda level: lambda user: user.permlevel >= level,
+}
+
+
+def policy_document(policies):
+    "A document of ``policies`` policies, each a small tree of requirements"
+    return json.dumps(
+        {
+            "policies": {
+                "endpoint-{}".format(i): [
+                    "is_member",
+                    {
+                        "or": [
+                            "is_admin",
+                            {"requirement": "at_least", "args": [i % 3]},
+                            {"and": ["is_member", {"not": "is_admin"}]},
+                        ]
+                    },
+                ]
+                for i in range(policies)
+            }
+        }
+    )
+
+
+@pytest.mark.parametrize("cached", [False, True], ids=["parsed", "cached"])
+def test_load_policies(benchmark, tmpdir, cached):
+    data = policy_document(500)
+    loader = PolicyLoader(FACTORIES, cache_dir=str(tmpdir) if cached else None)
+    loader.loads(data)
+
+    policies = benchmark(loader.loads, data)
+
+    assert len(policies) == 500
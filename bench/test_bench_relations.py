@@ -0,0 +1,63 @@
+from collections import namedtuple
+
+import pytest
+
+from flask_allows.relations import MemoryTupleStore, Relation
+
+Principal = namedtuple("Principal", ["subject"])
+
+USERS, TEAMS, FOLDERS = 100000, 10000, 100000
+
+
+def sharing_graph():
+    """
+    A graph of about 1.3 million tuples: every user is a member of ten teams,
+    folders form a tree ten folders wide that each one team may view, and
+    each folder holds a document
+    """
+    store = MemoryTupleStore()
+    store.write_many(
+        ("team:{}".format((user * 10 + i) % TEAMS), "member", "user:{}".format(user))
+        for user in range(USERS)
+        for i in range(10)
+    )
+    store.write_many(
+        ("folder:{}".format(folder), "viewer", "team:{}#member".format(folder % TEAMS))
+        for folder in range(FOLDERS)
+    )
+    store.write_many(
+        (
+            "folder:{}".format(folder),
+            "viewer",
+            "folder:{}#viewer".format((folder - 1) // 10),
+        )
+        for folder in range(1, FOLDERS)
+    )
+    store.write_many(
+        ("document:{}".format(folder), "viewer", "folder:{}#viewer".format(folder))
+        for folder in range(FOLDERS)
+    )
+    return store
+
+
+@pytest.fixture(scope="module")
+def store():
+    return sharing_graph()
+
+
+@pytest.mark.parametrize(
+    "user, allowed",
+    [
+        # a member of the team of the document's folder
+        ("user:5555", True),
+        # a member of the team of the root folder, five folders up
+        ("user:0", True),
+        # no team of the user can view any folder on the way
+        ("user:99999", False),
+    ],
+    ids=["direct", "inherited", "denied"],
+)
+def test_relation(benchmark, allows, store, user, allowed):
+    requirement = Relation("viewer", "document:55555", store)
+
+    assert benchmark(allows.fulfill, [requirement], Principal(user)) is allowed
@@ -0,0 +1,43 @@
+from collections import namedtuple
+
+import pytest
+
+from flask_allows.relations import MemoryTupleStore, Relation
+from flask_allows.resources import CanAccess, ResourceIndex
+
+Principal = namedtuple("Principal", ["subject", "groups"])
+
+DEPTH, SHARES = 100, 10000
+
+
+def walked():
+    "Folders nested ``DEPTH`` deep as tuples, viewers of a folder view its children"
+    store = MemoryTupleStore()
+    store.write("folder:0", "viewer", "team:eng#member")
+    store.write("team:eng", "member", "user:alice")
+    store.write_many(
+        ("folder:{}".format(i), "viewer", "folder:{}#viewer".format(i - 1))
+        for i in range(1, DEPTH)
+    )
+    return Relation("viewer", "folder:{}".format(DEPTH - 1), store)
+
+
+def indexed():
+    "The same folders in an index, with ``SHARES`` other folders shared too"
+    index = ResourceIndex()
+    index.add("folder:0")
+    for i in range(1, DEPTH):
+        index.add("folder:{}".format(i), parent="folder:{}".format(i - 1))
+    for i in range(SHARES):
+        index.add("other:{}".format(i))
+        index.share("eng", "other:{}".format(i))
+    index.share("eng", "folder:0")
+    return CanAccess("folder:{}".format(DEPTH - 1), index)
+
+
+@pytest.mark.parametrize("build", [walked, indexed], ids=["walked", "indexed"])
+def test_nested_resource(benchmark, allows, build):
+    requirement = build()
+    principal = Principal("user:alice", ["eng"])
+
+    assert benchmark(allows.fulfill, [requirement], principal)
@@ -0,0 +1,39 @@
+import pytest
+from flask import Blueprint
+
+from flask_allows import guard_entire, requires
+
+from conftest import deep_tree, is_member
+
+
+@pytest.fixture
+def client(app, allows):
+    @app.route("/open")
+    def open_view():
+        return "ok"
+
+    @app.route("/requires")
+    @requires(is_member)
+    def requires_view():
+        return "ok"
+
+    @app.route("/requires-tree")
+    @requires(deep_tree(10))
+    def requires_tree_view():
+        return "ok"
+
+    bp = Blueprint("guarded", __name__)
+    bp.before_request(guard_entire([is_member]))
+
+    @bp.route("/guarded")
+    def guarded_view():
+        return "ok"
+
+    app.register_blueprint(bp)
+    return app.test_client()
+
+
+@pytest.mark.parametrize("path", ["/open", "/requires", "/requires-tree", "/guarded"])
+def test_request(benchmark, client, path):
+    response = benchmark(client.get, path)
+    assert response.status_code == 200
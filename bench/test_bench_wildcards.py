@@ -0,0 +1,40 @@
+from collections import namedtuple
+
+import pytest
+
+from flask_allows.wildcards import Permits, WildcardRegistry
+
+User = namedtuple("User", ["permissions"])
+
+WANTED = "project:999:issues:edit"
+
+
+def grants(count):
+    "``count`` grants where only the last implies ``WANTED``"
+    return ["project:{}:issues:*".format(i) for i in range(count - 1)] + [
+        "project:*:issues:edit"
+    ]
+
+
+def looped(user):
+    "Matches each grant against the permission in turn"
+    wanted = WANTED.split(":")
+    for grant in user.permissions:
+        parts = grant.split(":")
+        if all(g == "*" or w in g.split(",") for g, w in zip(parts, wanted)) and len(
+            parts
+        ) <= len(wanted):
+            return True
+    return False
+
+
+@pytest.mark.parametrize("count", [10, 1000])
+@pytest.mark.parametrize("matcher", ["looped", "trie"])
+def test_wildcard_permission(benchmark, allows, matcher, count):
+    if matcher == "looped":
+        requirement = looped
+    else:
+        requirement = Permits(WANTED, registry=WildcardRegistry())
+    user = User(grants(count))
+
+    assert benchmark(allows.fulfill, [requirement], user)
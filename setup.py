@@ -40,5 +40,5 @@ if __name__ == "__main__":
             "Programming Language :: Python :: 3.5",
             "Programming Language :: Python :: 3.6",
         ],
-        install_requires=["Flask"],
+        install_requires=["Flask", 'futures; python_version < "3"'],
     )
@@ -1,17 +1,5 @@
-from .additional import Additional, AdditionalManager, current_additions
-from .allows import Allows, allows
-from .overrides import Override, OverrideManager, current_overrides
-from .permission import Permission
-from .requirements import (
-    And,
-    C,
-    ConditionalRequirement,
-    Not,
-    Or,
-    Requirement,
-    wants_request,
-)
-from .views import exempt_from_requirements, guard_entire, requires
+import sys
+from types import ModuleType
 
 __all__ = (
     "Additional",
@@ -20,8 +8,10 @@ __all__ = (
     "Allows",
     "And",
     "C",
+    "can",
     "ConditionalRequirement",
     "current_additions",
+    "Engine",
     "exempt_from_requirements",
     "guard_entire",
     "current_overrides",
@@ -38,3 +28,63 @@ __all__ = (
 
 __version__ = "0.7.1"
 __author__ = "Alec Nikolas Reiter"
+
+# public names and the submodule each is loaded from on first access, so that
+# importing the package doesn't import Flask or any of the submodules
+_exports = {
+    "Additional": "additional",
+    "AdditionalManager": "additional",
+    "current_additions": "additional",
+    "Allows": "allows",
+    "allows": "allows",
+    "Engine": "engine",
+    "Override": "overrides",
+    "OverrideManager": "overrides",
+    "current_overrides": "overrides",
+    "Permission": "permission",
+    "can": "permission",
+    "And": "requirements",
+    "C": "requirements",
+    "ConditionalRequirement": "requirements",
+    "Not": "requirements",
+    "Or": "requirements",
+    "Requirement": "requirements",
+    "wants_request": "requirements",
+    "exempt_from_requirements": "views",
+    "guard_entire": "views",
+    "requires": "views",
+}
+
+
+def __getattr__(name):
+    try:
+        module = _exports[name]
+    except KeyError:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+    # equivalent to from .module import name, unlike importlib the import is
+    # reported by python -X importtime
+    value = getattr(__import__(module, globals(), None, [name], 1), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_exports))
+
+
+class _Package(ModuleType):
+    def __setattr__(self, name, value):
+        # importing the allows submodule binds it to the package under the
+        # same name as the proxy it defines, keep exporting the proxy
+        if name == "allows" and isinstance(value, ModuleType):
+            value = value.allows
+        super(_Package, self).__setattr__(name, value)
+
+
+if sys.version_info >= (3, 7):
+    sys.modules[__name__].__class__ = _Package
+else:  # pragma: no cover
+    # module level __getattr__ requires PEP 562
+    for _name in __all__:
+        __getattr__(_name)
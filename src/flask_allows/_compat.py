@@ -0,0 +1,49 @@
+import time
+
+try:
+    perf_counter_ns = time.perf_counter_ns
+except AttributeError:  # pragma: no cover
+    _clock = getattr(time, "perf_counter", time.time)
+
+    def perf_counter_ns():
+        return int(_clock() * 1e9)
+
+
+try:
+    monotonic = time.monotonic
+except AttributeError:  # pragma: no cover
+    # Python 2 has no monotonic clock in the standard library
+    monotonic = time.time
+
+
+try:
+    import queue
+except ImportError:  # pragma: no cover
+    import Queue as queue  # noqa: F401
+
+
+def with_metaclass(meta, *bases):
+    """
+    Creates a base class with a metaclass in a way that works with both the
+    Python 2 and Python 3 class syntax.
+    """
+
+    class metaclass(type):
+        def __new__(metacls, name, this_bases, d):
+            return meta(name, bases, d)
+
+    return type.__new__(metaclass, "temporary_class", (), {})
+
+
+try:
+    string_types = (basestring,)  # noqa: F821
+except NameError:
+    string_types = (str,)
+
+
+try:
+    from sys import intern
+except ImportError:  # pragma: no cover
+    # Python 2 can only intern byte strings, unicode is returned as it is
+    def intern(string, _intern=intern):  # noqa: F821
+        return _intern(string) if type(string) is str else string
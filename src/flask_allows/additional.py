@@ -1,9 +1,11 @@
 from contextlib import contextmanager
 from functools import wraps
+from itertools import count
 
 from werkzeug.local import LocalProxy, LocalStack
 
 _additional_ctx_stack = LocalStack()
+_generations = count()
 
 __all__ = ("current_additions", "Additional", "AdditionalManager")
 
@@ -69,14 +71,19 @@ class Additional(object):
     requirements contained in them.
     """
 
+    __slots__ = ("_requirements", "_generation")
+
     def __init__(self, *requirements):
         self._requirements = set(requirements)
+        self._generation = next(_generations)
 
     def add(self, requirement, *requirements):
         self._requirements.update((requirement,) + requirements)
+        self._generation = next(_generations)
 
     def remove(self, requirement, *requirements):
         self._requirements.difference_update((requirement,) + requirements)
+        self._generation = next(_generations)
 
     @_isinstance
     def __add__(self, other):
@@ -86,7 +93,7 @@ class Additional(object):
     @_isinstance
     def __iadd__(self, other):
         if len(other._requirements) > 0:
-            self._requirements.add(*other._requirements)
+            self.add(*other._requirements)
         return self
 
     @_isinstance
@@ -136,6 +143,8 @@ class AdditionalManager(object):
     ``allows.additional`` to access these controls.
     """
 
+    __slots__ = ()
+
     def push(self, additional, use_parent=False):
         """
         Binds an additional to the current context, optionally use the
@@ -169,10 +178,10 @@ class AdditionalManager(object):
         """
         Returns the current additional context if set otherwise None
         """
-        try:
-            return _additional_ctx_stack.top[1]
-        except TypeError:
+        rv = _additional_ctx_stack.top
+        if rv is None:
             return None
+        return rv[1]
 
     @contextmanager
     def additional(self, additional, use_parent=False):
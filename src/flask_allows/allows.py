@@ -1,15 +1,17 @@
-import warnings
+import threading
 from functools import wraps
-from itertools import chain
+from random import random
 
-from flask import current_app, request
+from flask import current_app, g, has_app_context, request
 from werkzeug.datastructures import ImmutableDict
 from werkzeug.exceptions import Forbidden
 from werkzeug.local import LocalProxy
 
+from ._compat import perf_counter_ns
 from .additional import Additional, AdditionalManager
+from .engine import Engine, _current_endpoint
 from .overrides import Override, OverrideManager
-
+from .signals import check_traced, fulfill_finished, run_finished
 
 __all__ = ("Allows", "allows")
 
@@ -25,15 +27,61 @@ class Allows(object):
         authorization fails.
     :param on_fail: Optional. A value to return or function to call when
         authorization fails.
+    :param metrics: Optional. A :class:`~flask_allows.metrics.MetricsRegistry`
+        to record decisions and latencies into.
+    :param trace_sample_rate: Optional. Fraction of requests, between 0 and 1,
+        to trace every check made in. See :meth:`trace_request`
+    :param latency_budget: Optional. A
+        :class:`~flask_allows.budget.LatencyBudget` to report sampled checks
+        that take too long.
+    :param audit: Optional. An :class:`~flask_allows.audit.AuditLog` to
+        record decisions into.
+    :param policies: Optional. A :class:`~flask_allows.policy.PolicyWatcher`
+        whose policies are checked before requests to the endpoints they are
+        named after.
+
+    .. versionchanged:: 0.8.0
+        Added ``metrics``, ``trace_sample_rate``, ``latency_budget``,
+        ``audit`` and ``policies`` options. Checks are evaluated by the
+        :class:`~flask_allows.engine.Engine` available as ``engine``.
     """
 
-    def __init__(self, app=None, identity_loader=None, throws=Forbidden, on_fail=None):
+    def __init__(
+        self,
+        app=None,
+        identity_loader=None,
+        throws=Forbidden,
+        on_fail=None,
+        metrics=None,
+        trace_sample_rate=0,
+        latency_budget=None,
+        audit=None,
+        policies=None,
+    ):
         self._identity_loader = identity_loader
         self.throws = throws
+        self.trace_sample_rate = trace_sample_rate
+        # contexts being traced, so untraced checks skip looking up g
+        self._tracing = 0
+        self._tracing_lock = threading.Lock()
+        self.latency_budget = latency_budget
 
         self.on_fail = _make_callable(on_fail)
         self.overrides = OverrideManager()
         self.additional = AdditionalManager()
+        self.engine = Engine()
+
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.init_allows(self)
+
+        self.audit = audit
+        if audit is not None:
+            audit.init_allows(self)
+
+        self.policies = policies
+        if policies is not None:
+            policies.init_allows(self)
 
         if app:
             self.init_app(app)
@@ -41,22 +89,52 @@ class Allows(object):
     def init_app(self, app):
         """
         Initializes the Flask-Allows object against the provided application
+        and registers :func:`~flask_allows.permission.can` as a template
+        global.
         """
         if not hasattr(app, "extensions"):  # pragma: no cover
             app.extensions = {}
         app.extensions["allows"] = self
 
+        from .permission import can
+
+        app.add_template_global(can)
+
         @app.before_request
         def start_context(*a, **k):
             self.overrides.push(Override())
             self.additional.push(Additional())
 
+            if self.trace_sample_rate and random() < self.trace_sample_rate:
+                self.trace_request()
+
+        @app.before_request
+        def check_policy():
+            if self.policies is None:
+                return None
+
+            # the request keeps the policies current when it started even if
+            # they are reloaded while it's handled
+            policies = g._allows_policies = self.policies.current
+            requirements = policies.get(request.endpoint)
+            if requirements is None:
+                return None
+
+            from .views import _should_run_requirements
+
+            if not _should_run_requirements():
+                return None
+
+            return self.run(requirements, f_kwargs=request.view_args)
+
         @app.after_request
         def cleanup(response):
             self.clear_all_overrides()
             self.clear_all_additional()
             return response
 
+        app.teardown_appcontext(self._stop_tracing)
+
     def requires(self, *requirements, **opts):
         """
         Decorator to enforce requirements on routes
@@ -134,23 +212,238 @@ class Allows(object):
 
             allows.fulfill([], user_without_foo)  # return True
 
+        If any receivers are connected to
+        :data:`~flask_allows.signals.fulfill_finished` this method is timed and
+        the signal is sent once the check completes.
+
+        :param requirements: The requirements to check the identity against.
+        :param identity: Optional. Identity to use in place of the current
+            identity.
+        """
+        identity = identity or self._identity_loader()
+
+        if self._tracing and self.current_traces is not None:
+            return self._traced_fulfill(requirements, identity)
+
+        if self.latency_budget is not None and self.latency_budget.should_sample():
+            return self.latency_budget.fulfill(self, requirements, identity)
+
+        if fulfill_finished.receivers:
+            return self._instrumented_fulfill(requirements, identity)
+
+        return self._fulfill(requirements, identity)
+
+    def explain(self, requirements, identity=None):
+        """
+        Checks the provided or current identity against the requirements in
+        the same fashion as :meth:`fulfill` but returns a
+        :class:`~flask_allows.trace.Trace` that records how every requirement,
+        including those nested inside of conditional requirements, was
+        handled::
+
+            trace = allows.explain([Or(And(a, b), Not(c))], identity=user)
+
+            if not trace:
+                print(trace.format())
+                print(trace.causes())
+
+        Exceptions raised by requirements are recorded on the trace rather
+        than raised.
+
         :param requirements: The requirements to check the identity against.
         :param identity: Optional. Identity to use in place of the current
             identity.
+
+        .. versionadded:: 0.8.0
+        """
+        identity = identity or self._identity_loader()
+        return self._make_tracer().trace(requirements, identity)
+
+    def filter(self, iterable, requirement_factory, identity=None, chunk_size=None):
+        """
+        Lazily yields the items of ``iterable`` that the provided or current
+        identity may access, checking the requirements returned by
+        ``requirement_factory`` for each item::
+
+            @app.route('/export')
+            def export():
+                documents = Document.query.yield_per(1000)
+                allowed = allows.filter(documents, CanRead, chunk_size=1000)
+                return Response(map(to_csv_line, allowed), mimetype='text/csv')
+
+        The identity, overrides and additional requirements are resolved
+        when this method is called rather than when iteration starts, so the
+        items may be consumed after the request ends, for example by a
+        streamed response. See :meth:`Engine.filter
+        <flask_allows.engine.Engine.filter>` for how items are checked and
+        how ``chunk_size`` batches requirements.
+
+        :param iterable: The items to filter.
+        :param requirement_factory: Callable accepting an item and returning
+            a requirement, or a list of requirements, for it.
+        :param identity: Optional. Identity to use in place of the current
+            identity.
+        :param chunk_size: Optional. Number of items to check at once.
+
+        .. versionadded:: 0.8.0
+        """
+        identity = identity or self._identity_loader()
+        return self.engine.filter(
+            iterable,
+            requirement_factory,
+            identity,
+            self.overrides.current,
+            self.additional.current,
+            chunk_size,
+        )
+
+    def partial(self, requirements, identity=None):
+        """
+        Evaluates everything in the requirements that doesn't depend on a row
+        for the provided or current identity, taking the current overrides
+        and additional requirements into account, and returns the residual
+        requirement about the row, see
+        :func:`~flask_allows.residuals.partial_evaluate`::
+
+            residual = allows.partial([can_view])
+            posts = Post.query.filter(to_sqlalchemy(residual, Post))
+
+        :param requirements: The requirements to evaluate.
+        :param identity: Optional. Identity to use in place of the current
+            identity.
+
+        .. versionadded:: 0.8.0
         """
+        from .residuals import partial_evaluate
+
         identity = identity or self._identity_loader()
+        return partial_evaluate(
+            requirements, identity, self.overrides.current, self.additional.current
+        )
+
+    def trace_request(self):
+        """
+        Enables tracing for every check made during the rest of the current
+        request or application context. Traced checks are evaluated as if
+        by :meth:`explain`, their traces are collected into
+        :attr:`current_traces` and sent with the
+        :data:`~flask_allows.signals.check_traced` signal.
+
+        Requests are traced automatically at the rate configured with
+        ``trace_sample_rate``. Calling this method again while the context is
+        already traced keeps the traces collected so far.
+
+        .. versionadded:: 0.8.0
+        """
+        if "_allows_traces" not in g:
+            with self._tracing_lock:
+                self._tracing += 1
+            g._allows_traces = []
+
+    def _stop_tracing(self, exc):
+        if g.pop("_allows_traces", None) is not None:
+            with self._tracing_lock:
+                self._tracing -= 1
+
+    @property
+    def current_traces(self):
+        """
+        The traces collected during the current request if it is being traced,
+        otherwise None.
+
+        .. versionadded:: 0.8.0
+        """
+        if not has_app_context():
+            return None
+        return g.get("_allows_traces")
+
+    @property
+    def current_policies(self):
+        """
+        The :class:`~flask_allows.policy.PolicySet` used by the current
+        request, which stays the same for the whole request even if the
+        policies are reloaded meanwhile. Outside of requests, the active
+        policies of the watcher. None if no ``policies`` were configured.
+
+        .. versionadded:: 0.8.0
+        """
+        if self.policies is None:
+            return None
+
+        policies = g.get("_allows_policies") if has_app_context() else None
+        if policies is None:
+            return self.policies.current
+        return policies
+
+    def _traced_fulfill(self, requirements, identity):
+        trace = self._run_tracer(self._make_tracer(), requirements, identity)
+        self.current_traces.append(trace)
+
+        if check_traced.receivers:
+            check_traced.send(self, trace=trace)
+
+        if trace.error is not None:
+            raise trace.error
 
-        if self.additional.current:
-            all_requirements = chain(iter(self.additional.current), requirements)
-        else:
-            all_requirements = iter(requirements)
+        return trace.result
 
-        if self.overrides.current is not None:
-            all_requirements = (
-                r for r in all_requirements if r not in self.overrides.current
+    def _make_tracer(self):
+        from .trace import _Tracer
+
+        return _Tracer(self.overrides.current, self.additional.current, request)
+
+    def _run_tracer(self, tracer, requirements, identity):
+        trace = tracer.trace(requirements, identity)
+
+        if fulfill_finished.receivers:
+            fulfill_finished.send(
+                self,
+                requirements=requirements,
+                identity=identity,
+                result=trace.result,
+                elapsed=trace.elapsed,
+                endpoint=trace.endpoint,
+                error=trace.error,
             )
 
-        return all(_call_requirement(r, identity, request) for r in all_requirements)
+        return trace
+
+    def _fulfill(self, requirements, identity):
+        return self.engine.fulfill(
+            requirements,
+            identity,
+            self.overrides.current,
+            self.additional.current,
+            request,
+        )
+
+    def _instrumented_fulfill(self, requirements, identity):
+        start = perf_counter_ns()
+
+        try:
+            result = self._fulfill(requirements, identity)
+        except Exception as e:
+            fulfill_finished.send(
+                self,
+                requirements=requirements,
+                identity=identity,
+                result=None,
+                elapsed=perf_counter_ns() - start,
+                endpoint=_current_endpoint(),
+                error=e,
+            )
+            raise
+
+        fulfill_finished.send(
+            self,
+            requirements=requirements,
+            identity=identity,
+            result=result,
+            elapsed=perf_counter_ns() - start,
+            endpoint=_current_endpoint(),
+            error=None,
+        )
+        return result
 
     def clear_all_overrides(self):
         """
@@ -212,12 +505,49 @@ class Allows(object):
         throws = throws or self.throws
         on_fail = _make_callable(on_fail) if on_fail is not None else self.on_fail
 
+        if run_finished.receivers:
+            return self._instrumented_run(
+                requirements,
+                identity,
+                throws,
+                on_fail,
+                f_args,
+                f_kwargs,
+                use_on_fail_return,
+            )
+
         if not self.fulfill(requirements, identity):
             result = on_fail(*f_args, **f_kwargs)
             if use_on_fail_return and result is not None:
                 return result
             raise throws
 
+    def _instrumented_run(
+        self, requirements, identity, throws, on_fail, f_args, f_kwargs, use_return
+    ):
+        start = perf_counter_ns()
+        identity = identity or self._identity_loader()
+        allowed = self.fulfill(requirements, identity)
+        result = None
+
+        if not allowed:
+            result = on_fail(*f_args, **f_kwargs)
+
+        run_finished.send(
+            self,
+            requirements=requirements,
+            identity=identity,
+            result=allowed,
+            elapsed=perf_counter_ns() - start,
+            endpoint=_current_endpoint(),
+        )
+
+        if allowed:
+            return None
+        if use_return and result is not None:
+            return result
+        raise throws
+
 
 def __get_allows():
     "Internal helper"
@@ -233,18 +563,4 @@ def _make_callable(func_or_value):
     return func_or_value
 
 
-def _call_requirement(req, user, request):
-    try:
-        return req(user)
-    except TypeError:
-        warnings.warn(
-            "{!r}: Passing request to requirements is now deprecated"
-            " and will be removed in 1.0".format(req),
-            DeprecationWarning,
-            stacklevel=2,
-        )
-
-        return req(user, request)
-
-
 allows = LocalProxy(__get_allows, name="flask-allows")
@@ -0,0 +1,334 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from random import random
+
+from ._compat import queue
+from .requirements import _describe_requirement
+from .signals import fulfill_finished
+
+__all__ = ("AuditLog", "DROP", "BLOCK")
+
+DROP = "drop"
+BLOCK = "block"
+
+_STOP = object()
+
+# seconds close waits for room on a full queue when not given a timeout
+_STOP_TIMEOUT = 5
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLog(object):
+    """
+    Records authorization decisions as newline delimited JSON without slowing
+    down the requests making them. Decisions are placed onto a bounded in
+    memory queue and a background thread writes them to rotating files in
+    batches::
+
+        audit = AuditLog("/var/log/myapp/audit", allow_sample_rate=0.01)
+        allows = Allows(app, identity_loader=load_user, audit=audit)
+
+    Every denied check and every check that raised is recorded, while allowed
+    checks are recorded at ``allow_sample_rate``. Each record looks like::
+
+        {"time": 1538524800.123, "identity": "42", "endpoint": "reports.index",
+         "requirements": ["myapp.is_admin"], "result": false,
+         "elapsed": 31250, "error": null}
+
+    The audit log receives decisions through the
+    :data:`~flask_allows.signals.fulfill_finished` signal and requires blinker.
+
+    If records arrive faster than they can be written, the queue fills up and
+    ``policy`` decides what happens: ``"drop"`` discards the new record and
+    counts it in :attr:`dropped`, ``"block"`` makes the request wait for room
+    on the queue.
+
+    Records that can't be written, for example because the directory is
+    missing, are logged to the ``flask_allows.audit`` logger and counted in
+    :attr:`failed` while the writer carries on with the next batch.
+
+    :param directory: Directory to write the audit files into
+    :param allow_sample_rate: Optional. Fraction of allowed checks, between 0
+        and 1, to record. Defaults to 0
+    :param identity_key: Optional. Callable that receives the identity and
+        returns the value to record for it. Defaults to the identity's ``id``
+        attribute if it has one, otherwise its ``repr``
+    :param policy: Optional. Either ``"drop"`` or ``"block"``, defaults to
+        ``"drop"``
+    :param max_queue: Optional. Maximum records waiting to be written,
+        defaults to 10000
+    :param batch_size: Optional. Maximum records written at once, defaults
+        to 500
+    :param flush_interval: Optional. Seconds the writer waits to fill a batch,
+        defaults to 1
+    :param filename: Optional. Name of the audit file, ``{pid}`` is replaced
+        with the current process id so that worker processes write separate
+        files. Defaults to ``"flask-allows-audit-{pid}.jsonl"``
+    :param max_bytes: Optional. Size in bytes at which the file is rotated,
+        defaults to 10MiB
+    :param backup_count: Optional. Number of rotated files to keep, defaults
+        to 5
+
+    .. versionadded:: 0.8.0
+    """
+
+    def __init__(
+        self,
+        directory,
+        allow_sample_rate=0,
+        identity_key=None,
+        policy=DROP,
+        max_queue=10000,
+        batch_size=500,
+        flush_interval=1,
+        filename="flask-allows-audit-{pid}.jsonl",
+        max_bytes=10 * 1024 * 1024,
+        backup_count=5,
+    ):
+        if policy not in (DROP, BLOCK):
+            raise ValueError("policy must be either 'drop' or 'block'")
+
+        self.directory = directory
+        self.allow_sample_rate = allow_sample_rate
+        self.identity_key = identity_key or _default_identity_key
+        self.policy = policy
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+        #: Number of records discarded because the queue was full
+        self.dropped = 0
+        #: Number of records that couldn't be written
+        self.failed = 0
+
+        self._lock = threading.Lock()
+        self._hooks_registered = False
+        self._setup()
+
+    def _setup(self):
+        self._queue = queue.Queue(self.max_queue)
+        self._thread = None
+        self._closed = False
+
+    @property
+    def path(self):
+        "The file audit records are currently written to"
+        return os.path.join(self.directory, self.filename.format(pid=os.getpid()))
+
+    def init_allows(self, allows):
+        """
+        Connects the audit log to the checks made by the provided
+        :class:`~flask_allows.allows.Allows` instance. This is called
+        automatically when the audit log is passed to the extension.
+        """
+        fulfill_finished.connect(self._on_fulfill_finished, sender=allows)
+
+    def _on_fulfill_finished(self, sender, **kwargs):
+        if kwargs["result"] and not (
+            self.allow_sample_rate and random() < self.allow_sample_rate
+        ):
+            return
+
+        self.record(
+            kwargs["identity"],
+            kwargs["requirements"],
+            kwargs["result"],
+            kwargs["elapsed"],
+            endpoint=kwargs["endpoint"],
+            error=kwargs["error"],
+        )
+
+    def record(
+        self, identity, requirements, result, elapsed, endpoint=None, error=None
+    ):
+        """
+        Queues a decision to be written. Only the identity key is computed on
+        the calling thread, the rest of the record is formatted by the writer.
+
+        :param identity: The identity the check was made against
+        :param requirements: The requirements that were checked
+        :param result: The result of the check
+        :param elapsed: Time taken by the check in nanoseconds
+        :param endpoint: Optional. The endpoint the check was made for
+        :param error: Optional. Exception raised during the check
+        """
+        if self._closed:
+            return
+
+        if self._thread is None:
+            self._start()
+
+        item = (
+            time.time(),
+            self.identity_key(identity),
+            endpoint,
+            tuple(requirements),
+            result,
+            elapsed,
+            error,
+        )
+
+        if self.policy == BLOCK:
+            self._queue.put(item)
+            return
+
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def close(self, timeout=None):
+        """
+        Writes any queued records, stops the background writer and stops
+        recording checks. Called automatically when the interpreter exits.
+
+        :param timeout: Optional. Seconds to wait for the writer to make room
+            for the stop request and then to finish. Waits up to 5 seconds
+            for room and as long as the writer runs by default.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+
+        fulfill_finished.disconnect(self._on_fulfill_finished)
+
+        if thread is None:
+            return
+
+        try:
+            self._queue.put(
+                _STOP, timeout=_STOP_TIMEOUT if timeout is None else timeout
+            )
+        except queue.Full:
+            logger.warning(
+                "Audit writer is stuck, %d queued records weren't written",
+                self._queue.qsize(),
+            )
+            return
+
+        thread.join(timeout)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="flask-allows-audit")
+            self._thread.daemon = True
+            self._thread.start()
+
+            if not self._hooks_registered:
+                self._hooks_registered = True
+                atexit.register(self.close)
+                if hasattr(os, "register_at_fork"):
+                    os.register_at_fork(after_in_child=self._setup)
+
+    def _run(self):
+        stopping = False
+
+        while not stopping:
+            batch = self._next_batch()
+
+            if _STOP in batch:
+                stopping = True
+                batch = [item for item in batch if item is not _STOP]
+                batch.extend(self._drain())
+
+            if not batch:
+                continue
+
+            try:
+                self._write_batch(batch)
+            except Exception:
+                # a failed batch mustn't stop the writer, otherwise the queue
+                # fills up and blocks or drops every later record
+                with self._lock:
+                    self.failed += len(batch)
+                logger.exception(
+                    "Unable to write %d audit records to %s", len(batch), self.path
+                )
+
+    def _next_batch(self):
+        """
+        Waits for a record then collects more until the batch is full or the
+        flush interval passes.
+        """
+        batch = [self._queue.get()]
+        deadline = time.time() + self.flush_interval
+
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _drain(self):
+        # anything queued before close was called is still written
+        items = []
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                return items
+
+    def _write_batch(self, batch):
+        # rotation compares sizes in bytes, so write exactly these bytes
+        data = "".join(_format(item) for item in batch).encode("utf-8")
+        path = self.path
+
+        if (
+            self.max_bytes
+            and os.path.exists(path)
+            and os.path.getsize(path) + len(data) > self.max_bytes
+        ):
+            self._rotate(path)
+
+        with open(path, "ab") as fh:
+            fh.write(data)
+
+    def _rotate(self, path):
+        for i in range(self.backup_count - 1, 0, -1):
+            source = "{}.{}".format(path, i)
+            if os.path.exists(source):
+                os.rename(source, "{}.{}".format(path, i + 1))
+
+        if self.backup_count > 0:
+            os.rename(path, "{}.1".format(path))
+        else:
+            os.remove(path)
+
+
+def _default_identity_key(identity):
+    key = getattr(identity, "id", None)
+    if key is None:
+        return repr(identity)
+    return key
+
+
+def _format(item):
+    timestamp, identity, endpoint, requirements, result, elapsed, error = item
+    record = {
+        "time": timestamp,
+        "identity": identity,
+        "endpoint": endpoint,
+        "requirements": [_describe_requirement(r) for r in requirements],
+        "result": result if result is None else bool(result),
+        "elapsed": elapsed,
+        "error": None if error is None else repr(error),
+    }
+    return json.dumps(record, default=repr) + "\n"
@@ -0,0 +1,229 @@
+import logging
+import threading
+
+from flask import request
+
+from ._compat import monotonic, perf_counter_ns
+from .engine import _call_requirement, _current_endpoint
+from .requirements import Requirement, _describe_requirement
+from .signals import breaker_rejected, breaker_state_changed
+
+__all__ = ("CircuitBreaker", "CLOSED", "OPEN", "HALF_OPEN")
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitBreaker(Requirement):
+    """
+    Wraps a requirement that depends on an external service so that once the
+    service starts failing, checks stop calling it and immediately use a
+    fallback decision instead::
+
+        entitlements = CircuitBreaker(HasEntitlement("reports"), fallback=False)
+
+        @app.route("/reports")
+        @requires(entitlements)
+        def reports():
+            ...
+
+    The breaker starts closed and calls the wrapped requirement normally.
+    Exceptions raised by the requirement, and calls taking longer than
+    ``slow_call`` seconds if provided, count as failures. After
+    ``failure_threshold`` consecutive failures the breaker opens and every
+    check receives the ``fallback`` decision without calling the requirement.
+    Once ``reset_timeout`` seconds have passed the breaker becomes half open and
+    lets ``half_open_calls`` checks through to probe the service: a success
+    closes the breaker again while a failure reopens it.
+
+    Exceptions raised while the breaker is closed or half open are still
+    raised after they are counted.
+
+    The breaker's state is kept on the instance and shared between every
+    thread using it, so create a single instance per protected requirement.
+    State changes are logged to the ``flask_allows.breakers`` logger and sent
+    with :data:`~flask_allows.signals.breaker_state_changed`; checks answered
+    by an open breaker send :data:`~flask_allows.signals.breaker_rejected`.
+    Both are reported by :class:`~flask_allows.metrics.MetricsRegistry` and the
+    breaker's state is recorded in traces.
+
+    To have the breaker count timeouts as failures, place it inside of a
+    :class:`~flask_allows.timeouts.Timeout` and configure ``slow_call``::
+
+        Timeout(CircuitBreaker(HasEntitlement("reports"), slow_call=0.25), 0.25)
+
+    :param requirement: The requirement to protect
+    :param failure_threshold: Optional. Consecutive failures needed to open
+        the breaker, defaults to 5
+    :param reset_timeout: Optional. Seconds to stay open before probing the
+        requirement again, defaults to 30
+    :param fallback: Optional. The decision used while the breaker is open,
+        defaults to False
+    :param half_open_calls: Optional. Number of concurrent probes allowed
+        while half open, defaults to 1
+    :param slow_call: Optional. Calls taking longer than this many seconds
+        count as failures even if they succeed.
+    :param failures: Optional. Exception types that count as failures,
+        defaults to ``(Exception,)``. Other exceptions propagate without
+        counting as a failure or a success.
+
+    .. versionadded:: 0.8.0
+    """
+
+    def __init__(
+        self,
+        requirement,
+        failure_threshold=5,
+        reset_timeout=30,
+        fallback=False,
+        half_open_calls=1,
+        slow_call=None,
+        failures=(Exception,),
+    ):
+        self.requirement = requirement
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.fallback = fallback
+        self.half_open_calls = half_open_calls
+        self.slow_call = slow_call
+        self.failures = failures
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._state = CLOSED
+        self._failure_count = 0
+        self._opened_at = None
+        self._probes = 0
+
+    @property
+    def state(self):
+        """
+        The current state of the breaker, one of ``"closed"``, ``"open"`` or
+        ``"half-open"``.
+        """
+        with self._lock:
+            if self._state == OPEN and self._reset_elapsed():
+                return HALF_OPEN
+            return self._state
+
+    def reset(self):
+        """
+        Closes the breaker and forgets any recorded failures.
+        """
+        with self._lock:
+            previous = self._state
+            self._state = CLOSED
+            self._failure_count = 0
+            self._probes = 0
+        self._changed(previous, CLOSED)
+
+    def fulfill(self, user):
+        probing = self._acquire()
+        self._local.rejected = probing is None
+
+        if probing is None:
+            if breaker_rejected.receivers:
+                breaker_rejected.send(self, user=user, endpoint=_current_endpoint())
+            return self.fallback
+
+        start = perf_counter_ns()
+
+        try:
+            result = _call_requirement(self.requirement, user, request)
+        except self.failures:
+            self._record(probing, failed=True)
+            raise
+        except BaseException:
+            # says nothing about the dependency, only free the probe
+            self._release(probing)
+            raise
+
+        slow = (
+            self.slow_call is not None
+            and perf_counter_ns() - start > self.slow_call * 1e9
+        )
+        self._record(probing, failed=slow)
+        return result
+
+    def trace_annotations(self):
+        return {
+            "circuit": self.state,
+            "rejected": getattr(self._local, "rejected", False),
+        }
+
+    def _reset_elapsed(self):
+        return monotonic() - self._opened_at >= self.reset_timeout
+
+    def _acquire(self):
+        """
+        Returns None if the call should be rejected, otherwise whether the call
+        is a half open probe.
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return False
+
+            if self._state == OPEN:
+                if not self._reset_elapsed():
+                    return None
+                previous, self._state, self._probes = self._state, HALF_OPEN, 0
+            else:
+                previous = None
+
+            if self._probes >= self.half_open_calls:
+                return None
+
+            self._probes += 1
+
+        if previous is not None:
+            self._changed(previous, HALF_OPEN)
+        return True
+
+    def _release(self, probing):
+        if probing:
+            with self._lock:
+                self._probes -= 1
+
+    def _record(self, probing, failed):
+        with self._lock:
+            previous = self._state
+
+            if probing:
+                self._probes -= 1
+
+            if not failed:
+                self._failure_count = 0
+                if previous == HALF_OPEN and probing:
+                    self._state = CLOSED
+            else:
+                self._failure_count += 1
+                if (previous == HALF_OPEN and probing) or (
+                    previous == CLOSED and self._failure_count >= self.failure_threshold
+                ):
+                    self._state = OPEN
+                    self._opened_at = monotonic()
+
+            current = self._state
+
+        if current != previous:
+            self._changed(previous, current)
+
+    def _changed(self, previous, current):
+        if previous == current:
+            return
+
+        logger.warning(
+            "Circuit breaker for %s changed from %s to %s",
+            _describe_requirement(self.requirement),
+            previous,
+            current,
+        )
+
+        if breaker_state_changed.receivers:
+            breaker_state_changed.send(self, state=current, previous=previous)
+
+    def __repr__(self):
+        return "CircuitBreaker({})".format(_describe_requirement(self.requirement))
@@ -0,0 +1,251 @@
+import heapq
+import logging
+import sys
+import threading
+import traceback
+from itertools import count
+from random import random
+
+from ._compat import perf_counter_ns
+
+__all__ = ("LatencyBudget", "SlowCheck")
+
+logger = logging.getLogger(__name__)
+
+
+class SlowCheck(object):
+    """
+    Report of a sampled check that exceeded its latency budget.
+
+    :param budget: The configured budget in seconds
+    :param trace: The :class:`~flask_allows.trace.Trace` of the check
+    :param running: The :class:`~flask_allows.trace.TraceNode` path, outermost
+        first, that was being evaluated when the budget ran out. Empty if the
+        check finished before the stack could be sampled.
+    :param stack: The formatted stack of the checking thread when the budget
+        ran out, empty if it could not be sampled.
+    """
+
+    def __init__(self, budget, trace, running=(), stack=()):
+        self.budget = budget
+        self.trace = trace
+        self.running = list(running)
+        self.stack = list(stack)
+
+    @property
+    def elapsed(self):
+        "Time spent on the check in nanoseconds"
+        return self.trace.elapsed
+
+    @property
+    def endpoint(self):
+        return self.trace.endpoint
+
+    @property
+    def requirement(self):
+        """
+        The innermost requirement that was running when the budget ran out,
+        or None if it is unknown.
+        """
+        if not self.running:
+            return None
+        return self.running[-1].requirement
+
+    def format(self):
+        """
+        Renders the report, including the trace and the stack sample, as text.
+        """
+        lines = [
+            "Authorization check for endpoint {!r} took {:.3f}ms, budget is "
+            "{:.3f}ms".format(self.endpoint, self.elapsed / 1e6, self.budget * 1e3)
+        ]
+
+        if self.running:
+            lines.append(
+                "Running when budget was exceeded: {}".format(self.running[-1].name)
+            )
+
+        lines.append(self.trace.format())
+
+        if self.stack:
+            lines.append("Stack sample:")
+            lines.append("".join(self.stack).rstrip())
+
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return "<SlowCheck endpoint={!r} elapsed={} requirement={!r}>".format(
+            self.endpoint, self.elapsed, self.requirement
+        )
+
+
+class LatencyBudget(object):
+    """
+    Watches a sample of checks made through
+    :meth:`~flask_allows.allows.Allows.fulfill`, and so also
+    :meth:`~flask_allows.allows.Allows.run`, and reports those that take longer
+    than the budget. Sampled checks are traced as if by
+    :meth:`~flask_allows.allows.Allows.explain` and a watchdog thread samples
+    the stack of the checking thread once the budget runs out, capturing the
+    requirement that was running at that point::
+
+        def report(slow_check):
+            app.logger.warning(slow_check.format())
+
+        allows = Allows(
+            app,
+            identity_loader=load_user,
+            latency_budget=LatencyBudget(0.005, sample_rate=0.05, callback=report),
+        )
+
+    Checks that are not sampled are not affected beyond drawing a random
+    number.
+
+    :param budget: Allowed time per check in seconds
+    :param sample_rate: Optional. Fraction of checks, between 0 and 1, to
+        watch. Defaults to 0.01
+    :param callback: Optional. Called with a :class:`SlowCheck` for each
+        sampled check that exceeds the budget. If not provided, reports are
+        logged as warnings to the ``flask_allows.budget`` logger.
+
+    .. versionadded:: 0.8.0
+    """
+
+    def __init__(self, budget, sample_rate=0.01, callback=None):
+        self.budget = budget
+        self.sample_rate = sample_rate
+        self.callback = callback or _log_slow_check
+        self._watchdog = _Watchdog()
+
+    def should_sample(self):
+        return self.sample_rate >= 1 or random() < self.sample_rate
+
+    def fulfill(self, allows, requirements, identity):
+        """
+        Performs a watched check on behalf of the
+        :class:`~flask_allows.allows.Allows` instance.
+        """
+        tracer = allows._make_tracer()
+        watch = _Watch(tracer, perf_counter_ns() + int(self.budget * 1e9))
+
+        self._watchdog.add(watch)
+        try:
+            trace = allows._run_tracer(tracer, requirements, identity)
+        finally:
+            self._watchdog.remove(watch)
+
+        if trace.elapsed > self.budget * 1e9:
+            self.callback(SlowCheck(self.budget, trace, watch.running, watch.stack))
+
+        if trace.error is not None:
+            raise trace.error
+
+        return trace.result
+
+
+class _Watch(object):
+    "Internal record of a check being watched"
+
+    def __init__(self, tracer, deadline):
+        self.tracer = tracer
+        self.deadline = deadline
+        self.thread_id = _get_ident()
+        self.done = False
+        self.queued = True
+        self.running = ()
+        self.stack = ()
+
+    def sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        # copy before formatting the stack, the check is still running
+        running = list(self.tracer.active)
+        if frame is not None:
+            self.stack = traceback.format_stack(frame)
+        self.running = running
+
+
+class _Watchdog(object):
+    """
+    Internal helper that owns a single background thread and samples watched
+    checks once their deadline passes.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._heap = []
+        self._counter = count()
+        self._thread = None
+        # watches in the heap that are still running
+        self._pending = 0
+        self._sampling = None
+
+    def add(self, watch):
+        with self._condition:
+            heapq.heappush(self._heap, (watch.deadline, next(self._counter), watch))
+            self._pending += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="flask-allows-watchdog"
+                )
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify_all()
+
+    def remove(self, watch):
+        with self._condition:
+            watch.done = True
+            if watch.queued:
+                watch.queued = False
+                self._pending -= 1
+                # done watches are skipped once they reach the top, drop them
+                # early so long budgets don't grow the heap with every check
+                if len(self._heap) > 2 * self._pending:
+                    self._heap = [e for e in self._heap if not e[2].done]
+                    heapq.heapify(self._heap)
+
+            # the report reads the sample, wait for it to be complete
+            while self._sampling is watch:
+                self._condition.wait()
+
+    def _run(self):
+        with self._condition:
+            while True:
+                while self._heap and self._heap[0][2].done:
+                    heapq.heappop(self._heap)
+
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+
+                deadline, _, watch = self._heap[0]
+                remaining = deadline - perf_counter_ns()
+
+                if remaining > 0:
+                    self._condition.wait(remaining / 1e9)
+                    continue
+
+                heapq.heappop(self._heap)
+                watch.queued = False
+                self._pending -= 1
+                self._sampling = watch
+
+                # sample without the lock so checks can still be added and
+                # removed while the stack is formatted
+                self._condition.release()
+                try:
+                    watch.sample()
+                finally:
+                    self._condition.acquire()
+                    self._sampling = None
+                    self._condition.notify_all()
+
+
+def _get_ident():
+    try:
+        return threading.get_ident()
+    except AttributeError:  # pragma: no cover
+        return threading._get_ident()
+
+
+def _log_slow_check(slow_check):
+    logger.warning(slow_check.format())
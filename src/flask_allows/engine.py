@@ -0,0 +1,483 @@
+"""
+Evaluation of requirements that doesn't depend on Flask. The
+:class:`~flask_allows.allows.Allows` extension delegates to an
+:class:`Engine` after collecting the identity, overrides and additional
+requirements from the current contexts, while code running outside of any
+Flask context, such as task queue workers, may use an engine directly.
+"""
+
+import sys
+import warnings
+from itertools import chain, islice
+
+from ._compat import perf_counter_ns
+from .signals import requirement_evaluated, requirement_overridden
+
+__all__ = ("Engine",)
+
+
+class Engine(object):
+    """
+    Evaluates requirements, including nested conditional requirements,
+    against an explicitly provided identity, overrides and additional
+    requirements::
+
+        engine = Engine()
+
+        for document in documents:
+            if engine.fulfill([CanRead(document)], user):
+                index(document)
+
+    Overrides and additional requirements are never read from the current
+    contexts, so an engine behaves the same with or without an active
+    application or request context. Conditional requirements nested inside
+    of the checked requirements honor the provided overrides as well.
+
+    Signals are sent as they are when checking through
+    :class:`~flask_allows.allows.Allows`, with the endpoint reported as None
+    outside of requests.
+
+    The conditional requirements of a check, including those in additional
+    requirements, are treated as a single graph in which shared requirements
+    are one node. The nodes of each conditional requirement are indexed the
+    first time it's checked and checks without shared nodes don't pay for
+    sharing. Each node is evaluated at most once per check, so a
+    requirement shared by several conditional requirements is only called,
+    and only reported, the first time it's reached::
+
+        is_active = And(is_member, Not(is_banned))
+
+        # is_member and is_banned are called at most once each
+        engine.fulfill([Or(is_admin, is_active), Or(is_moderator, is_active)], user)
+
+    Requirements whose class sets ``shareable`` to True, declaring that
+    equal instances always decide the same, are merged with equal ones.
+    :class:`~flask_allows.requirements.ConditionalRequirement` compares
+    structurally and is shareable when everything nested in it is shareable
+    or only equal to itself, such as functions. Other requirements are only
+    shared with themselves and unhashable requirements are evaluated every
+    time they're reached.
+
+    .. versionadded:: 0.8.0
+    """
+
+    __slots__ = ()
+
+    def fulfill(
+        self, requirements, identity, overrides=None, additional=None, request=None
+    ):
+        """
+        Checks that the identity meets each requirement.
+
+        :param requirements: The requirements to check the identity against
+        :param identity: The identity to check
+        :param overrides: Optional. An :class:`~flask_allows.overrides.Override`
+            of requirements to skip
+        :param additional: Optional. An
+            :class:`~flask_allows.additional.Additional` of requirements to
+            check before the provided requirements
+        :param request: Optional. Passed to old style requirements that accept
+            a request, defaults to the current Flask request if there is one.
+        """
+        if not isinstance(requirements, (list, tuple)):
+            requirements = list(requirements)
+
+        if not additional and not overrides:
+            # fast path for the common case of empty contexts, a plain loop
+            # doesn't allocate the iterators and generators needed below
+            memo = _memo(requirements)
+            for r in requirements:
+                if not _evaluate(r, identity, None, request, memo):
+                    return False
+            return True
+
+        if additional:
+            requirements = list(chain(additional, requirements))
+
+        memo = _memo(requirements)
+        all_requirements = iter(requirements)
+
+        if overrides:
+            all_requirements = _without_overridden(
+                all_requirements, overrides, identity
+            )
+
+        return all(
+            _evaluate(r, identity, overrides, request, memo) for r in all_requirements
+        )
+
+    def filter(
+        self,
+        items,
+        requirement_factory,
+        identity,
+        overrides=None,
+        additional=None,
+        chunk_size=None,
+    ):
+        """
+        Lazily yields each item of ``items`` that the identity may access.
+        ``requirement_factory`` is called with each item and returns a
+        requirement, or a list of requirements, for the item::
+
+            for document in engine.filter(documents, CanRead, user):
+                export(document)
+
+        Items are consumed from ``items`` only as they are needed, so
+        filtering a large result set doesn't hold it in memory. Additional
+        requirements can't depend on the item and are checked once, no items
+        are yielded if they aren't met.
+
+        When ``chunk_size`` is given, items are checked that many at a time
+        and requirements whose class provides a ``fulfill_batch`` class
+        method are checked together, see
+        :meth:`~flask_allows.relations.Relation.fulfill_batch`. Batching is
+        skipped while receivers are connected to
+        :data:`~flask_allows.signals.requirement_evaluated`, so each
+        requirement is reported.
+
+        :param items: The items to filter
+        :param requirement_factory: Callable accepting an item and returning
+            its requirements
+        :param identity: The identity to check
+        :param overrides: Optional. An :class:`~flask_allows.overrides.Override`
+            of requirements to skip
+        :param additional: Optional. An
+            :class:`~flask_allows.additional.Additional` of requirements to
+            check once before any item
+        :param chunk_size: Optional. Number of items to check at once
+        """
+        if additional and not self.fulfill(additional, identity, overrides):
+            return
+
+        if not chunk_size:
+            for item in items:
+                requirements = _listed(requirement_factory(item))
+                if self.fulfill(requirements, identity, overrides):
+                    yield item
+            return
+
+        items = iter(items)
+        while True:
+            chunk = list(islice(items, chunk_size))
+            if not chunk:
+                return
+
+            requirements = [_listed(requirement_factory(item)) for item in chunk]
+            results = self._fulfill_chunk(requirements, identity, overrides)
+            for item, result in zip(chunk, results):
+                if result:
+                    yield item
+
+    def _fulfill_chunk(self, requirements, identity, overrides):
+        """
+        Checks the requirements of each item of a chunk, batching
+        requirements whose class supports it, and returns the result for
+        each item.
+        """
+        results = [True] * len(requirements)
+        remaining = [[] for _ in requirements]
+        batches = {}
+        batching = not requirement_evaluated.receivers
+
+        for i, item_requirements in enumerate(requirements):
+            if overrides:
+                item_requirements = _without_overridden(
+                    item_requirements, overrides, identity
+                )
+            for r in item_requirements:
+                if batching and hasattr(r.__class__, "fulfill_batch"):
+                    batches.setdefault(r.__class__, []).append((i, r))
+                else:
+                    remaining[i].append(r)
+
+        for cls, batch in batches.items():
+            batch_results = cls.fulfill_batch([r for _, r in batch], identity)
+            for (i, _), result in zip(batch, batch_results):
+                if not result:
+                    results[i] = False
+
+        for i, item_requirements in enumerate(remaining):
+            if results[i] and item_requirements:
+                results[i] = self.fulfill(item_requirements, identity, overrides)
+
+        return results
+
+
+def _evaluate(requirement, user, overrides, request, memo=None):
+    """
+    Internal helper that evaluates a single requirement, walking plain
+    conditional requirements itself so the explicit overrides apply to their
+    children. When given a memo, see :func:`_memo`, the results of nodes
+    shared with others are reused.
+    """
+    # the class lookup is inlined as this runs for every node of every check
+    walk = _conditional_classes.get(requirement.__class__)
+    if walk is None:
+        walk = _is_conditional(requirement)
+
+    if memo is not None:
+        key = memo[0].get(id(requirement))
+        if key is not None:
+            results = memo[1]
+            result = results.get(key, _missing)
+            if result is _missing:
+                result = results[key] = _evaluate_node(
+                    requirement, user, overrides, request, walk, memo
+                )
+            return result
+
+    return _evaluate_node(requirement, user, overrides, request, walk, memo)
+
+
+def _evaluate_node(requirement, user, overrides, request, walk, memo):
+    if requirement_evaluated.receivers:
+        if walk:
+            return _call_instrumented(
+                requirement, user, walk, requirement, user, overrides, request, memo
+            )
+        return _call_instrumented(
+            requirement, user, _invoke_requirement, requirement, user, request
+        )
+
+    if walk:
+        return walk(requirement, user, overrides, request, memo)
+    return _invoke_requirement(requirement, user, request)
+
+
+_missing = object()
+
+
+def _memo(requirements):
+    """
+    Returns the memo of a check of ``requirements``, a mapping of the ids of
+    the nodes reached more than once to the key their result is stored under
+    along with an empty mapping of those results, or None when no node is
+    shared. Checks without conditional requirements share nothing and don't
+    allocate anything here.
+    """
+    roots = 0
+    for r in requirements:
+        if _is_conditional(r):
+            roots += 1
+
+    if not roots:
+        return None
+
+    if len(requirements) == 1:
+        shared = _graph(requirements[0])[1]
+    else:
+        nodes = {}
+        for r in requirements:
+            if _is_conditional(r):
+                for key, ids in _graph(r)[0].items():
+                    nodes.setdefault(key, []).extend(ids)
+            else:
+                nodes.setdefault(_share_key(r, False), []).append(id(r))
+        shared = _aliases(nodes)
+
+    if not shared:
+        return None
+    return shared, {}
+
+
+def _graph(conditional):
+    """
+    Returns the nodes reachable from ``conditional``, mapping the key of each
+    distinct node to the ids of the requirements reaching it, and the
+    aliases of the nodes reached more than once. Conditional requirements
+    don't change after creation, so this is only worked out once for each.
+    """
+    try:
+        return conditional._graph
+    except AttributeError:
+        pass
+
+    nodes = {}
+    pending = [conditional]
+    while pending:
+        r = pending.pop()
+        walk = _is_conditional(r)
+        key = _share_key(r, walk)
+
+        if key in nodes:
+            # nodes beneath it are only reached through it
+            nodes[key].append(id(r))
+            continue
+
+        nodes[key] = [id(r)]
+        if walk:
+            pending.extend(r.requirements)
+
+    conditional._graph = graph = (nodes, _aliases(nodes))
+    return graph
+
+
+def _aliases(nodes):
+    aliases = {}
+    for ids in nodes.values():
+        if len(ids) > 1:
+            for i in ids:
+                aliases[i] = ids[0]
+    return aliases
+
+
+def _share_key(requirement, walk):
+    """
+    Shareable requirements are merged with equal ones, anything else may
+    compare equal while deciding differently and is keyed by its identity.
+    """
+    if walk:
+        shared = requirement.shareable
+    else:
+        shared = getattr(requirement.__class__, "shareable", False) is True
+
+    if shared:
+        try:
+            hash(requirement)
+            return requirement
+        except TypeError:
+            pass
+    return id(requirement)
+
+
+def _fulfill_conditional(conditional, user, overrides, request, memo=None):
+    reduced = None
+    requirements = conditional.requirements
+
+    # an empty override context can't skip anything, iterating the
+    # requirements directly avoids allocating a filtering generator
+    if overrides:
+        requirements = _without_overridden(requirements, overrides, user)
+
+    for r in requirements:
+        result = _evaluate(r, user, overrides, request, memo)
+
+        if reduced is None:
+            reduced = result
+        else:
+            reduced = conditional.op(reduced, result)
+
+        if conditional.until == reduced:
+            break
+
+    if reduced is not None:
+        return not reduced if conditional.negated else reduced
+
+    return True
+
+
+# maps classes of conditional requirements that are walked rather than called
+# to the function evaluating them, or False for any other class. Subclasses
+# providing their own fulfill are called unless registered here. Functions
+# accept the requirement, user, overrides, request and the memo of the check
+_conditional_classes = {}
+
+
+def _is_conditional(requirement):
+    cls = requirement.__class__
+
+    try:
+        return _conditional_classes[cls]
+    except KeyError:
+        pass
+
+    from .requirements import ConditionalRequirement
+
+    if (
+        issubclass(cls, ConditionalRequirement)
+        and cls.fulfill is ConditionalRequirement.fulfill
+    ):
+        rv = _fulfill_conditional
+    else:
+        rv = False
+
+    _conditional_classes[cls] = rv
+    return rv
+
+
+def _call_requirement(req, user, request):
+    if requirement_evaluated.receivers:
+        return _call_instrumented(req, user, _invoke_requirement, req, user, request)
+    return _invoke_requirement(req, user, request)
+
+
+def _invoke_requirement(req, user, request):
+    try:
+        return req(user)
+    except TypeError:
+        warnings.warn(
+            "{!r}: Passing request to requirements is now deprecated"
+            " and will be removed in 1.0".format(req),
+            DeprecationWarning,
+            stacklevel=2,
+        )
+
+        if request is None:
+            request = _current_request()
+        return req(user, request)
+
+
+def _call_instrumented(req, user, evaluate, *args):
+    start = perf_counter_ns()
+
+    try:
+        result = evaluate(*args)
+    except Exception as e:
+        requirement_evaluated.send(
+            req,
+            user=user,
+            result=None,
+            elapsed=perf_counter_ns() - start,
+            endpoint=_current_endpoint(),
+            error=e,
+        )
+        raise
+
+    requirement_evaluated.send(
+        req,
+        user=user,
+        result=result,
+        elapsed=perf_counter_ns() - start,
+        endpoint=_current_endpoint(),
+        error=None,
+    )
+    return result
+
+
+def _without_overridden(requirements, overrides, user):
+    if requirement_overridden.receivers:
+        return _signal_overridden(requirements, overrides, user)
+    return (r for r in requirements if r not in overrides)
+
+
+def _signal_overridden(requirements, overrides, user):
+    for r in requirements:
+        if r not in overrides:
+            yield r
+        else:
+            requirement_overridden.send(r, user=user, endpoint=_current_endpoint())
+
+
+def _listed(requirements):
+    if isinstance(requirements, (list, tuple)):
+        return requirements
+    return [requirements]
+
+
+def _current_request():
+    """
+    Returns Flask's request proxy if Flask has been imported, without
+    importing it otherwise. No request can be active before Flask is imported.
+    """
+    flask = sys.modules.get("flask")
+    if flask is None:
+        return None
+    return flask.request
+
+
+def _current_endpoint():
+    flask = sys.modules.get("flask")
+    if flask is None or not flask.has_request_context():
+        return None
+    return flask.request.endpoint
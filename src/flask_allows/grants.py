@@ -0,0 +1,423 @@
+"""
+Permission and role requirements backed by bitmasks. Each name is assigned a
+bit by a :class:`GrantRegistry` so an identity's grants are a single integer,
+and ``And``, ``Or`` and ``Not`` combinations of grant requirements are
+compiled into a handful of mask tests rather than walked node by node.
+"""
+
+import numbers
+import operator
+import threading
+
+from .engine import _conditional_classes, _fulfill_conditional
+from .overrides import current_overrides
+from .requirements import ConditionalRequirement, Requirement
+
+__all__ = (
+    "GrantRegistry",
+    "HasPermission",
+    "HasRole",
+    "CompiledGrants",
+    "compile_requirement",
+    "permissions",
+    "roles",
+)
+
+
+class GrantRegistry(object):
+    """
+    Assigns each permission or role name a bit and loads the grants of
+    identities as integer masks.
+
+    Names are registered the first time they are seen, either in a
+    requirement or in the grants of an identity, and keep their bit for the
+    lifetime of the registry.
+
+    :param loader: Optional. A callable accepting an identity and returning
+        either the names granted to it or a mask already built with
+        :meth:`mask`, defaults to reading the ``attribute`` of the identity
+    :param attribute: Optional. The attribute read by the default loader
+    :param hierarchy: Optional. A :class:`~flask_allows.hierarchy.RoleHierarchy`
+        expanding loaded grants with the grants they imply, usually attached
+        by the hierarchy itself
+
+    Returning a precomputed mask, for example one stored on the user when it
+    is loaded, skips translating the names on every check::
+
+        def load_user(user_id):
+            user = User.query.get(user_id)
+            user.permission_mask = permissions.mask(user.permission_names)
+            return user
+
+        permissions.loader = lambda user: user.permission_mask
+
+    .. versionadded:: 0.8.0
+    """
+
+    def __init__(self, loader=None, attribute="permissions", hierarchy=None):
+        self.loader = loader or operator.attrgetter(attribute)
+        self.hierarchy = hierarchy
+        # bits are stored by position, an integer with a high bit set is as
+        # large as the position of that bit
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def bit(self, name):
+        """
+        Returns the bit assigned to ``name``, registering it if needed.
+        """
+        return 1 << self.index(name)
+
+    def index(self, name):
+        """
+        Returns the position of the bit assigned to ``name``, registering it
+        if needed.
+        """
+        try:
+            return self._indexes[name]
+        except KeyError:
+            pass
+
+        with self._lock:
+            # another thread may have registered the name meanwhile
+            index = self._indexes.get(name)
+            if index is None:
+                index = self._indexes[name] = len(self._indexes)
+            return index
+
+    def mask(self, names):
+        """
+        Returns the mask with the bit of each of ``names`` set.
+        """
+        mask = 0
+        for name in names:
+            mask |= self.bit(name)
+        return mask
+
+    def names(self, mask):
+        """
+        Returns the set of registered names whose bits are set in ``mask``.
+        """
+        # names may be registered by other threads while iterating
+        with self._lock:
+            indexes = list(self._indexes.items())
+        return {name for name, index in indexes if mask >> index & 1}
+
+    def grants(self, identity):
+        """
+        Returns the mask of everything granted to ``identity``, including
+        grants implied by the hierarchy if there is one.
+        """
+        granted = self.loader(identity)
+        if not isinstance(granted, numbers.Integral):
+            granted = self.mask(granted)
+        if self.hierarchy is not None:
+            granted = self.hierarchy.effective(granted)
+        return granted
+
+    def __len__(self):
+        return len(self._indexes)
+
+    def __repr__(self):
+        return "<GrantRegistry names={}>".format(len(self))
+
+
+#: Default registry of :class:`HasPermission`, reads ``identity.permissions``
+permissions = GrantRegistry(attribute="permissions")
+#: Default registry of :class:`HasRole`, reads ``identity.roles``
+roles = GrantRegistry(attribute="roles")
+
+
+class _Grant(Requirement):
+    """
+    Base of requirements fulfilled when the identity holds every one of the
+    named grants of a registry.
+    """
+
+    __slots__ = ("names", "registry", "mask")
+
+    #: The registry used when none is passed to the constructor
+    default_registry = None
+
+    def __init__(self, name, *names, **kwargs):
+        registry = kwargs.get("registry")
+        self.names = (name,) + names
+        self.registry = self.default_registry if registry is None else registry
+        self.mask = self.registry.mask(self.names)
+
+    def fulfill(self, user):
+        mask = self.mask
+        return self.registry.grants(user) & mask == mask
+
+    def __and__(self, require):
+        return _combine(ConditionalRequirement.And, self, require)
+
+    def __or__(self, require):
+        return _combine(ConditionalRequirement.Or, self, require)
+
+    def __invert__(self):
+        return CompiledGrants.Not(self)
+
+    def __eq__(self, other):
+        return (
+            self.__class__ is other.__class__
+            and self.registry is other.registry
+            and self.mask == other.mask
+        )
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.__class__, self.mask))
+
+    def __repr__(self):
+        return "<{}({})>".format(
+            self.__class__.__name__, ", ".join(repr(n) for n in self.names)
+        )
+
+
+class HasPermission(_Grant):
+    """
+    Requirement fulfilled when the identity holds every named permission::
+
+        requires(HasPermission("post.edit"))
+        requires(HasPermission("post.edit") | HasPermission("post.moderate"))
+
+    Combining permissions with ``&``, ``|`` and ``~`` builds
+    :class:`CompiledGrants`, other combinations can be compiled with
+    :func:`compile_requirement`.
+
+    :param names: The permissions required
+    :param registry: Optional, Keyword only. The :class:`GrantRegistry` to
+        use, defaults to :data:`permissions`
+
+    .. versionadded:: 0.8.0
+    """
+
+    __slots__ = ()
+
+    default_registry = permissions
+
+
+class HasRole(_Grant):
+    """
+    Requirement fulfilled when the identity holds every named role, the role
+    counterpart of :class:`HasPermission`.
+
+    :param names: The roles required
+    :param registry: Optional, Keyword only. The :class:`GrantRegistry` to
+        use, defaults to :data:`roles`
+
+    .. versionadded:: 0.8.0
+    """
+
+    __slots__ = ()
+
+    default_registry = roles
+
+
+class CompiledGrants(ConditionalRequirement):
+    """
+    Conditional requirement combining only :class:`HasPermission` or
+    :class:`HasRole` requirements of a single registry, possibly nested in
+    further conditional requirements. The whole tree is compiled into mask
+    tests of the identity's grants when it is constructed, so ``And`` becomes
+    ``grants & required == required`` and ``Or`` becomes
+    ``grants & any_of != 0``::
+
+        CompiledGrants.Or(HasRole("admin"), HasRole("editor"))
+
+    Compiled requirements compare equal to the equivalent
+    :class:`~flask_allows.requirements.ConditionalRequirement` so overriding
+    either overrides both. While the override context isn't empty the tree
+    is walked instead, skipping overridden requirements as usual.
+
+    :raises ValueError: If the tree contains other requirements or
+        reductions other than ``And``, ``Or`` and ``Not``
+
+    .. versionadded:: 0.8.0
+    """
+
+    __slots__ = ("registry", "test")
+
+    def __init__(self, *requirements, **kwargs):
+        super(CompiledGrants, self).__init__(*requirements, **kwargs)
+        self.registry = _registry_of(self)
+        if self.registry is None:
+            raise ValueError(
+                "{!r} can't be compiled, only And, Or and Not combinations of"
+                " grants from a single registry can be".format(self)
+            )
+        self.test = _test(_form(self))
+
+    def fulfill(self, user, request=None):
+        return _fulfill_compiled(
+            self, user, current_overrides._get_current_object(), request
+        )
+
+    def __and__(self, require):
+        return _combine(ConditionalRequirement.And, self, require)
+
+    def __or__(self, require):
+        return _combine(ConditionalRequirement.Or, self, require)
+
+    def __invert__(self):
+        return CompiledGrants.Not(self)
+
+
+def compile_requirement(requirement):
+    """
+    Returns an equivalent of ``requirement`` where every conditional
+    requirement made up solely of grants of a single registry is replaced by
+    :class:`CompiledGrants`. Other requirements, and trees without any
+    grants to compile, are returned unchanged::
+
+        policy = compile_requirement(
+            Or(is_owner, And(HasRole("editor"), HasPermission("post.edit")))
+        )
+
+    .. versionadded:: 0.8.0
+    """
+    if requirement.__class__ is not ConditionalRequirement:
+        return requirement
+
+    if _registry_of(requirement) is not None:
+        factory = CompiledGrants
+        children = requirement.requirements
+    else:
+        factory = ConditionalRequirement
+        children = [compile_requirement(r) for r in requirement.requirements]
+
+        # nothing to compile, keep sharing the original tree
+        if all(c is r for c, r in zip(children, requirement.requirements)):
+            return requirement
+
+    return factory(
+        *children,
+        op=requirement.op,
+        until=requirement.until,
+        negated=requirement.negated
+    )
+
+
+def _combine(reducer, left, right):
+    combined = reducer(left, right)
+    if _registry_of(combined) is None:
+        return combined
+    return CompiledGrants(
+        *combined.requirements,
+        op=combined.op,
+        until=combined.until,
+        negated=combined.negated
+    )
+
+
+def _fulfill_compiled(requirement, user, overrides, request, memo=None):
+    if overrides:
+        return _fulfill_conditional(requirement, user, overrides, request, memo)
+    return requirement.test(requirement.registry.grants(user))
+
+
+_conditional_classes[CompiledGrants] = _fulfill_compiled
+
+_ALL, _ANY = "all", "any"
+
+
+def _reduction(requirement):
+    """
+    Returns whether a conditional requirement reduces with and or or, None
+    for any other reduction.
+    """
+    if requirement.op is operator.and_ and requirement.until in (None, False):
+        return _ALL
+    if requirement.op is operator.or_ and requirement.until in (None, True):
+        return _ANY
+    return None
+
+
+def _registry_of(requirement):
+    """
+    Returns the registry shared by every grant in a tree of and and or
+    reductions, or None if the tree holds anything else.
+    """
+    registries = set()
+    if not _collect_registries(requirement, registries) or len(registries) != 1:
+        return None
+    return registries.pop()
+
+
+def _collect_registries(requirement, registries):
+    if isinstance(requirement, _Grant):
+        registries.add(requirement.registry)
+        return True
+
+    if not isinstance(requirement, ConditionalRequirement):
+        return False
+    if _reduction(requirement) is None:
+        return False
+
+    return all(_collect_registries(r, registries) for r in requirement.requirements)
+
+
+def _form(requirement):
+    """
+    Reduces a compilable tree to ``(kind, mask, tests, negated)`` meaning
+    that all or any of the bits of mask must be set, combined in the same way
+    with the results of the nested tests.
+    """
+    if isinstance(requirement, _Grant):
+        return _ALL, requirement.mask, (), False
+
+    if not requirement.requirements:
+        # conditional requirements without any requirements are fulfilled,
+        # even when negated
+        return _ALL, 0, (), False
+
+    kind = _reduction(requirement)
+    mask, tests = 0, []
+
+    for r in requirement.requirements:
+        child = _form(r)
+        child_kind, child_mask, child_tests, child_negated = child
+        mergeable = not child_tests and not child_negated
+
+        if mergeable and (child_kind == kind and child_mask or _single_bit(child_mask)):
+            mask |= child_mask
+        else:
+            tests.append(_test(child))
+
+    return kind, mask, tuple(tests), bool(requirement.negated)
+
+
+def _single_bit(mask):
+    return mask and not mask & (mask - 1)
+
+
+def _test(form):
+    """
+    Builds a function accepting the grants of an identity from a form.
+    """
+    kind, mask, tests, negated = form
+
+    if kind is _ALL:
+        if not tests:
+            if negated:
+                return lambda grants: grants & mask != mask
+            return lambda grants: grants & mask == mask
+
+        def test(grants):
+            return grants & mask == mask and all(t(grants) for t in tests)
+
+    else:
+        if not tests:
+            if negated:
+                return lambda grants: not grants & mask
+            return lambda grants: grants & mask != 0
+
+        def test(grants):
+            return grants & mask != 0 or any(t(grants) for t in tests)
+
+    if negated:
+        return lambda grants: not test(grants)
+    return test
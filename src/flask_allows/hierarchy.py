@@ -0,0 +1,232 @@
+"""
+Hierarchies of roles where holding a role implies holding the roles beneath
+it. The transitive closure of the hierarchy is kept as a mask of the implied
+roles of each role so the effective roles of an identity are found with a
+single lookup.
+"""
+
+import threading
+
+from .grants import roles
+
+__all__ = ("RoleHierarchy",)
+
+
+class RoleHierarchy(object):
+    """
+    Expands the roles of identities loaded by a
+    :class:`~flask_allows.grants.GrantRegistry` with every role their roles
+    imply::
+
+        hierarchy = RoleHierarchy(
+            {"owner": ["admin"], "admin": ["editor"], "editor": ["viewer"]}
+        )
+
+        # passes for owners, admins and editors
+        requires(HasRole("editor"))
+
+    The hierarchy attaches itself to the registry when constructed so
+    :class:`~flask_allows.grants.HasRole` and compiled combinations of roles
+    check the effective roles from then on.
+
+    The transitive closure of every role is computed up front and kept up to
+    date as roles are added and removed, and the effective roles of each
+    distinct combination of held roles are cached, so checks don't walk the
+    hierarchy. Edits replace the closure and the cache at once, checks made
+    concurrently see either the old or the new hierarchy.
+
+    :param implied: Optional. Mapping of roles to the roles they imply
+    :param registry: Optional. The registry to attach to, defaults to
+        :data:`~flask_allows.grants.roles`
+    :param cache_size: Optional. Number of combinations of held roles to
+        cache the effective roles of, the cache is emptied when full
+    :raises ValueError: If the roles imply each other in a cycle
+
+    .. versionadded:: 0.8.0
+    """
+
+    def __init__(self, implied=None, registry=None, cache_size=1024):
+        self.registry = roles if registry is None else registry
+        self.cache_size = cache_size
+        self._children = {}
+        self._parents = {}
+        self._lock = threading.Lock()
+
+        for role, children in (implied or {}).items():
+            self._link(role, children)
+
+        closures = {}
+        for role in self._children:
+            _close(role, self._children, closures, self.registry.bit)
+        self._check_acyclic(closures)
+
+        self._state = (_by_index(closures, self.registry), {})
+        self.registry.hierarchy = self
+
+    def add(self, role, *implied):
+        """
+        Makes ``role`` imply each of ``implied`` as well as everything they
+        imply, updating the closure of ``role`` and of the roles implying it.
+
+        :raises ValueError: If any of ``implied`` already implies ``role``
+        """
+        with self._lock:
+            closures = dict(self._state[0])
+            bit = self.registry.bit(role)
+            added = 0
+
+            for child in implied:
+                index = self.registry.index(child)
+                closure = closures.get(index, 0) | 1 << index
+                if closure & bit:
+                    raise ValueError(
+                        "{!r} implies {!r}, it can't also be implied by it".format(
+                            child, role
+                        )
+                    )
+                added |= closure
+
+            self._link(role, implied)
+
+            for ancestor in self._ancestors(role):
+                index = self.registry.index(ancestor)
+                closures[index] = closures.get(index, 0) | added
+
+            self._state = (closures, {})
+
+    def remove(self, role, *implied):
+        """
+        Stops ``role`` from directly implying each of ``implied``, then
+        recomputes the closure of ``role`` and of the roles implying it.
+        """
+        with self._lock:
+            children = self._children.get(role, set())
+            for child in implied:
+                children.discard(child)
+                self._parents.get(child, set()).discard(role)
+
+            closures = dict(self._state[0])
+            affected = self._ancestors(role)
+            recomputed = {}
+
+            # roles beneath the affected roles keep their closures
+            for ancestor in affected:
+                for child in self._children.get(ancestor, ()):
+                    if child not in affected:
+                        recomputed[child] = closures.get(self.registry.index(child), 0)
+
+            for ancestor in affected:
+                _close(ancestor, self._children, recomputed, self.registry.bit)
+
+            for ancestor in affected:
+                index = self.registry.index(ancestor)
+                if recomputed[ancestor]:
+                    closures[index] = recomputed[ancestor]
+                else:
+                    closures.pop(index, None)
+
+            self._state = (closures, {})
+
+    def implies(self, role, other):
+        """
+        Returns True if holding ``role`` implies holding ``other``, including
+        when both are the same role.
+        """
+        index = self.registry.index(role)
+        closure = self._state[0].get(index, 0) | 1 << index
+        return bool(closure & self.registry.bit(other))
+
+    def effective(self, mask):
+        """
+        Returns the mask of every role held or implied by the roles in
+        ``mask``.
+        """
+        closures, cache = self._state
+
+        try:
+            return cache[mask]
+        except KeyError:
+            pass
+
+        effective = held = mask
+        while held:
+            bit = held & -held
+            effective |= closures.get(bit.bit_length() - 1, 0)
+            held ^= bit
+
+        if len(cache) >= self.cache_size:
+            cache.clear()
+        cache[mask] = effective
+        return effective
+
+    def _link(self, role, children):
+        self._children.setdefault(role, set()).update(children)
+        for child in children:
+            self._parents.setdefault(child, set()).add(role)
+
+    def _ancestors(self, role):
+        "Returns role and every role implying it"
+        seen = {role}
+        pending = [role]
+
+        while pending:
+            for parent in self._parents.get(pending.pop(), ()):
+                if parent not in seen:
+                    seen.add(parent)
+                    pending.append(parent)
+
+        return seen
+
+    def _check_acyclic(self, closures):
+        for role, closure in closures.items():
+            for child in self._children.get(role, ()):
+                below = closures[child] | self.registry.bit(child)
+                if below & self.registry.bit(role):
+                    raise ValueError(
+                        "{!r} and {!r} imply each other".format(role, child)
+                    )
+
+
+def _close(role, children, closures, bit):
+    """
+    Computes the closure of ``role`` and of every role beneath it that isn't
+    already in ``closures``.
+    """
+    # iterative post order walk, hierarchies may be deeper than the
+    # recursion limit
+    pending = [(role, False)]
+    visiting = set()
+
+    while pending:
+        current, expanded = pending.pop()
+        if current in closures:
+            continue
+
+        below = children.get(current, ())
+        if not expanded:
+            visiting.add(current)
+            pending.append((current, True))
+            pending.extend(
+                (child, False)
+                for child in below
+                if child not in closures and child not in visiting
+            )
+            continue
+
+        closure = 0
+        for child in below:
+            # children missing a closure are only reachable through a cycle,
+            # which is reported once every closure has been computed
+            closure |= closures.get(child, 0) | bit(child)
+        closures[current] = closure
+
+    return closures[role]
+
+
+def _by_index(closures, registry):
+    # closures are keyed by the position of the role's bit and roles that
+    # don't imply any others are left out, an integer with a high bit set is
+    # large even when few bits are set
+    return {
+        registry.index(role): closure for role, closure in closures.items() if closure
+    }
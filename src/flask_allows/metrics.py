@@ -0,0 +1,628 @@
+import atexit
+import json
+import os
+import threading
+import weakref
+from bisect import bisect_left
+
+from flask import Response, current_app, has_app_context
+
+from .breakers import CLOSED, HALF_OPEN, OPEN
+from .requirements import _describe_requirement
+from .signals import (
+    breaker_rejected,
+    breaker_state_changed,
+    fulfill_finished,
+    requirement_evaluated,
+    requirement_overridden,
+    requirement_timed_out,
+)
+
+__all__ = ("MetricsRegistry", "metrics_view", "DEFAULT_BUCKETS", "OTHER")
+
+#: Default latency histogram bucket boundaries, in seconds.
+DEFAULT_BUCKETS = (
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+
+OUTCOMES = ("allow", "deny", "overridden", "error", "timeout", "rejected")
+ALLOW, DENY, OVERRIDDEN, ERROR, TIMEOUT, REJECTED = range(len(OUTCOMES))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_FILE_PREFIX = "flask-allows-metrics-"
+
+#: Label decisions of requirements are recorded under once a registry tracks
+#: its maximum number of requirement labels.
+OTHER = "other"
+
+# requirements whose label is remembered, the cache is emptied when full
+_MAX_CACHED_LABELS = 1024
+
+
+class _Series(object):
+    """
+    Decision counts and a latency histogram for a single label set. The
+    histogram buckets are allocated up front and observations only ever
+    increment existing slots.
+    """
+
+    __slots__ = ("counts", "buckets", "total", "lock")
+
+    def __init__(self, size):
+        self.counts = [0] * len(OUTCOMES)
+        self.buckets = [0] * (size + 1)
+        self.total = 0
+        self.lock = threading.Lock()
+
+    def observe(self, outcome, index, elapsed):
+        with self.lock:
+            self.counts[outcome] += 1
+            if index is not None:
+                self.buckets[index] += 1
+                self.total += elapsed
+
+    def count(self, outcome):
+        with self.lock:
+            self.counts[outcome] += 1
+
+    def merge(self, counts, buckets, total):
+        with self.lock:
+            for i, value in enumerate(counts):
+                self.counts[i] += value
+            for i, value in enumerate(buckets):
+                self.buckets[i] += value
+            self.total += total
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.counts), list(self.buckets), self.total
+
+
+class MetricsRegistry(object):
+    """
+    In process registry that aggregates authorization decisions and latencies
+    per requirement and per endpoint and renders them in the Prometheus text
+    exposition format.
+
+    The registry collects information through the
+    :mod:`~flask_allows.signals` sent by Flask-Allows, so it requires blinker
+    to be installed. It is connected by passing it to the
+    :class:`~flask_allows.allows.Allows` extension::
+
+        metrics = MetricsRegistry()
+        allows = Allows(app, identity_loader=load_user, metrics=metrics)
+        app.add_url_rule("/metrics", view_func=metrics_view(metrics))
+
+    Requirements are labeled by their qualified name, requirement objects by
+    their ``repr`` and conditional requirements by the combination of their
+    children, e.g. ``Or(myapp.is_admin, <IsOwner()>)``. Series are kept per
+    label rather than per requirement, so requirements built for each object
+    or request, such as ``CanRead(document)``, share a series while their
+    ``repr`` is the same. At most ``max_requirements`` labels are tracked,
+    decisions of any further requirement are recorded under the
+    :data:`OTHER` label.
+
+    When running several worker processes, provide a ``directory`` that each
+    process periodically writes its own totals to. The rendered metrics are
+    then merged from every file found there::
+
+        metrics = MetricsRegistry(directory="/var/run/myapp/allows-metrics")
+
+    The directory should be emptied before the workers start.
+
+    Requirement decisions are signaled with the requirement as the sender, so
+    the registry can only tell which extension made a decision from the
+    current application. Decisions made in the context of an application
+    whose :class:`~flask_allows.allows.Allows` instance isn't connected to the
+    registry are ignored, decisions made outside of an application context
+    are always recorded.
+
+    :param buckets: Optional. Increasing latency histogram boundaries in
+        seconds, defaults to :data:`DEFAULT_BUCKETS`
+    :param directory: Optional. Directory to write per process totals into
+    :param flush_interval: Optional. Seconds between writes into
+        ``directory``, defaults to 15.
+    :param max_requirements: Optional. Maximum number of requirement labels
+        tracked, defaults to 1000.
+
+    .. versionadded:: 0.8.0
+    """
+
+    def __init__(
+        self,
+        buckets=DEFAULT_BUCKETS,
+        directory=None,
+        flush_interval=15,
+        max_requirements=1000,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.max_requirements = max_requirements
+
+        self._bounds = [int(b * 1e9) for b in self.buckets]
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._owners = weakref.WeakSet()
+        self._reset()
+
+        if directory is not None and hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _reset(self):
+        self._requirements = {}
+        self._label_cache = {}
+        self._checks = {}
+        self._breakers = {}
+        self._breaker_counts = {}
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._reset()
+
+    def init_allows(self, allows):
+        """
+        Connects the registry to the signals sent by the provided
+        :class:`~flask_allows.allows.Allows` instance. This is called
+        automatically when the registry is passed to the extension.
+        """
+        self._owners.add(allows)
+        requirement_evaluated.connect(self._on_requirement_evaluated)
+        requirement_overridden.connect(self._on_requirement_overridden)
+        requirement_timed_out.connect(self._on_requirement_timed_out)
+        breaker_state_changed.connect(self._on_breaker_state_changed)
+        breaker_rejected.connect(self._on_breaker_rejected)
+        fulfill_finished.connect(self._on_fulfill_finished, sender=allows)
+
+    def observe_requirement(self, requirement, outcome, elapsed, endpoint=None):
+        """
+        Records a single decision made by a requirement.
+
+        :param requirement: The requirement that made the decision
+        :param outcome: One of ``"allow"``, ``"deny"``, ``"overridden"``,
+            ``"error"``, ``"timeout"`` or ``"rejected"``
+        :param elapsed: Time spent in nanoseconds, or None if the requirement
+            was not evaluated
+        :param endpoint: Optional. The endpoint the decision was made for
+        """
+        self._observe_requirement(
+            requirement, OUTCOMES.index(outcome), elapsed, endpoint
+        )
+
+    def observe_check(self, outcome, elapsed, endpoint=None):
+        """
+        Records the outcome of a complete check.
+
+        :param outcome: One of ``"allow"``, ``"deny"`` or ``"error"``
+        :param elapsed: Time spent in nanoseconds
+        :param endpoint: Optional. The endpoint the check was made for
+        """
+        self._observe_check(OUTCOMES.index(outcome), elapsed, endpoint)
+
+    def _owns_current_app(self):
+        if not has_app_context():
+            return True
+        allows = current_app.extensions.get("allows")
+        return allows is None or allows in self._owners
+
+    def _on_requirement_evaluated(self, requirement, **kwargs):
+        if not self._owns_current_app():
+            return
+        if kwargs["error"] is not None:
+            outcome = ERROR
+        elif kwargs["result"]:
+            outcome = ALLOW
+        else:
+            outcome = DENY
+        self._observe_requirement(
+            requirement, outcome, kwargs["elapsed"], kwargs["endpoint"]
+        )
+
+    def _on_requirement_overridden(self, requirement, **kwargs):
+        if not self._owns_current_app():
+            return
+        self._observe_requirement(requirement, OVERRIDDEN, None, kwargs["endpoint"])
+
+    def _on_requirement_timed_out(self, requirement, **kwargs):
+        if not self._owns_current_app():
+            return
+        self._observe_requirement(requirement, TIMEOUT, None, kwargs["endpoint"])
+
+    def _on_breaker_state_changed(self, breaker, **kwargs):
+        self.track_breaker(breaker)
+
+    def _on_breaker_rejected(self, breaker, **kwargs):
+        if not self._owns_current_app():
+            return
+        self.track_breaker(breaker)
+        self._observe_requirement(
+            breaker.requirement, REJECTED, None, kwargs["endpoint"]
+        )
+
+    def track_breaker(self, breaker):
+        """
+        Reports the state of a :class:`~flask_allows.breakers.CircuitBreaker`.
+        Breakers are tracked automatically once they change state or reject a
+        check.
+        """
+        if breaker in self._breakers:
+            return
+
+        with self._lock:
+            self._breakers[breaker] = _describe_requirement(breaker.requirement)
+
+    def _on_fulfill_finished(self, sender, **kwargs):
+        if kwargs["error"] is not None:
+            outcome = ERROR
+        elif kwargs["result"]:
+            outcome = ALLOW
+        else:
+            outcome = DENY
+        self._observe_check(outcome, kwargs["elapsed"], kwargs["endpoint"])
+
+    def _observe_requirement(self, requirement, outcome, elapsed, endpoint):
+        series = self._requirement_series(requirement, endpoint)
+        if elapsed is None:
+            series.count(outcome)
+        else:
+            series.observe(outcome, bisect_left(self._bounds, elapsed), elapsed)
+
+    def _observe_check(self, outcome, elapsed, endpoint):
+        index = bisect_left(self._bounds, elapsed)
+        self._check_series(endpoint).observe(outcome, index, elapsed)
+
+        if self._flusher is None and self.directory is not None:
+            self._start_flusher()
+
+    def _requirement_series(self, requirement, endpoint):
+        return self._label_series(self._label(requirement), endpoint)
+
+    def _label(self, requirement):
+        """
+        Describes a requirement, remembering the labels of recently seen
+        requirements. The cache is bounded so requirements built per object
+        or per request aren't kept alive by it.
+        """
+        cache = self._label_cache
+        try:
+            label = cache.get(requirement)
+        except TypeError:
+            return _describe_requirement(requirement)
+
+        if label is None:
+            label = _describe_requirement(requirement)
+            if len(cache) >= _MAX_CACHED_LABELS:
+                cache.clear()
+            cache[requirement] = label
+        return label
+
+    def _label_series(self, label, endpoint):
+        by_endpoint = self._requirements.get(label)
+        if by_endpoint is not None:
+            series = by_endpoint.get(endpoint)
+            if series is not None:
+                return series
+
+        with self._lock:
+            if (
+                label not in self._requirements
+                and len(self._requirements) >= self.max_requirements
+            ):
+                label = OTHER
+
+            by_endpoint = self._requirements.setdefault(label, {})
+            return by_endpoint.setdefault(endpoint, _Series(len(self._bounds)))
+
+    def _check_series(self, endpoint):
+        series = self._checks.get(endpoint)
+        if series is not None:
+            return series
+
+        with self._lock:
+            return self._checks.setdefault(endpoint, _Series(len(self._bounds)))
+
+    def snapshot(self):
+        """
+        Returns the current totals as a JSON serializable dictionary.
+        """
+        requirements = {}
+
+        with self._lock:
+            items = [
+                (label, endpoint, series)
+                for label, by_endpoint in self._requirements.items()
+                for endpoint, series in by_endpoint.items()
+            ]
+            checks = list(self._checks.items())
+            breakers = list(self._breakers.items())
+            breaker_counts = dict(self._breaker_counts)
+
+        for breaker, label in breakers:
+            key = (label, breaker.state)
+            breaker_counts[key] = breaker_counts.get(key, 0) + 1
+
+        for label, endpoint, series in items:
+            _accumulate(requirements, (label, endpoint), series.snapshot())
+
+        return {
+            "buckets": list(self.buckets),
+            "requirements": [
+                [label, endpoint] + values
+                for (label, endpoint), values in sorted(
+                    requirements.items(), key=_sort_key
+                )
+            ],
+            "checks": [
+                [endpoint] + list(series.snapshot())
+                for endpoint, series in sorted(checks, key=_sort_key)
+            ],
+            "breakers": [
+                [label, state, value]
+                for (label, state), value in sorted(breaker_counts.items())
+            ],
+        }
+
+    def load(self, snapshot):
+        """
+        Adds the totals from a snapshot produced by :meth:`snapshot` into this
+        registry.
+
+        :param snapshot: A snapshot dictionary
+        """
+        if tuple(snapshot["buckets"]) != self.buckets:
+            raise ValueError("Cannot merge metrics with different buckets")
+
+        for label, endpoint, counts, buckets, total in snapshot["requirements"]:
+            series = self._label_series(label, endpoint)
+            series.merge(counts, buckets, total)
+
+        for endpoint, counts, buckets, total in snapshot["checks"]:
+            self._check_series(endpoint).merge(counts, buckets, total)
+
+        with self._lock:
+            for label, state, value in snapshot.get("breakers", ()):
+                key = (label, state)
+                self._breaker_counts[key] = self._breaker_counts.get(key, 0) + value
+
+    def flush(self):
+        """
+        Writes the totals of the current process into the configured directory.
+        """
+        if self.directory is None:
+            raise RuntimeError("MetricsRegistry was not configured with a directory")
+
+        path = os.path.join(
+            self.directory, "{}{}.json".format(_FILE_PREFIX, os.getpid())
+        )
+        tmp = "{}.tmp".format(path)
+
+        with open(tmp, "w") as fh:
+            json.dump(self.snapshot(), fh)
+
+        os.rename(tmp, path)
+
+    @classmethod
+    def merged(cls, directory, buckets=DEFAULT_BUCKETS):
+        """
+        Creates a new registry from every process' totals written into
+        ``directory``.
+        """
+        registry = cls(buckets=buckets)
+
+        for name in sorted(os.listdir(directory)):
+            if not (name.startswith(_FILE_PREFIX) and name.endswith(".json")):
+                continue
+            with open(os.path.join(directory, name)) as fh:
+                registry.load(json.load(fh))
+
+        return registry
+
+    def render(self):
+        """
+        Renders the registry in the Prometheus text exposition format. If a
+        directory is configured, the current process' totals are written out
+        and the totals of every process are rendered.
+        """
+        if self.directory is not None:
+            self.flush()
+            snapshot = self.merged(self.directory, self.buckets).snapshot()
+        else:
+            snapshot = self.snapshot()
+
+        lines = []
+
+        _render_counter(
+            lines,
+            "flask_allows_requirement_decisions_total",
+            "Authorization decisions made by individual requirements.",
+            [
+                ({"requirement": label, "endpoint": endpoint}, counts)
+                for label, endpoint, counts, _, _ in snapshot["requirements"]
+            ],
+        )
+        _render_histogram(
+            lines,
+            "flask_allows_requirement_duration_seconds",
+            "Time spent evaluating individual requirements.",
+            self.buckets,
+            [
+                ({"requirement": label, "endpoint": endpoint}, buckets, total)
+                for label, endpoint, _, buckets, total in snapshot["requirements"]
+            ],
+        )
+        _render_counter(
+            lines,
+            "flask_allows_check_decisions_total",
+            "Authorization decisions made by complete checks.",
+            [
+                ({"endpoint": endpoint}, counts)
+                for endpoint, counts, _, _ in snapshot["checks"]
+            ],
+        )
+        _render_histogram(
+            lines,
+            "flask_allows_check_duration_seconds",
+            "Time spent performing complete checks.",
+            self.buckets,
+            [
+                ({"endpoint": endpoint}, buckets, total)
+                for endpoint, _, buckets, total in snapshot["checks"]
+            ],
+        )
+
+        _render_breakers(lines, snapshot["breakers"])
+
+        return "\n".join(lines) + "\n"
+
+    def _start_flusher(self):
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = _Flusher(self)
+            self._flusher.start()
+
+
+class _Flusher(threading.Thread):
+    "Internal helper to periodically write a registry's totals"
+
+    def __init__(self, registry):
+        super(_Flusher, self).__init__(name="flask-allows-metrics")
+        self.daemon = True
+        self.registry = registry
+        self.stopped = threading.Event()
+        atexit.register(self.stop)
+
+    def run(self):
+        while not self.stopped.wait(self.registry.flush_interval):
+            self.registry.flush()
+
+    def stop(self):
+        self.stopped.set()
+        self.registry.flush()
+
+
+def metrics_view(registry=None):
+    """
+    Creates a view function that renders a
+    :class:`~flask_allows.metrics.MetricsRegistry` in the Prometheus text
+    exposition format. If a registry isn't provided, the registry configured
+    on the current application's :class:`~flask_allows.allows.Allows` instance
+    is used::
+
+        app.add_url_rule("/metrics", "metrics", metrics_view())
+
+    :param registry: Optional. The registry to render.
+
+    .. versionadded:: 0.8.0
+    """
+
+    def view():
+        rv = registry
+        if rv is None:
+            rv = current_app.extensions["allows"].metrics
+        return Response(rv.render(), content_type=CONTENT_TYPE)
+
+    return view
+
+
+def _accumulate(into, key, values):
+    counts, buckets, total = values
+    if key not in into:
+        into[key] = [counts, buckets, total]
+        return
+
+    existing = into[key]
+    existing[0] = [a + b for a, b in zip(existing[0], counts)]
+    existing[1] = [a + b for a, b in zip(existing[1], buckets)]
+    existing[2] += total
+
+
+def _sort_key(item):
+    key = item[0]
+    if isinstance(key, tuple):
+        return tuple("" if k is None else k for k in key)
+    return "" if key is None else key
+
+
+def _escape(value):
+    if value is None:
+        return ""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels, **extra):
+    pairs = sorted(labels.items()) + sorted(extra.items())
+    return "{" + ",".join('{}="{}"'.format(k, _escape(v)) for k, v in pairs) + "}"
+
+
+def _format_float(value):
+    return repr(float(value))
+
+
+def _render_counter(lines, name, doc, series):
+    lines.append("# HELP {} {}".format(name, doc))
+    lines.append("# TYPE {} counter".format(name))
+
+    for labels, counts in series:
+        for outcome, count in zip(OUTCOMES, counts):
+            lines.append(
+                "{}{} {}".format(name, _labels(labels, outcome=outcome), count)
+            )
+
+
+def _render_histogram(lines, name, doc, bounds, series):
+    lines.append("# HELP {} {}".format(name, doc))
+    lines.append("# TYPE {} histogram".format(name))
+
+    for labels, buckets, total in series:
+        cumulative = 0
+        for bound, count in zip(bounds, buckets):
+            cumulative += count
+            lines.append(
+                "{}_bucket{} {}".format(
+                    name, _labels(labels, le=_format_float(bound)), cumulative
+                )
+            )
+        cumulative += buckets[-1]
+        lines.append(
+            "{}_bucket{} {}".format(name, _labels(labels, le="+Inf"), cumulative)
+        )
+        lines.append(
+            "{}_sum{} {}".format(name, _labels(labels), _format_float(total / 1e9))
+        )
+        lines.append("{}_count{} {}".format(name, _labels(labels), cumulative))
+
+
+def _render_breakers(lines, breakers):
+    name = "flask_allows_circuit_breakers"
+    lines.append("# HELP {} Circuit breakers by state.".format(name))
+    lines.append("# TYPE {} gauge".format(name))
+
+    counts = {}
+    for label, state, value in breakers:
+        counts.setdefault(label, {})[state] = value
+
+    for label, by_state in sorted(counts.items()):
+        for state in (CLOSED, OPEN, HALF_OPEN):
+            lines.append(
+                "{}{} {}".format(
+                    name,
+                    _labels({"requirement": label}, state=state),
+                    by_state.get(state, 0),
+                )
+            )
@@ -1,9 +1,11 @@
 from contextlib import contextmanager
 from functools import wraps
+from itertools import count
 
 from werkzeug.local import LocalProxy, LocalStack
 
 _override_ctx_stack = LocalStack()
+_generations = count()
 
 __all__ = ("current_overrides", "Override", "OverrideManager")
 
@@ -58,20 +60,25 @@ class Override(object):
     disabled requirements.
     """
 
+    __slots__ = ("_requirements", "_generation")
+
     def __init__(self, *requirements):
         self._requirements = set(requirements)
+        self._generation = next(_generations)
 
     def add(self, requirement, *requirements):
         """
         Adds one or more requirements to the override context.
         """
         self._requirements.update((requirement,) + requirements)
+        self._generation = next(_generations)
 
     def remove(self, requirement, *requirements):
         """
         Removes one or more requirements from the override context.
         """
         self._requirements.difference_update((requirement,) + requirements)
+        self._generation = next(_generations)
 
     def is_overridden(self, requirement):
         """
@@ -83,8 +90,15 @@ class Override(object):
             override.is_overridden(is_admin)  # True
             is_admin in override  # True
 
+        Requirements bound to an object, such as
+        :class:`~flask_allows.residuals.Where` bound to a row, provide an
+        ``unbind`` method and are also overridden when their unbound form is.
         """
-        return requirement in self._requirements
+        if requirement in self._requirements:
+            return True
+
+        unbind = getattr(requirement, "unbind", None)
+        return unbind is not None and unbind() in self._requirements
 
     def __contains__(self, other):
         return self.is_overridden(other)
@@ -138,6 +152,8 @@ class OverrideManager(object):
     to access these controls.
     """
 
+    __slots__ = ()
+
     def push(self, override, use_parent=False):
         """
         Binds an override to the current context, optionally use the
@@ -171,10 +187,10 @@ class OverrideManager(object):
         """
         Returns the current override context if set otherwise None
         """
-        try:
-            return _override_ctx_stack.top[1]
-        except TypeError:
+        rv = _override_ctx_stack.top
+        if rv is None:
             return None
+        return rv[1]
 
     @contextmanager
     def override(self, override, use_parent=False):
@@ -1,6 +1,8 @@
+from flask import g
+
 from .allows import allows
 
-__all__ = ("Permission",)
+__all__ = ("Permission", "can")
 
 
 class Permission(object):
@@ -30,6 +32,21 @@ class Permission(object):
         Both the context manager and boolean usages require an active
         application context to use.
 
+    When constructed with ``cache=True``, the boolean result is stored for the
+    remainder of the current application context (which is the lifetime of the
+    request when handling one). Subsequent checks of an equal set of
+    requirements against the same identity reuse the stored result rather
+    than running the requirements again. Pushing, popping or modifying
+    override and additional contexts invalidates stored results::
+
+        for post in posts:
+            if Permission(can_moderate, cache=True):
+                render_moderation_tools(post)
+
+    Caching only applies to the boolean usage, the context manager always
+    runs the requirements. Requirements and identities that are not hashable
+    are checked without caching.
+
     :param requirements: The requirements to check against
     :param throws: Optional, keyword only. Exception to throw when used as a context
         manager, if provided it takes precedence over the exception stored on the
@@ -41,16 +58,25 @@ class Permission(object):
     :param identity: Optional, keyword only. An identity to verify against
         instead of the using the loader configured on the current application's
         registered :class:`~flask_allows.allows.Allows` instance
+    :param cache: Optional, keyword only. If true, the boolean result is
+        cached for the lifetime of the current application context.
 
+    .. versionchanged:: 0.8.0
+        Added ``cache`` option.
     """
 
+    __slots__ = ("requirements", "throws", "identity", "on_fail", "cache")
+
     def __init__(self, *requirements, **opts):
         self.requirements = requirements
         self.throws = opts.get("throws")
         self.identity = opts.get("identity")
         self.on_fail = opts.get("on_fail")
+        self.cache = opts.get("cache", False)
 
     def __bool__(self):
+        if self.cache:
+            return _cached_fulfill(self.requirements, self.identity)
         return allows.fulfill(self.requirements, identity=self.identity)
 
     __nonzero__ = __bool__
@@ -66,3 +92,55 @@ class Permission(object):
 
     def __exit__(self, exctype, value, tb):
         pass
+
+
+def can(*requirements, **opts):
+    """
+    Checks the requirements against the current identity and returns the
+    result as a boolean. Results are cached in the same fashion as
+    ``Permission(*requirements, cache=True)``.
+
+    This function is registered as the ``can`` global in Jinja templates when
+    the :class:`~flask_allows.allows.Allows` extension is initialized against
+    an application::
+
+        {% if can(is_moderator) %}
+            <a href="{{ url_for('mod.panel') }}">Moderate</a>
+        {% endif %}
+
+    :param requirements: The requirements to check against
+    :param identity: Optional, keyword only. An identity to verify against
+        instead of the currently loaded identity.
+
+    .. versionadded:: 0.8.0
+    """
+    return _cached_fulfill(requirements, opts.get("identity"))
+
+
+def _cached_fulfill(requirements, identity):
+    "Internal helper"
+    current_allows = allows._get_current_object()
+    identity = identity or current_allows._identity_loader()
+
+    overrides = current_allows.overrides.current
+    additional = current_allows.additional.current
+
+    key = (
+        requirements,
+        identity,
+        overrides._generation if overrides is not None else None,
+        additional._generation if additional is not None else None,
+    )
+
+    cache = g.setdefault("_allows_permission_cache", {})
+
+    try:
+        return cache[key]
+    except KeyError:
+        pass
+    except TypeError:
+        # unhashable requirement or identity, caching isn't possible
+        return current_allows.fulfill(requirements, identity=identity)
+
+    result = cache[key] = current_allows.fulfill(requirements, identity=identity)
+    return result
@@ -0,0 +1,496 @@
+"""
+Policies declared in JSON or TOML documents rather than in decorators. A
+document maps policy names, usually endpoints, to requirements built from
+named requirement factories and combined with ``and``, ``or`` and ``not``.
+"""
+
+import hashlib
+import json
+import logging
+import marshal
+import os
+import threading
+
+from ._compat import string_types
+from .grants import compile_requirement
+from .requirements import And, Not, Or
+from .signals import policies_reloaded
+
+__all__ = ("PolicyError", "PolicyLoader", "PolicySet", "PolicyWatcher")
+
+logger = logging.getLogger(__name__)
+
+# bumped whenever the normalized form stored in cache artifacts changes
+_CACHE_VERSION = 1
+
+_COMBINATORS = {"and": And, "or": Or, "not": Not}
+
+
+class PolicyError(ValueError):
+    """
+    Raised when a policy document is malformed or refers to requirement
+    factories that don't exist.
+
+    :param message: Description of the problem
+    :param path: Location of the problem in the document, such as
+        ``policies.admin.index[0].or[1]``
+    """
+
+    def __init__(self, message, path=None):
+        if path:
+            message = "{}: {}".format(path, message)
+        super(PolicyError, self).__init__(message)
+        self.path = path
+
+
+class PolicySet(object):
+    """
+    The requirements of every policy in a document, keyed by policy name::
+
+        policies = loader.load("policies.json")
+
+        @app.route("/admin")
+        @requires(*policies["admin.index"])
+        def index():
+            ...
+
+    :param policies: Mapping of policy names to tuples of requirements
+    :param digest: Optional. Hash of the document the policies were loaded
+        from
+
+    .. versionadded:: 0.8.0
+    """
+
+    __slots__ = ("policies", "digest")
+
+    def __init__(self, policies, digest=None):
+        self.policies = policies
+        self.digest = digest
+
+    def __getitem__(self, name):
+        return self.policies[name]
+
+    def __contains__(self, name):
+        return name in self.policies
+
+    def __iter__(self):
+        return iter(self.policies)
+
+    def __len__(self):
+        return len(self.policies)
+
+    def get(self, name, default=None):
+        return self.policies.get(name, default)
+
+    def __repr__(self):
+        return "<PolicySet policies={} digest={!r}>".format(
+            len(self.policies), self.digest
+        )
+
+
+class PolicyLoader(object):
+    """
+    Loads policy documents into :class:`PolicySet` instances. Documents look
+    like::
+
+        {
+            "policies": {
+                "admin.index": [
+                    "is_logged_in",
+                    {"or": ["is_admin", {"requirement": "has_permission",
+                                         "args": ["view_admin_panel"]}]}
+                ],
+                "auth.login": {"not": "is_logged_in"}
+            }
+        }
+
+    Each policy is a requirement or a list of requirements that must all be
+    fulfilled. A requirement is either the name of a factory, called without
+    arguments, an object naming a factory with ``requirement`` along with
+    optional ``args`` and ``kwargs`` to call it with, or an object with a
+    single ``and``, ``or`` or ``not`` key holding a requirement or list of
+    requirements to combine. The TOML equivalent uses the same structure.
+
+    Parsing and validating a document is the expensive part of loading it,
+    when ``cache_dir`` is provided the validated document is stored there in
+    a binary artifact named after the hash of the document, and later loads
+    of an unchanged document read the artifact instead. Only plain data is
+    cached, requirements are always built by calling the factories.
+
+    Combinations of :class:`~flask_allows.grants.HasPermission` and
+    :class:`~flask_allows.grants.HasRole` are compiled with
+    :func:`~flask_allows.grants.compile_requirement`.
+
+    :param factories: Mapping of names to callables returning requirements,
+        functions used as requirements must be wrapped, e.g. ``lambda:
+        is_admin``
+    :param cache_dir: Optional. Directory to store compiled artifacts in
+
+    .. versionadded:: 0.8.0
+    """
+
+    def __init__(self, factories, cache_dir=None):
+        self.factories = factories
+        self.cache_dir = cache_dir
+
+    def load(self, path):
+        """
+        Loads the policy document at ``path``, parsed as TOML if the file name
+        ends with ``.toml`` and as JSON otherwise.
+
+        :raises PolicyError: If the document is invalid
+        """
+        with open(path, "rb") as fh:
+            data = fh.read()
+
+        fmt = "toml" if path.endswith(".toml") else "json"
+        return self.loads(data, fmt)
+
+    def loads(self, data, fmt="json"):
+        """
+        Loads a policy document from bytes or text.
+
+        :param data: The document
+        :param fmt: Optional. Either ``"json"`` or ``"toml"``
+        :raises PolicyError: If the document is invalid
+        """
+        if not isinstance(data, bytes):
+            data = data.encode("utf-8")
+
+        digest = hashlib.sha256(fmt.encode("ascii") + b"\0" + data).hexdigest()
+        normalized = self._read_artifact(digest)
+
+        if normalized is None:
+            normalized = _normalize_document(_parse(data, fmt))
+            self._write_artifact(digest, normalized)
+
+        return PolicySet(self._bind(normalized), digest)
+
+    def _bind(self, normalized):
+        built, compiled = {}, {}
+
+        def build(node, name):
+            return _memoized(built, node, lambda: self._construct(node, name, build))
+
+        def compile(node, name):
+            return _memoized(
+                compiled, node, lambda: compile_requirement(build(node, name))
+            )
+
+        return {
+            name: tuple(compile(node, name) for node in nodes)
+            for name, nodes in normalized.items()
+        }
+
+    def _construct(self, node, name, build):
+        kind = node[0]
+
+        if kind in _COMBINATORS:
+            return _COMBINATORS[kind](*(build(child, name) for child in node[1]))
+
+        _, factory_name, args, kwargs = node
+        try:
+            factory = self.factories[factory_name]
+        except KeyError:
+            raise PolicyError(
+                "unknown requirement {!r}".format(factory_name),
+                "policies.{}".format(name),
+            )
+        return factory(*args, **dict(kwargs))
+
+    def _artifact_path(self, digest):
+        return os.path.join(
+            self.cache_dir,
+            "flask-allows-policy-{}-{}.bin".format(digest, _CACHE_VERSION),
+        )
+
+    def _read_artifact(self, digest):
+        if self.cache_dir is None:
+            return None
+
+        try:
+            with open(self._artifact_path(digest), "rb") as fh:
+                # loading from bytes is much faster than from the file object
+                return marshal.loads(fh.read())
+        except (IOError, OSError, EOFError, ValueError, TypeError):
+            # missing, unreadable or written by another Python version
+            return None
+
+    def _write_artifact(self, digest, normalized):
+        if self.cache_dir is None:
+            return
+
+        path = self._artifact_path(digest)
+        tmp = "{}.{}.tmp".format(path, os.getpid())
+
+        try:
+            with open(tmp, "wb") as fh:
+                marshal.dump(normalized, fh)
+            os.rename(tmp, path)
+        except (IOError, OSError):
+            # the cache only speeds up loading, failing to write it is fine
+            pass
+
+
+class PolicyWatcher(object):
+    """
+    Keeps the policies loaded from a document up to date with the file. A
+    background thread polls the modification time of the file and when it
+    changes loads the document again and replaces :attr:`current`::
+
+        watcher = PolicyWatcher(loader, "/etc/myapp/policies.json")
+        allows = Allows(app, identity_loader=load_user, policies=watcher)
+
+    Passed to :class:`~flask_allows.allows.Allows`, the policy named after
+    the endpoint of each request is checked before the request is handled.
+    Each request keeps using the policies that were current when it started,
+    see :attr:`~flask_allows.allows.Allows.current_policies`, while requests
+    starting after a reload use the new ones. Replacing the policies is a
+    single assignment so checking them never waits on a lock.
+
+    A document that fails to load is logged to the ``flask_allows.policy``
+    logger and the previous policies stay active. Every reload is reported
+    with :data:`~flask_allows.signals.policies_reloaded`.
+
+    The initial document is loaded by the constructor and any error is
+    raised. The polling thread is started by :meth:`init_allows` or
+    :meth:`start` and restarted in processes forked afterwards.
+
+    :param loader: The :class:`PolicyLoader` used to load the document
+    :param path: Path of the policy document
+    :param interval: Optional. Seconds between checks of the file, defaults
+        to 1. If None the file is only checked when :meth:`check` is called
+
+    .. versionadded:: 0.8.0
+    """
+
+    def __init__(self, loader, path, interval=1):
+        self.loader = loader
+        self.path = path
+        self.interval = interval
+
+        self._stat = _stat(path)
+        #: The active :class:`PolicySet`
+        self.current = loader.load(path)
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._hooks_registered = False
+
+    def init_allows(self, allows):
+        """
+        Starts watching the file, called automatically when the watcher is
+        passed to :class:`~flask_allows.allows.Allows`.
+        """
+        self.start()
+
+    def start(self):
+        """
+        Starts the polling thread unless it's already running or no interval
+        was configured.
+        """
+        if self.interval is None:
+            return
+
+        with self._lock:
+            if self._thread is not None:
+                return
+
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="flask-allows-policy-watcher"
+            )
+            self._thread.daemon = True
+            self._thread.start()
+
+            if not self._hooks_registered and hasattr(os, "register_at_fork"):
+                self._hooks_registered = True
+                os.register_at_fork(after_in_child=self._after_fork)
+
+    def close(self, timeout=None):
+        """
+        Stops the polling thread.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stop.set()
+
+        if thread is not None:
+            thread.join(timeout)
+
+    def check(self):
+        """
+        Loads the document again if the file changed since it was last
+        loaded. Returns True if the active policies were replaced.
+        """
+        try:
+            stat = _stat(self.path)
+        except (IOError, OSError) as e:
+            # the file may be missing briefly while it's being replaced
+            logger.debug("Unable to stat policy document %s: %s", self.path, e)
+            return False
+
+        if stat == self._stat:
+            return False
+
+        self._stat = stat
+        previous = self.current
+
+        try:
+            policies = self.loader.load(self.path)
+        except Exception as e:
+            # includes errors raised by factories, a bad document shouldn't
+            # replace working policies
+            logger.warning(
+                "Keeping previous policies, failed to reload %s: %s", self.path, e
+            )
+            policies_reloaded.send(self, policies=None, previous=previous, error=e)
+            return False
+
+        if policies.digest == previous.digest:
+            return False
+
+        self.current = policies
+        logger.info("Reloaded policies from %s", self.path)
+        policies_reloaded.send(self, policies=policies, previous=previous, error=None)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def _after_fork(self):
+        # threads don't survive fork, restart the watcher in the child if it
+        # was running in the parent
+        was_running = self._thread is not None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if was_running:
+            self.start()
+
+
+def _stat(path):
+    st = os.stat(path)
+    # the inode changes when the file is replaced by renaming another over it
+    return (st.st_mtime, st.st_size, st.st_ino)
+
+
+def _memoized(cache, node, factory):
+    # identical nodes share a requirement, nodes are tuples of plain data so
+    # only those with unhashable arguments are built repeatedly
+    try:
+        return cache[node]
+    except KeyError:
+        pass
+    except TypeError:
+        return factory()
+
+    value = cache[node] = factory()
+    return value
+
+
+def _parse(data, fmt):
+    if fmt == "json":
+        try:
+            return json.loads(data.decode("utf-8"))
+        except ValueError as e:
+            raise PolicyError("invalid JSON: {}".format(e))
+
+    if fmt == "toml":
+        toml = _import_toml()
+        try:
+            return toml.loads(data.decode("utf-8"))
+        except ValueError as e:
+            raise PolicyError("invalid TOML: {}".format(e))
+
+    raise ValueError("fmt must be either 'json' or 'toml'")
+
+
+def _import_toml():
+    try:
+        import tomllib
+
+        return tomllib
+    except ImportError:  # pragma: no cover
+        pass
+
+    try:  # pragma: no cover
+        import tomli
+
+        return tomli
+    except ImportError:  # pragma: no cover
+        raise PolicyError("loading TOML policies requires tomli before Python 3.11")
+
+
+def _normalize_document(document):
+    """
+    Validates a parsed document and converts it into the form stored in
+    artifacts, a dictionary of policy names to tuples of nodes where each
+    node is either ``(combinator, children)`` or
+    ``("requirement", name, args, kwargs)``.
+    """
+    if not isinstance(document, dict):
+        raise PolicyError("the document must be an object")
+
+    unknown = set(document) - {"policies"}
+    if unknown:
+        raise PolicyError("unknown keys {}".format(", ".join(sorted(unknown))))
+
+    policies = document.get("policies")
+    if not isinstance(policies, dict):
+        raise PolicyError("must be an object of policy names", "policies")
+
+    return {
+        name: _normalize_list(policy, "policies.{}".format(name))
+        for name, policy in policies.items()
+    }
+
+
+def _normalize_list(value, path):
+    if isinstance(value, list):
+        return tuple(
+            _normalize(child, "{}[{}]".format(path, i)) for i, child in enumerate(value)
+        )
+    return (_normalize(value, path),)
+
+
+def _normalize(node, path):
+    if isinstance(node, string_types):
+        return ("requirement", node, (), ())
+
+    if not isinstance(node, dict):
+        raise PolicyError("must be a requirement name or an object", path)
+
+    combinators = set(node) & set(_COMBINATORS)
+    if combinators:
+        if len(node) != 1:
+            raise PolicyError(
+                "combinators must be the only key, found {}".format(
+                    ", ".join(sorted(node))
+                ),
+                path,
+            )
+        kind = combinators.pop()
+        return (kind, _normalize_list(node[kind], "{}.{}".format(path, kind)))
+
+    if "requirement" not in node:
+        raise PolicyError("must have a requirement, and, or or not key", path)
+
+    unknown = set(node) - {"requirement", "args", "kwargs"}
+    if unknown:
+        raise PolicyError("unknown keys {}".format(", ".join(sorted(unknown))), path)
+
+    name = node["requirement"]
+    args = node.get("args", [])
+    kwargs = node.get("kwargs", {})
+
+    if not isinstance(name, string_types):
+        raise PolicyError("requirement must be a string", path)
+    if not isinstance(args, list):
+        raise PolicyError("args must be a list", path)
+    if not isinstance(kwargs, dict):
+        raise PolicyError("kwargs must be an object", path)
+
+    return ("requirement", name, tuple(args), tuple(sorted(kwargs.items())))
@@ -0,0 +1,297 @@
+"""
+Relationship based requirements. Access is granted by relationship tuples
+such as "alice is a member of team:eng" and "members of team:eng are viewers
+of folder:docs", and a :class:`Relation` requirement checks whether the
+identity reaches an object through a chain of such tuples.
+"""
+
+import operator
+import threading
+from abc import ABCMeta, abstractmethod
+from collections import deque
+
+from ._compat import intern, with_metaclass
+from .requirements import Requirement
+
+__all__ = ("TupleStore", "MemoryTupleStore", "Relation")
+
+
+class TupleStore(with_metaclass(ABCMeta)):
+    """
+    Base of storages of relationship tuples. A tuple ``(object, relation,
+    subject)`` states that ``subject`` has ``relation`` to ``object``, for
+    example ``("team:eng", "member", "user:alice")``. Subjects are either
+    plain identifiers or subject sets written ``object#relation``, standing
+    for every subject having ``relation`` to ``object``::
+
+        store.write("team:eng", "member", "user:alice")
+        store.write("folder:docs", "viewer", "team:eng#member")
+        store.write("document:readme", "viewer", "folder:docs#viewer")
+
+        store.check("document:readme", "viewer", "user:alice")  # True
+
+    Subclasses storing tuples elsewhere, such as in a database, implement
+    :meth:`has_subject` and :meth:`subject_sets`, as well as :meth:`write` and
+    :meth:`delete` unless the tuples are written by other means. They may
+    replace :meth:`check` with a query that walks the graph in the storage
+    itself.
+
+    :param loader: Optional. A callable accepting an identity and returning
+        its subject identifier, or None for identities without one, defaults
+        to reading the ``attribute`` of the identity
+    :param attribute: Optional. The attribute read by the default loader
+
+    .. versionadded:: 0.8.0
+    """
+
+    def __init__(self, loader=None, attribute="subject"):
+        self.loader = loader or operator.attrgetter(attribute)
+
+    def write(self, obj, relation, subject):
+        """
+        Stores the tuple ``(obj, relation, subject)``.
+        """
+        raise NotImplementedError
+
+    def write_many(self, tuples):
+        """
+        Stores each ``(obj, relation, subject)`` tuple of ``tuples``.
+        """
+        for obj, relation, subject in tuples:
+            self.write(obj, relation, subject)
+
+    def delete(self, obj, relation, subject):
+        """
+        Removes the tuple ``(obj, relation, subject)`` if it is stored.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def has_subject(self, obj, relation, subject):
+        """
+        Returns True if the tuple ``(obj, relation, subject)`` is stored,
+        without following subject sets.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def subject_sets(self, obj, relation):
+        """
+        Returns the subject sets having ``relation`` to ``obj``, written
+        ``object#relation`` as they were stored.
+        """
+        raise NotImplementedError
+
+    def check(self, obj, relation, subject):
+        """
+        Returns True if ``subject`` has ``relation`` to ``obj``, either
+        directly or through any chain of subject sets.
+
+        The graph is searched breadth first from ``obj`` so the shortest
+        chains are found first, and each subject set is expanded at most once
+        per check however many paths lead to it, which also stops the search
+        from looping on cyclic tuples.
+        """
+        return self._search(obj + "#" + relation, subject, set())
+
+    def check_many(self, checks, subject):
+        """
+        Returns a list holding the result of :meth:`check` for each
+        ``(obj, relation)`` pair of ``checks``. Subject sets found not to
+        lead to ``subject`` aren't searched again for later pairs, so
+        objects sharing ancestors, such as documents in the same folder,
+        are checked without repeating the search.
+        """
+        exhausted = set()
+        return [
+            self._search(obj + "#" + relation, subject, exhausted)
+            for obj, relation in checks
+        ]
+
+    def _search(self, start, subject, exhausted):
+        if start in exhausted:
+            return False
+
+        seen = {start}
+        pending = deque([start])
+
+        while pending:
+            obj, _, relation = pending.popleft().rpartition("#")
+            if self.has_subject(obj, relation, subject):
+                return True
+
+            for subject_set in self.subject_sets(obj, relation):
+                if subject_set not in seen and subject_set not in exhausted:
+                    seen.add(subject_set)
+                    pending.append(subject_set)
+
+        # nothing reachable from any of them leads to the subject
+        exhausted.update(seen)
+        return False
+
+    def subject(self, identity):
+        """
+        Returns the subject identifier of ``identity``.
+        """
+        return self.loader(identity)
+
+
+class MemoryTupleStore(TupleStore):
+    """
+    Stores relationship tuples in dictionaries, indexed by object and
+    relation so checking a direct tuple is a single lookup.
+
+    Identifiers are interned so each is held once however many tuples
+    mention it, and objects with a single subject for a relation, the most
+    common case, store it without a set, keeping graphs of millions of
+    tuples in memory.
+
+    .. versionadded:: 0.8.0
+    """
+
+    def __init__(self, loader=None, attribute="subject"):
+        super(MemoryTupleStore, self).__init__(loader, attribute)
+        # both map "object#relation" to a single subject or a set of them
+        self._subjects = {}
+        self._subject_sets = {}
+        self._lock = threading.Lock()
+
+    def write(self, obj, relation, subject):
+        key, index = self._locate(obj, relation, subject)
+        subject = intern(subject)
+
+        with self._lock:
+            held = index.get(key)
+            if held is None:
+                index[key] = subject
+            elif held.__class__ is set:
+                held.add(subject)
+            elif held != subject:
+                index[key] = {held, subject}
+
+    def delete(self, obj, relation, subject):
+        key, index = self._locate(obj, relation, subject)
+
+        with self._lock:
+            held = index.get(key)
+            if held.__class__ is set:
+                held.discard(subject)
+                if len(held) == 1:
+                    index[key] = held.pop()
+            elif held is not None and held == subject:
+                del index[key]
+
+    def has_subject(self, obj, relation, subject):
+        held = self._subjects.get(obj + "#" + relation)
+        if held.__class__ is set:
+            return subject in held
+        return held == subject
+
+    def subject_sets(self, obj, relation):
+        held = self._subject_sets.get(obj + "#" + relation)
+        if held is None:
+            return ()
+        if held.__class__ is set:
+            # copied so tuples written while a check is running don't change
+            # the set being iterated, building a tuple holds the GIL
+            return tuple(held)
+        return (held,)
+
+    def _locate(self, obj, relation, subject):
+        subject_obj, sep, subject_relation = subject.rpartition("#")
+        if sep and not (subject_obj and subject_relation):
+            raise ValueError("{!r} is not a valid subject set".format(subject))
+        index = self._subject_sets if sep else self._subjects
+        return intern(obj + "#" + relation), index
+
+    def __len__(self):
+        return sum(
+            len(held) if held.__class__ is set else 1
+            for index in (self._subjects, self._subject_sets)
+            for held in index.values()
+        )
+
+    def __repr__(self):
+        return "<MemoryTupleStore tuples={}>".format(len(self))
+
+
+class Relation(Requirement):
+    """
+    Requirement fulfilled when the identity has ``relation`` to ``obj`` in a
+    :class:`TupleStore`, directly or through subject sets::
+
+        store = MemoryTupleStore(loader=lambda user: "user:{}".format(user.id))
+
+        @app.route("/documents/<int:id>")
+        def document(id):
+            with Permission(Relation("viewer", "document:{}".format(id), store)):
+                ...
+
+    Identities without a subject, as returned by the store's loader, never
+    fulfill the requirement.
+
+    :param relation: The relation the identity must have
+    :param obj: The object the identity must have the relation to
+    :param store: The :class:`TupleStore` holding the tuples
+
+    .. versionadded:: 0.8.0
+    """
+
+    __slots__ = ("relation", "object", "store")
+
+    shareable = True
+
+    def __init__(self, relation, obj, store):
+        self.relation = relation
+        self.object = obj
+        self.store = store
+
+    def fulfill(self, user):
+        subject = self.store.subject(user)
+        if subject is None:
+            return False
+        return self.store.check(self.object, self.relation, subject)
+
+    @classmethod
+    def fulfill_batch(cls, requirements, user):
+        """
+        Checks several relation requirements for the same identity at once,
+        used when filtering with a ``chunk_size``, see
+        :meth:`Allows.filter <flask_allows.allows.Allows.filter>`. The
+        requirements of each store are checked with a single call to
+        :meth:`TupleStore.check_many`.
+        """
+        results = [False] * len(requirements)
+        by_store = {}
+        for i, requirement in enumerate(requirements):
+            by_store.setdefault(requirement.store, []).append(i)
+
+        for store, indexes in by_store.items():
+            subject = store.subject(user)
+            if subject is None:
+                continue
+
+            checks = [
+                (requirements[i].object, requirements[i].relation) for i in indexes
+            ]
+            for i, result in zip(indexes, store.check_many(checks, subject)):
+                results[i] = result
+
+        return results
+
+    def __eq__(self, other):
+        return (
+            self.__class__ is other.__class__
+            and self.store is other.store
+            and self.relation == other.relation
+            and self.object == other.object
+        )
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.__class__, self.relation, self.object))
+
+    def __repr__(self):
+        return "<Relation({!r}, {!r})>".format(self.relation, self.object)
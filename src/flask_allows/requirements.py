@@ -2,10 +2,8 @@ import operator
 from abc import ABCMeta, abstractmethod
 from functools import wraps
 
-from flask import request
-from flask._compat import with_metaclass
-
-from .allows import _call_requirement
+from ._compat import with_metaclass
+from .engine import _fulfill_conditional, _invoke_requirement, _is_conditional
 from .overrides import current_overrides
 
 __all__ = (
@@ -24,8 +22,21 @@ class Requirement(with_metaclass(ABCMeta)):
     Base for object based Requirements in Flask-Allows. This is quite
     useful for requirements that have complex logic that is too much to fit
     inside of a single function.
+
+    Classes may set ``shareable`` to True when equal instances always decide
+    the same for an identity, allowing an
+    :class:`~flask_allows.engine.Engine` to evaluate them once per check
+    wherever equal instances appear. Otherwise only the same instance is
+    shared, as is the case for requirements with a coarser ``__eq__``.
+
+    .. versionchanged:: 0.8.0
+        Added ``shareable``.
     """
 
+    __slots__ = ()
+
+    shareable = False
+
     @abstractmethod
     def fulfill(self, user, request=None):
         """
@@ -40,8 +51,8 @@ class Requirement(with_metaclass(ABCMeta)):
         """
         return NotImplemented
 
-    def __call__(self, user, request):
-        return _call_requirement(self.fulfill, user, request)
+    def __call__(self, user, request=None):
+        return _invoke_requirement(self.fulfill, user, request)
 
     def __repr__(self):
         return "<{}()>".format(self.__class__.__name__)
@@ -71,6 +82,11 @@ class ConditionalRequirement(Requirement):
 
     This class is also exported under the ``C`` alias.
 
+    The hash and the other values derived from ``requirements``, ``op``,
+    ``until`` and ``negated`` are cached, and cleared when one of them is
+    reassigned. Conditional requirements it's nested in aren't notified, so
+    change requirements before nesting them.
+
 
     :param requirements: Collection of requirements to combine into
         one logical requirement
@@ -85,11 +101,24 @@ class ConditionalRequirement(Requirement):
         returns False if the user is logged in)
     """
 
+    __slots__ = (
+        "requirements",
+        "op",
+        "until",
+        "negated",
+        "_hash",
+        "_shareable",
+        "_graph",
+        "__weakref__",
+    )
+
     def __init__(self, *requirements, **kwargs):
-        self.requirements = requirements
-        self.op = kwargs.get("op", operator.and_)
-        self.until = kwargs.get("until")
-        self.negated = kwargs.get("negated")
+        # nothing is cached yet, skip clearing the caches in __setattr__
+        set_attribute = object.__setattr__
+        set_attribute(self, "requirements", requirements)
+        set_attribute(self, "op", kwargs.get("op", operator.and_))
+        set_attribute(self, "until", kwargs.get("until"))
+        set_attribute(self, "negated", kwargs.get("negated"))
 
     @classmethod
     def And(cls, *requirements):
@@ -122,30 +151,22 @@ class ConditionalRequirement(Requirement):
         """
         return cls(*requirements, negated=True)
 
-    def fulfill(self, user, request):
-        reduced = None
-
-        requirements = self.requirements
-
-        # can't use is because is a proxy
-        if current_overrides != None:  # noqa: E711
-            requirements = (r for r in requirements if r not in current_overrides)
-
-        for r in requirements:
-            result = _call_requirement(r, user, request)
-
-            if reduced is None:
-                reduced = result
-            else:
-                reduced = self.op(reduced, result)
-
-            if self.until == reduced:
-                break
-
-        if reduced is not None:
-            return not reduced if self.negated else reduced
+    def fulfill(self, user, request=None):
+        return _fulfill_conditional(
+            self, user, current_overrides._get_current_object(), request
+        )
 
-        return True
+    @property
+    def shareable(self):
+        """
+        True when every nested requirement is shareable or only equal to
+        itself, so equal conditional requirements always decide the same.
+        """
+        try:
+            return self._shareable
+        except AttributeError:
+            self._shareable = all(_is_shareable(r) for r in self.requirements)
+            return self._shareable
 
     def __and__(self, require):
         return self.And(self, require)
@@ -174,6 +195,14 @@ class ConditionalRequirement(Requirement):
             self.__class__.__name__, self.requirements, additional
         )
 
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in _DEFINING_ATTRIBUTES:
+            # the cached hash, shareability and graph are derived from these
+            for cache in _CACHED_ATTRIBUTES:
+                if hasattr(self, cache):
+                    object.__delattr__(self, cache)
+
     def __eq__(self, other):
         return (
             isinstance(other, ConditionalRequirement)
@@ -184,10 +213,20 @@ class ConditionalRequirement(Requirement):
         )
 
     def __hash__(self):
-        return hash((self.requirements, self.op, self.until, self.negated))
+        # caching the hash keeps hashing nested conditionals from walking the
+        # whole tree each time, it's cleared when the requirements change
+        try:
+            return self._hash
+        except AttributeError:
+            self._hash = hash((self.requirements, self.op, self.until, self.negated))
+            return self._hash
 
 
-(C, And, Or, Not) = (
+_DEFINING_ATTRIBUTES = frozenset(["requirements", "op", "until", "negated"])
+_CACHED_ATTRIBUTES = ("_hash", "_shareable", "_graph")
+
+
+C, And, Or, Not = (
     ConditionalRequirement,
     ConditionalRequirement.And,
     ConditionalRequirement.Or,
@@ -195,6 +234,61 @@ class ConditionalRequirement(Requirement):
 )
 
 
+def _is_shareable(requirement):
+    if isinstance(requirement, ConditionalRequirement):
+        # conditionals with their own fulfill may decide differently than
+        # the plain conditionals they are equal to
+        return bool(_is_conditional(requirement)) and requirement.shareable
+
+    cls = requirement.__class__
+    return getattr(cls, "shareable", False) is True or getattr(
+        cls, "__eq__", None
+    ) is getattr(object, "__eq__", None)
+
+
+def _describe_requirement(requirement):
+    """
+    Internal helper to build a stable, human readable name for a requirement
+    that does not include memory addresses, used for labeling requirements in
+    metrics and reports.
+    """
+    if isinstance(requirement, ConditionalRequirement):
+        inner = ", ".join(_describe_requirement(r) for r in requirement.requirements)
+
+        if requirement.op is operator.and_ and requirement.until is False:
+            name = "And"
+        elif requirement.op is operator.or_ and requirement.until is True:
+            name = "Or"
+        elif requirement.op is operator.and_ and requirement.until is None:
+            name = None
+        else:
+            name = "C"
+
+        if name is None:
+            described = inner if requirement.negated else "C({})".format(inner)
+        else:
+            described = "{}({})".format(name, inner)
+
+        if requirement.negated:
+            return "Not({})".format(described)
+        return described
+
+    if isinstance(requirement, Requirement):
+        return repr(requirement)
+
+    name = getattr(requirement, "__qualname__", None) or getattr(
+        requirement, "__name__", None
+    )
+
+    if name is None:
+        return repr(requirement)
+
+    module = getattr(requirement, "__module__", None)
+    if module:
+        return "{}.{}".format(module, name)
+    return name
+
+
 def wants_request(f):
     """
     Helper decorator for transitioning to user-only requirements, this aids
@@ -212,6 +306,8 @@ def wants_request(f):
 
     @wraps(f)
     def wrapper(user):
+        from flask import request
+
         return f(user, request)
 
     return wrapper
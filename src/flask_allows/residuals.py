@@ -0,0 +1,290 @@
+"""
+Partial evaluation of requirements about rows of a table. Everything that
+depends only on the identity is evaluated up front, leaving a residual
+predicate about the row that can be translated into a query filter so the
+database returns only the rows the identity may see.
+"""
+
+import operator
+
+from .engine import _evaluate, _is_conditional
+from .grants import _ALL, _ANY, _reduction
+from .requirements import ConditionalRequirement, Requirement
+
+__all__ = ("Where", "bind", "partial_evaluate", "to_sqlalchemy")
+
+_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda field, value: field in value,
+}
+
+_UNBOUND = object()
+
+
+class Where(Requirement):
+    """
+    Requirement comparing a field of a row with a value. Values that are
+    callable are called with the identity, so a requirement may compare a
+    row with the identity::
+
+        is_public = Where("public", "==", True)
+        is_author = Where("author_id", "==", lambda user: user.id)
+
+        can_view = Or(is_public, is_author, is_admin)
+
+    Requirements built from ``Where`` are checked against a single row by
+    binding them to it with :func:`bind`, or turned into a query filter for
+    many rows with :func:`partial_evaluate` and :func:`to_sqlalchemy`.
+
+    Bound copies are only equal when bound to the same row. Overriding the
+    unbound requirement overrides it for every row, see
+    :meth:`Override.is_overridden
+    <flask_allows.overrides.Override.is_overridden>`.
+
+    :param field: The name of the field, read as an attribute of the row
+    :param op: One of ``==``, ``!=``, ``<``, ``<=``, ``>``, ``>=`` or ``in``
+    :param value: The value to compare the field with, or a callable
+        accepting the identity and returning it
+    :raises ValueError: If ``op`` isn't supported
+
+    .. versionadded:: 0.8.0
+    """
+
+    __slots__ = ("field", "op", "value", "row")
+
+    shareable = True
+
+    def __init__(self, field, op, value, row=_UNBOUND):
+        if op not in _OPERATORS:
+            raise ValueError("Unsupported operator {!r}".format(op))
+        self.field = field
+        self.op = op
+        self.value = value
+        self.row = row
+
+    def resolve(self, user):
+        """
+        Returns the value compared with the field for ``user``.
+        """
+        return self.value(user) if callable(self.value) else self.value
+
+    def bind(self, row):
+        """
+        Returns a copy of this requirement checking ``row``.
+        """
+        return self.__class__(self.field, self.op, self.value, row)
+
+    def unbind(self):
+        """
+        Returns a copy of this requirement that isn't bound to a row, or the
+        requirement itself if it isn't bound.
+        """
+        if self.row is _UNBOUND:
+            return self
+        return self.__class__(self.field, self.op, self.value)
+
+    def fulfill(self, user):
+        if self.row is _UNBOUND:
+            raise ValueError("{!r} isn't bound to a row".format(self))
+        return _OPERATORS[self.op](getattr(self.row, self.field), self.resolve(user))
+
+    def __eq__(self, other):
+        return (
+            self.__class__ is other.__class__
+            and self.field == other.field
+            and self.op == other.op
+            and self.value == other.value
+            and self.row is other.row
+        )
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        # values may be unhashable, such as the lists compared with in
+        return hash((self.__class__, self.field, self.op, id(self.row)))
+
+    def __repr__(self):
+        return "<Where({!r}, {!r}, {!r})>".format(self.field, self.op, self.value)
+
+
+def bind(requirement, row):
+    """
+    Returns a copy of ``requirement`` where every :class:`Where`, including
+    those nested in conditional requirements, checks ``row``::
+
+        for post in posts:
+            if allows.fulfill([bind(can_view, post)]):
+                ...
+
+    .. versionadded:: 0.8.0
+    """
+    if isinstance(requirement, Where):
+        return requirement.bind(row)
+
+    if requirement.__class__ is not ConditionalRequirement:
+        return requirement
+
+    return ConditionalRequirement(
+        *[bind(r, row) for r in requirement.requirements],
+        op=requirement.op,
+        until=requirement.until,
+        negated=requirement.negated
+    )
+
+
+def partial_evaluate(requirements, identity, overrides=None, additional=None):
+    """
+    Evaluates everything in ``requirements`` that doesn't depend on a row
+    and returns True if every row is allowed, False if no row is, or else
+    the residual requirement about the row. The residual is built from
+    ``And``, ``Or``, ``Not`` and :class:`Where` requirements whose values were
+    resolved for the identity::
+
+        residual = partial_evaluate([Or(is_admin, is_author)], member)
+        # <Where('author_id', '==', 42)>
+
+    Overridden requirements are skipped and additional requirements are
+    included, as they are by :meth:`~flask_allows.engine.Engine.fulfill`.
+    :meth:`Allows.partial <flask_allows.allows.Allows.partial>` provides them
+    from the current contexts.
+
+    :param requirements: The requirements to evaluate
+    :param identity: The identity to evaluate them for
+    :param overrides: Optional. An :class:`~flask_allows.overrides.Override`
+        of requirements to skip
+    :param additional: Optional. An
+        :class:`~flask_allows.additional.Additional` of requirements to
+        include
+    :raises ValueError: If a conditional requirement reducing with anything
+        other than and or or depends on the row
+
+    .. versionadded:: 0.8.0
+    """
+    if additional:
+        requirements = list(additional) + list(requirements)
+    return _partial(ConditionalRequirement(*requirements), identity, overrides)
+
+
+def to_sqlalchemy(residual, model):
+    """
+    Translates the result of :func:`partial_evaluate` into an SQLAlchemy
+    filter expression reading fields as attributes of ``model``, a mapped
+    class or the columns of a table::
+
+        residual = allows.partial([can_view])
+        posts = session.query(Post).filter(to_sqlalchemy(residual, Post))
+
+    Fields that are NULL compare like None does when checking a row, so the
+    filter matches the same rows even in negated requirements, where SQL
+    would otherwise drop rows it can't compare.
+
+    SQLAlchemy isn't a dependency of Flask-Allows and must be installed
+    separately.
+
+    .. versionadded:: 0.8.0
+    """
+    from sqlalchemy import and_, false, not_, or_, true
+
+    if residual is True:
+        return true()
+    if residual is False:
+        return false()
+
+    if isinstance(residual, Where):
+        return _sql_comparison(residual, getattr(model, residual.field))
+
+    clauses = [to_sqlalchemy(r, model) for r in residual.requirements]
+    combined = (and_ if _reduction(residual) is _ALL else or_)(*clauses)
+    return not_(combined) if residual.negated else combined
+
+
+def _sql_comparison(where, column):
+    """
+    Translates ``where`` into a comparison with ``column`` that is never NULL,
+    true for NULL fields when comparing None with the value is.
+    """
+    from sqlalchemy import and_, or_
+
+    value = where.value
+    if where.op == "in":
+        matches_null = None in value
+        clause = column.in_([v for v in value if v is not None])
+    elif value is None and where.op in ("==", "!="):
+        # already compiled to IS NULL or IS NOT NULL
+        return _OPERATORS[where.op](column, value)
+    else:
+        # None can't be ordered, rows with NULL fields are never matched
+        matches_null = where.op == "!="
+        clause = _OPERATORS[where.op](column, value)
+
+    if matches_null:
+        return or_(clause, column.is_(None))
+    return and_(clause, column.isnot(None))
+
+
+def _partial(requirement, user, overrides):
+    if not _depends_on_row(requirement):
+        return bool(_evaluate(requirement, user, overrides, None))
+
+    if isinstance(requirement, Where):
+        return Where(requirement.field, requirement.op, requirement.resolve(user))
+
+    kind = _reduction(requirement)
+    if kind is None:
+        raise ValueError(
+            "{!r} depends on the row but only And, Or and Not can be partially"
+            " evaluated".format(requirement)
+        )
+
+    requirements = requirement.requirements
+    if overrides:
+        requirements = [r for r in requirements if r not in overrides]
+    if not requirements:
+        # like the engine, nothing left to check is fulfilled even if negated
+        return True
+
+    result = _reduce(requirements, kind is _ANY, user, overrides)
+    if not requirement.negated:
+        return result
+    if isinstance(result, bool):
+        return not result
+    return ConditionalRequirement.Not(result)
+
+
+def _reduce(requirements, decisive, user, overrides):
+    """
+    Partially evaluates requirements reduced with or when ``decisive`` is
+    True, the result that decides the reduction on its own, and with and when
+    it is False.
+    """
+    ignored = not decisive
+    residuals = []
+
+    for r in requirements:
+        result = _partial(r, user, overrides)
+        if result is decisive:
+            return decisive
+        if result is not ignored:
+            residuals.append(result)
+
+    if not residuals:
+        return ignored
+    if len(residuals) == 1:
+        return residuals[0]
+    if decisive:
+        return ConditionalRequirement.Or(*residuals)
+    return ConditionalRequirement.And(*residuals)
+
+
+def _depends_on_row(requirement):
+    if isinstance(requirement, Where):
+        return requirement.row is _UNBOUND
+    if not _is_conditional(requirement):
+        return False
+    return any(_depends_on_row(r) for r in requirement.requirements)
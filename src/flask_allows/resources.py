@@ -0,0 +1,305 @@
+"""
+An index of the resources in a hierarchy, such as folders and documents,
+that each group of identities may access. Sharing a resource shares its
+whole subtree, and the index answers whether a resource lies in any subtree
+shared with a group without walking its ancestors.
+"""
+
+import itertools
+import operator
+import threading
+from bisect import bisect_left, bisect_right
+
+from .requirements import Requirement
+
+__all__ = ("ResourceIndex", "CanAccess")
+
+
+class ResourceIndex(object):
+    """
+    Tracks a hierarchy of resources and the subtrees of it shared with each
+    group::
+
+        index = ResourceIndex()
+        index.add("folder:specs")
+        index.add("document:42", parent="folder:specs")
+        index.share("team:eng", "folder:specs")
+
+        index.accessible(["team:eng"], "document:42")  # True
+
+    Each resource is encoded as the path of identifiers from the root of the
+    hierarchy, so a resource lies in a subtree when the path of the subtree
+    is a prefix of its path. The prefixes shared with each group are kept
+    sorted with nested subtrees left out, so a check is a single binary
+    search per group regardless of the depth of the resource. Sharing and
+    unsharing only update the prefixes of that group.
+
+    Adding and removing resources and sharing are cheap. Moving a resource
+    rewrites the paths of its whole subtree and replaces the index at once,
+    so checks made concurrently see either the old or the new position.
+
+    :param loader: Optional. A callable accepting an identity and returning
+        the groups it belongs to, defaults to reading the ``attribute`` of
+        the identity
+    :param attribute: Optional. The attribute read by the default loader
+
+    .. versionadded:: 0.8.0
+    """
+
+    def __init__(self, loader=None, attribute="groups"):
+        self.loader = loader or operator.attrgetter(attribute)
+        self._parents = {}
+        self._children = {}
+        self._shares = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        # paths of resources and sorted shared prefixes of each group,
+        # replaced together when resources move
+        self._state = ({}, {})
+
+    def add(self, resource, parent=None):
+        """
+        Adds ``resource`` beneath ``parent``, or as a root without a parent.
+
+        :raises ValueError: If ``resource`` was already added
+        :raises KeyError: If ``parent`` wasn't added
+        """
+        with self._lock:
+            paths = self._state[0]
+            if resource in paths:
+                raise ValueError("{!r} was already added".format(resource))
+
+            base = "" if parent is None else paths[parent]
+            self._parents[resource] = parent
+            self._children.setdefault(parent, set()).add(resource)
+            paths[resource] = "{}{}/".format(base, next(self._ids))
+
+    def remove(self, resource):
+        """
+        Removes ``resource`` and every resource beneath it, along with any
+        sharing of them.
+        """
+        with self._lock:
+            paths, prefixes = self._state
+            removed = self._subtree(resource)
+
+            self._children[self._parents[resource]].discard(resource)
+            for r in removed:
+                del paths[r]
+                del self._parents[r]
+                self._children.pop(r, None)
+
+            for group, shared in list(self._shares.items()):
+                if not shared.isdisjoint(removed):
+                    shared.difference_update(removed)
+                    self._update(group, paths, prefixes)
+
+    def move(self, resource, parent):
+        """
+        Moves ``resource``, along with everything beneath it, beneath
+        ``parent``, or to the root if ``parent`` is None.
+
+        :raises ValueError: If ``parent`` is ``resource`` or beneath it
+        """
+        with self._lock:
+            paths, prefixes = self._state
+            subtree = self._subtree(resource)
+            if parent in subtree:
+                raise ValueError("{!r} can't be moved beneath itself".format(resource))
+
+            paths = dict(paths)
+            old = paths[resource]
+            new = "{}{}/".format(
+                "" if parent is None else paths[parent], old.split("/")[-2]
+            )
+            for r in subtree:
+                paths[r] = new + paths[r][len(old) :]
+
+            self._children[self._parents[resource]].discard(resource)
+            self._children.setdefault(parent, set()).add(resource)
+            self._parents[resource] = parent
+
+            prefixes = dict(prefixes)
+            for group, shared in self._shares.items():
+                if not shared.isdisjoint(subtree):
+                    self._update(group, paths, prefixes)
+
+            self._state = (paths, prefixes)
+
+    def share(self, group, resource):
+        """
+        Grants ``group`` access to ``resource`` and everything beneath it.
+
+        :raises KeyError: If ``resource`` wasn't added
+        """
+        with self._lock:
+            paths, prefixes = self._state
+            path = paths[resource]
+            self._shares.setdefault(group, set()).add(resource)
+
+            shared = prefixes.get(group, ())
+            start = bisect_right(shared, path)
+            if start and path.startswith(shared[start - 1]):
+                # already shared through an ancestor
+                return
+
+            # prefixes of shared resources beneath it sort right after it
+            end = start
+            while end < len(shared) and shared[end].startswith(path):
+                end += 1
+            prefixes[group] = shared[:start] + (path,) + shared[end:]
+
+    def unshare(self, group, resource):
+        """
+        Revokes access of ``group`` to ``resource``. Resources beneath it
+        stay accessible if they are shared with the group themselves, or
+        through another shared ancestor.
+        """
+        with self._lock:
+            paths, prefixes = self._state
+            shared = self._shares.get(group)
+            if shared is None or resource not in shared:
+                return
+
+            shared.discard(resource)
+            if not shared:
+                del self._shares[group]
+                del prefixes[group]
+                return
+
+            path = paths[resource]
+            outermost = prefixes[group]
+            i = bisect_left(outermost, path)
+            if i < len(outermost) and outermost[i] == path:
+                # shares that were nested beneath it become outermost
+                nested = _outermost(
+                    sorted(p for p in (paths[r] for r in shared) if p.startswith(path))
+                )
+                prefixes[group] = outermost[:i] + nested + outermost[i + 1 :]
+
+    def accessible(self, groups, resource):
+        """
+        Returns True if ``resource`` is shared with any of ``groups``, either
+        itself or through one of its ancestors.
+        """
+        paths, prefixes = self._state
+        path = paths.get(resource)
+        if path is None:
+            return False
+
+        for group in groups:
+            shared = prefixes.get(group)
+            if shared is not None:
+                # with nested prefixes left out, only the greatest prefix
+                # sorting before the path can be one of its ancestors
+                i = bisect_right(shared, path)
+                if i and path.startswith(shared[i - 1]):
+                    return True
+
+        return False
+
+    def groups(self, identity):
+        """
+        Returns the groups ``identity`` belongs to.
+        """
+        return self.loader(identity)
+
+    def _subtree(self, resource):
+        "Returns ``resource`` and every resource beneath it"
+        seen = {resource}
+        pending = [resource]
+
+        while pending:
+            for child in self._children.get(pending.pop(), ()):
+                seen.add(child)
+                pending.append(child)
+
+        return seen
+
+    def _update(self, group, paths, prefixes):
+        "Recomputes the shared prefixes of ``group`` from scratch"
+        shared = self._shares.get(group)
+        if shared:
+            prefixes[group] = _outermost(sorted(paths[r] for r in shared))
+        else:
+            prefixes.pop(group, None)
+
+    def __len__(self):
+        return len(self._state[0])
+
+    def __repr__(self):
+        return "<ResourceIndex resources={} groups={}>".format(
+            len(self), len(self._shares)
+        )
+
+
+class CanAccess(Requirement):
+    """
+    Requirement fulfilled when ``resource`` is shared with any group of the
+    identity in a :class:`ResourceIndex`::
+
+        index = ResourceIndex(loader=lambda user: user.team_ids)
+
+        @app.route("/documents/<int:id>")
+        def document(id):
+            with Permission(CanAccess("document:{}".format(id), index)):
+                ...
+
+    :param resource: The resource the identity must have access to
+    :param index: The :class:`ResourceIndex` tracking the resources
+
+    .. versionadded:: 0.8.0
+    """
+
+    __slots__ = ("resource", "index")
+
+    shareable = True
+
+    def __init__(self, resource, index):
+        self.resource = resource
+        self.index = index
+
+    def fulfill(self, user):
+        return self.index.accessible(self.index.groups(user), self.resource)
+
+    @classmethod
+    def fulfill_batch(cls, requirements, user):
+        """
+        Checks several resources for the same identity at once, used when
+        filtering with a ``chunk_size``, see
+        :meth:`Allows.filter <flask_allows.allows.Allows.filter>`. The groups
+        of the identity are loaded once per index.
+        """
+        groups = {}
+        results = []
+        for requirement in requirements:
+            index = requirement.index
+            if index not in groups:
+                groups[index] = index.groups(user)
+            results.append(index.accessible(groups[index], requirement.resource))
+        return results
+
+    def __eq__(self, other):
+        return (
+            self.__class__ is other.__class__
+            and self.index is other.index
+            and self.resource == other.resource
+        )
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.__class__, self.resource))
+
+    def __repr__(self):
+        return "<CanAccess({!r})>".format(self.resource)
+
+
+def _outermost(paths):
+    "Returns the sorted ``paths`` that aren't beneath another one of them"
+    outermost = []
+    for path in paths:
+        if not outermost or not path.startswith(outermost[-1]):
+            outermost.append(path)
+    return tuple(outermost)
@@ -0,0 +1,163 @@
+"""
+Signals sent by Flask-Allows while checking requirements. Signals are only
+available if `blinker <https://pythonhosted.org/blinker/>`_ is installed,
+otherwise sending them is a no-op.
+
+Timing information is only collected while at least one receiver is connected
+to the corresponding signal, so leaving signals unused costs nothing beyond
+checking for receivers.
+"""
+
+try:
+    from blinker import Namespace
+
+    signals_available = True
+except ImportError:  # pragma: no cover
+    signals_available = False
+
+    class Namespace(object):
+        def signal(self, name, doc=None):
+            return _FakeSignal(name, doc)
+
+    class _FakeSignal(object):
+        """
+        Stand in for blinker signals that allows sending but raises an error
+        when attempting to connect to it.
+        """
+
+        receivers = {}
+
+        def __init__(self, name, doc=None):
+            self.name = name
+            self.__doc__ = doc
+
+        def send(self, *args, **kwargs):
+            pass
+
+        def _fail(self, *args, **kwargs):
+            raise RuntimeError(
+                "Signalling support is unavailable because the blinker"
+                " library is not installed."
+            )
+
+        connect = connect_via = connected_to = temporarily_connected_to = _fail
+        disconnect = _fail
+        has_receivers_for = receivers_for = _fail
+        del _fail
+
+
+__all__ = (
+    "signals_available",
+    "requirement_evaluated",
+    "requirement_overridden",
+    "fulfill_finished",
+    "run_finished",
+    "check_traced",
+    "requirement_timed_out",
+    "breaker_state_changed",
+    "breaker_rejected",
+    "policies_reloaded",
+)
+
+_signals = Namespace()
+
+requirement_evaluated = _signals.signal(
+    "requirement-evaluated",
+    doc="""
+    Sent after a single requirement has been evaluated, including each
+    requirement nested inside of a
+    :class:`~flask_allows.requirements.ConditionalRequirement`. The sender is
+    the requirement and the following keyword arguments are sent:
+
+    - ``user`` the identity the requirement was checked against
+    - ``result`` the result of the requirement, None if it raised
+    - ``elapsed`` time spent evaluating the requirement in nanoseconds
+    - ``endpoint`` the current request endpoint or None outside of a request
+    - ``error`` the exception raised by the requirement, if any
+    """,
+)
+
+requirement_overridden = _signals.signal(
+    "requirement-overridden",
+    doc="""
+    Sent when a requirement is skipped because it has been overridden. The
+    sender is the requirement and ``user`` and ``endpoint`` are sent as keyword
+    arguments.
+    """,
+)
+
+fulfill_finished = _signals.signal(
+    "fulfill-finished",
+    doc="""
+    Sent after :meth:`~flask_allows.allows.Allows.fulfill` completes. The sender
+    is the :class:`~flask_allows.allows.Allows` instance and the following
+    keyword arguments are sent:
+
+    - ``requirements`` the requirements passed to fulfill
+    - ``identity`` the identity the requirements were checked against
+    - ``result`` the result of the check, None if a requirement raised
+    - ``elapsed`` time spent in fulfill in nanoseconds
+    - ``endpoint`` the current request endpoint or None outside of a request
+    - ``error`` the exception raised during the check, if any
+    """,
+)
+
+run_finished = _signals.signal(
+    "run-finished",
+    doc="""
+    Sent after :meth:`~flask_allows.allows.Allows.run` completes its check and
+    any failure handling but before the failure exception is raised. The sender
+    is the :class:`~flask_allows.allows.Allows` instance and ``requirements``,
+    ``identity``, ``result``, ``elapsed`` and ``endpoint`` are sent as keyword
+    arguments with the same meaning as :data:`fulfill_finished`.
+    """,
+)
+
+check_traced = _signals.signal(
+    "check-traced",
+    doc="""
+    Sent after a check made during a traced request completes. The sender is
+    the :class:`~flask_allows.allows.Allows` instance and the
+    :class:`~flask_allows.trace.Trace` is sent as the ``trace`` keyword
+    argument.
+    """,
+)
+
+requirement_timed_out = _signals.signal(
+    "requirement-timed-out",
+    doc="""
+    Sent when a requirement wrapped in :class:`~flask_allows.timeouts.Timeout`
+    does not finish in time. The sender is the wrapped requirement and
+    ``user``, ``timeout``, ``fallback`` and ``endpoint`` are sent as keyword
+    arguments.
+    """,
+)
+
+breaker_state_changed = _signals.signal(
+    "breaker-state-changed",
+    doc="""
+    Sent when a :class:`~flask_allows.breakers.CircuitBreaker` changes state.
+    The sender is the breaker and ``state`` and ``previous`` are sent as
+    keyword arguments.
+    """,
+)
+
+breaker_rejected = _signals.signal(
+    "breaker-rejected",
+    doc="""
+    Sent when an open :class:`~flask_allows.breakers.CircuitBreaker` answers a
+    check with its fallback decision. The sender is the breaker and ``user``
+    and ``endpoint`` are sent as keyword arguments.
+    """,
+)
+
+policies_reloaded = _signals.signal(
+    "policies-reloaded",
+    doc="""
+    Sent after a :class:`~flask_allows.policy.PolicyWatcher` reloads its policy
+    document because the file changed. The sender is the watcher and
+    ``policies``, ``previous`` and ``error`` are sent as keyword arguments.
+    When the document fails to load ``policies`` is None, ``error`` is the
+    exception and the previous policies stay active.
+    """,
+)
@@ -0,0 +1,100 @@
+import threading
+
+from flask import request
+
+from .engine import _call_requirement
+from .requirements import Requirement, _describe_requirement
+
+__all__ = ("SingleFlight",)
+
+
+class _Call(object):
+    "Internal record of an in flight evaluation"
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(Requirement):
+    """
+    Wraps an expensive requirement so that concurrent evaluations for the same
+    identity share a single call. The first thread to check an identity
+    evaluates the requirement while every other thread checking the same
+    identity at the same time waits for, and receives, its result::
+
+        owns_account = SingleFlight(OwnsAccount(), key=lambda user: user.id)
+
+    Nothing is cached: once the in flight evaluation completes, the next check
+    evaluates the requirement again. If the evaluation raises an exception,
+    every waiting thread raises it as well.
+
+    Evaluations are shared by every wrapper of an equal requirement, so
+    wrappers may be created where they're used, such as
+    ``SingleFlight(CanEdit(document), key=...)`` in a view. The wrapped
+    requirement should compare equal to another only when both decide the
+    same, and requirements that can't be hashed are only shared with
+    wrappers of the same instance.
+
+    The identity key should capture everything the wrapped requirement's result
+    depends on. By default the identity itself is used as the key, which only
+    coalesces checks that share the same identity object, so providing a key
+    function is recommended.
+
+    :param requirement: The requirement to coalesce evaluations of
+    :param key: Optional. Callable that receives the identity and returns a
+        hashable key identifying it.
+
+    .. versionadded:: 0.8.0
+    """
+
+    # shared by every wrapper so wrappers built per request still coalesce
+    _lock = threading.Lock()
+    _in_flight = {}
+
+    def __init__(self, requirement, key=None):
+        self.requirement = requirement
+        self.key = key
+        self._local = threading.local()
+
+    def fulfill(self, user):
+        requirement = self.requirement
+        try:
+            hash(requirement)
+        except TypeError:
+            # the leader keeps the requirement alive, so its id isn't reused
+            requirement = id(requirement)
+        key = (requirement, self.key(user) if self.key is not None else user)
+
+        with self._lock:
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _Call()
+
+        self._local.coalesced = not leader
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = _call_requirement(self.requirement, user, request)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            call.done.set()
+
+        return call.result
+
+    def trace_annotations(self):
+        return {"coalesced": getattr(self._local, "coalesced", False)}
+
+    def __repr__(self):
+        return "SingleFlight({})".format(_describe_requirement(self.requirement))
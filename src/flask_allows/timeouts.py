@@ -0,0 +1,155 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from flask import has_request_context, request
+
+from .additional import _additional_ctx_stack
+from .engine import _call_requirement, _current_endpoint
+from .overrides import _override_ctx_stack
+from .requirements import Requirement, _describe_requirement
+from .signals import requirement_timed_out
+
+__all__ = ("Timeout",)
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+#: Number of worker threads in the pool shared by :class:`Timeout` instances
+#: that aren't provided an executor.
+DEFAULT_POOL_SIZE = 16
+
+
+def _default_executor():
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                try:
+                    _executor = ThreadPoolExecutor(
+                        DEFAULT_POOL_SIZE, thread_name_prefix="flask-allows-timeout"
+                    )
+                except TypeError:  # pragma: no cover
+                    # naming worker threads requires Python 3.6
+                    _executor = ThreadPoolExecutor(DEFAULT_POOL_SIZE)
+    return _executor
+
+
+class Timeout(Requirement):
+    """
+    Wraps a requirement, including conditional requirements, so that it is
+    abandoned if it takes longer than the provided number of seconds::
+
+        requires(Timeout(HasEntitlement("reports"), 0.25))
+        requires(Timeout(Or(is_admin, InGroup("auditors")), 0.5, fallback=False))
+
+    The wrapped requirement runs on a worker pool with the current override
+    and additional contexts pushed on the worker thread. Flask's contexts
+    aren't pushed, so no teardown handlers run on the worker and the
+    requirement can't use ``request``, ``g`` or ``current_app``. Anything it
+    needs from them should be passed when creating it, for example
+    ``Timeout(CanEdit(g.document), 0.25)``.
+
+    If the requirement does not finish in time, the ``fallback`` decision is
+    used instead, which denies access unless configured otherwise. Each time
+    this happens a warning is logged to the ``flask_allows.timeouts`` logger
+    and :data:`~flask_allows.signals.requirement_timed_out` is sent.
+
+    Abandoned requirements continue running in the background and occupy a
+    worker thread until they complete. Once every worker is busy, new checks
+    wait for a worker and fall back once their timeout expires, so a slow
+    dependency can only tie up the pool rather than the threads handling
+    requests.
+
+    :param requirement: The requirement to enforce the timeout on
+    :param timeout: Seconds to wait for the requirement
+    :param fallback: Optional. The decision to use if the requirement times
+        out, defaults to False
+    :param executor: Optional. A :class:`concurrent.futures.Executor` to run
+        the requirement on. Defaults to a thread pool shared by every Timeout
+        with :data:`DEFAULT_POOL_SIZE` workers.
+
+    .. versionadded:: 0.8.0
+    """
+
+    def __init__(self, requirement, timeout, fallback=False, executor=None):
+        self.requirement = requirement
+        self.timeout = timeout
+        self.fallback = fallback
+        self.executor = executor
+
+    def fulfill(self, user):
+        executor = self.executor or _default_executor()
+        future = executor.submit(_in_current_context(self.requirement, user))
+
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+
+        logger.warning(
+            "%s timed out after %ss, using fallback decision %r",
+            _describe_requirement(self.requirement),
+            self.timeout,
+            self.fallback,
+        )
+
+        if requirement_timed_out.receivers:
+            requirement_timed_out.send(
+                self.requirement,
+                user=user,
+                timeout=self.timeout,
+                fallback=self.fallback,
+                endpoint=_current_endpoint(),
+            )
+
+        return self.fallback
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Timeout)
+            and self.requirement == other.requirement
+            and self.timeout == other.timeout
+            and self.fallback == other.fallback
+        )
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.requirement, self.timeout, self.fallback))
+
+    def __repr__(self):
+        return "Timeout({}, {!r}, fallback={!r})".format(
+            _describe_requirement(self.requirement), self.timeout, self.fallback
+        )
+
+
+def _in_current_context(requirement, user):
+    """
+    Internal helper that binds a requirement call to the override and
+    additional contexts active in the calling thread, and its request, so
+    that it may run on a different thread.
+    """
+    contexts = [
+        (_override_ctx_stack, _override_ctx_stack.top),
+        (_additional_ctx_stack, _additional_ctx_stack.top),
+    ]
+    contexts = [(stack, top) for stack, top in contexts if top is not None]
+    current_request = request._get_current_object() if has_request_context() else None
+
+    def call():
+        for stack, top in contexts:
+            stack.push(top)
+
+        try:
+            return _call_requirement(requirement, user, current_request)
+        finally:
+            for stack, _ in reversed(contexts):
+                stack.pop()
+
+    return call
@@ -0,0 +1,369 @@
+from ._compat import perf_counter_ns
+from .engine import _call_requirement, _current_endpoint, _is_conditional
+from .requirements import _describe_requirement
+from .signals import requirement_evaluated, requirement_overridden
+
+__all__ = ("Trace", "TraceNode")
+
+
+class TraceNode(object):
+    """
+    Record of how a single requirement was handled during a traced check.
+
+    :param requirement: The requirement this node represents
+    :param result: The result of the requirement, None if it was not
+        evaluated or raised an exception
+    :param elapsed: Time spent evaluating the requirement, including any
+        children, in nanoseconds
+    :param children: Nodes for requirements nested inside of a
+        :class:`~flask_allows.requirements.ConditionalRequirement`
+    :param overridden: True if the requirement was skipped because it was
+        overridden
+    :param skipped: True if the requirement was not evaluated because an
+        earlier requirement short circuited the check
+    :param short_circuited: True if evaluation of the remaining sibling
+        requirements stopped after this requirement
+    :param additional: True if the requirement was supplied by the current
+        :class:`~flask_allows.additional.Additional` context
+    :param error: The exception raised by the requirement, if any
+    :param annotations: Extra information reported by the requirement. Any
+        requirement may provide a ``trace_annotations`` method returning a
+        dictionary, which is called after it is evaluated during a traced check.
+    """
+
+    def __init__(
+        self,
+        requirement,
+        result=None,
+        elapsed=0,
+        children=(),
+        overridden=False,
+        skipped=False,
+        short_circuited=False,
+        additional=False,
+        error=None,
+        annotations=None,
+    ):
+        self.requirement = requirement
+        self.result = result
+        self.elapsed = elapsed
+        self.children = list(children)
+        self.overridden = overridden
+        self.skipped = skipped
+        self.short_circuited = short_circuited
+        self.additional = additional
+        self.error = error
+        self.annotations = annotations or {}
+
+    @property
+    def name(self):
+        return _describe_requirement(self.requirement)
+
+    @property
+    def status(self):
+        if self.overridden:
+            return "overridden"
+        if self.skipped:
+            return "skipped"
+        if self.error is not None:
+            return "error"
+        return "allow" if self.result else "deny"
+
+    def causes(self):
+        """
+        Returns the leaf nodes responsible for the result of this node. For
+        example, if ``Or(And(a, b), Not(c))`` is denied because ``b`` returned
+        False and ``c`` returned True then the nodes for ``b`` and ``c`` are
+        returned.
+        """
+        if self.error is not None:
+            erroring = [c for c in self.children if c.error is not None]
+            if not erroring:
+                return [self]
+            return [leaf for c in erroring for leaf in c.causes()]
+
+        if not self.children or self.overridden or self.skipped:
+            return [self]
+
+        raw = bool(self.result)
+        if getattr(self.requirement, "negated", False):
+            raw = not raw
+
+        evaluated = [c for c in self.children if not (c.overridden or c.skipped)]
+        blamed = [c for c in evaluated if bool(c.result) == raw]
+        return [leaf for c in blamed for leaf in c.causes()]
+
+    def to_dict(self):
+        """
+        Returns a JSON serializable representation of this node and its
+        children.
+        """
+        return {
+            "requirement": self.name,
+            "status": self.status,
+            "result": self.result if self.result is None else bool(self.result),
+            "elapsed": self.elapsed,
+            "overridden": self.overridden,
+            "skipped": self.skipped,
+            "short_circuited": self.short_circuited,
+            "additional": self.additional,
+            "error": None if self.error is None else repr(self.error),
+            "annotations": dict(self.annotations),
+            "children": [c.to_dict() for c in self.children],
+        }
+
+    def _format(self, lines, depth):
+        flags = [
+            flag
+            for flag, active in [
+                ("additional", self.additional),
+                ("short-circuit", self.short_circuited),
+            ]
+            if active
+        ]
+        line = "{indent}{status} {name} ({elapsed}ns)".format(
+            indent="  " * depth,
+            status=self.status.upper(),
+            name=self.name,
+            elapsed=self.elapsed,
+        )
+        flags.extend("{}={}".format(k, v) for k, v in sorted(self.annotations.items()))
+        if flags:
+            line = "{} [{}]".format(line, ", ".join(flags))
+        lines.append(line)
+
+        for child in self.children:
+            child._format(lines, depth + 1)
+
+    def __repr__(self):
+        return "<TraceNode {} status={}>".format(self.name, self.status)
+
+
+class Trace(object):
+    """
+    Structured record of a complete check produced by
+    :meth:`~flask_allows.allows.Allows.explain` or by request tracing.
+
+    :param identity: The identity the requirements were checked against
+    :param nodes: The :class:`TraceNode` for each top level requirement, in
+        evaluation order, starting with additional requirements
+    :param result: The result of the check, None if a requirement raised
+    :param elapsed: Time spent on the complete check in nanoseconds
+    :param endpoint: The endpoint of the current request, if any
+    :param error: The exception raised during the check, if any
+    """
+
+    def __init__(self, identity, nodes, result, elapsed, endpoint=None, error=None):
+        self.identity = identity
+        self.nodes = nodes
+        self.result = result
+        self.elapsed = elapsed
+        self.endpoint = endpoint
+        self.error = error
+
+    def causes(self):
+        """
+        Returns the leaf nodes responsible for the outcome of the check. For a
+        denied check these are the requirements that caused the denial.
+        """
+        if self.error is not None:
+            erroring = [n for n in self.nodes if n.error is not None]
+            return [leaf for n in erroring for leaf in n.causes()]
+
+        evaluated = [n for n in self.nodes if not (n.overridden or n.skipped)]
+
+        if not self.result:
+            evaluated = [n for n in evaluated if not n.result]
+
+        return [leaf for n in evaluated for leaf in n.causes()]
+
+    def format(self):
+        """
+        Renders the trace as an indented, human readable tree::
+
+            DENY (8734ns)
+              DENY Or(And(app.a, app.b), Not(app.c)) (8112ns)
+                DENY And(app.a, app.b) (3511ns)
+                  ALLOW app.a (1203ns)
+                  DENY app.b (1101ns) [short-circuit]
+                DENY Not(app.c) (2987ns)
+                  ALLOW app.c (1388ns)
+        """
+        status = (
+            "ERROR" if self.error is not None else "ALLOW" if self.result else "DENY"
+        )
+        lines = ["{} ({}ns)".format(status, self.elapsed)]
+
+        for node in self.nodes:
+            node._format(lines, 1)
+
+        return "\n".join(lines)
+
+    def to_dict(self):
+        """
+        Returns a JSON serializable representation of the trace.
+        """
+        return {
+            "result": self.result,
+            "elapsed": self.elapsed,
+            "endpoint": self.endpoint,
+            "error": None if self.error is None else repr(self.error),
+            "nodes": [n.to_dict() for n in self.nodes],
+        }
+
+    def __bool__(self):
+        return bool(self.result)
+
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        return "<Trace result={!r} nodes={!r}>".format(self.result, self.nodes)
+
+
+class _TracingError(Exception):
+    "Internal carrier for exceptions raised while tracing"
+
+    def __init__(self, error, nodes):
+        super(_TracingError, self).__init__(error)
+        self.error = error
+        self.nodes = nodes
+
+
+class _Tracer(object):
+    """
+    Internal evaluator that mirrors :meth:`Allows.fulfill
+    <flask_allows.allows.Allows.fulfill>` and
+    :meth:`ConditionalRequirement.fulfill
+    <flask_allows.requirements.ConditionalRequirement.fulfill>` while recording
+    a :class:`TraceNode` for every requirement it visits.
+    """
+
+    def __init__(self, overrides, additional, request):
+        self.overrides = overrides
+        self.additional = additional
+        self.request = request
+        # nodes currently being evaluated, outermost first
+        self.active = []
+
+    def trace(self, requirements, identity):
+        start = perf_counter_ns()
+        endpoint = _current_endpoint()
+
+        try:
+            nodes, result = self._evaluate_all(requirements, identity)
+        except _TracingError as e:
+            return Trace(
+                identity,
+                e.nodes,
+                None,
+                perf_counter_ns() - start,
+                endpoint=endpoint,
+                error=e.error,
+            )
+
+        return Trace(
+            identity, nodes, result, perf_counter_ns() - start, endpoint=endpoint
+        )
+
+    def _evaluate_all(self, requirements, identity):
+        candidates = [(r, True) for r in (self.additional or ())]
+        candidates.extend((r, False) for r in requirements)
+
+        nodes = []
+        result = True
+
+        for requirement, additional in candidates:
+            if not result:
+                nodes.append(
+                    TraceNode(requirement, skipped=True, additional=additional)
+                )
+                continue
+
+            node = self._visit(requirement, identity, nodes)
+            node.additional = additional
+
+            if not node.overridden and not node.result:
+                node.short_circuited = True
+                result = False
+
+        return nodes, result
+
+    def _visit(self, requirement, identity, siblings):
+        if self.overrides is not None and requirement in self.overrides:
+            if requirement_overridden.receivers:
+                requirement_overridden.send(
+                    requirement, user=identity, endpoint=_current_endpoint()
+                )
+            node = TraceNode(requirement, overridden=True)
+            siblings.append(node)
+            return node
+
+        node = TraceNode(requirement)
+        siblings.append(node)
+        conditional = _is_conditional(requirement)
+        self.active.append(node)
+        start = perf_counter_ns()
+
+        try:
+            if conditional:
+                node.result = self._visit_conditional(requirement, identity, node)
+            else:
+                node.result = _call_requirement(requirement, identity, self.request)
+        except _TracingError as e:
+            node.error = e.error
+            node.elapsed = perf_counter_ns() - start
+            raise _TracingError(e.error, siblings)
+        except Exception as e:
+            node.error = e
+            node.elapsed = perf_counter_ns() - start
+            _annotate(node)
+            raise _TracingError(e, siblings)
+        finally:
+            self.active.pop()
+
+        node.elapsed = perf_counter_ns() - start
+        _annotate(node)
+
+        if conditional and requirement_evaluated.receivers:
+            requirement_evaluated.send(
+                requirement,
+                user=identity,
+                result=node.result,
+                elapsed=node.elapsed,
+                endpoint=_current_endpoint(),
+                error=None,
+            )
+
+        return node
+
+    def _visit_conditional(self, requirement, identity, node):
+        reduced = None
+        stopped = False
+
+        for r in requirement.requirements:
+            if stopped:
+                node.children.append(TraceNode(r, skipped=True))
+                continue
+
+            child = self._visit(r, identity, node.children)
+            if child.overridden:
+                continue
+
+            if reduced is None:
+                reduced = child.result
+            else:
+                reduced = requirement.op(reduced, child.result)
+
+            if requirement.until == reduced:
+                child.short_circuited = stopped = True
+
+        if reduced is not None:
+            return not reduced if requirement.negated else reduced
+
+        return True
+
+
+def _annotate(node):
+    annotations = getattr(node.requirement, "trace_annotations", None)
+    if annotations is not None:
+        node.annotations.update(annotations())
@@ -0,0 +1,287 @@
+"""
+Wildcard permission strings such as ``project:42:issues:edit``, granted with
+patterns such as ``project:*:issues:*``. The grants of an identity are
+compiled into a trie so checking a permission takes one step per part of the
+permission however many grants the identity holds.
+"""
+
+import itertools
+import operator
+
+from ._compat import string_types
+from .requirements import Requirement
+
+__all__ = ("PermissionTrie", "WildcardRegistry", "Permits", "wildcard_permissions")
+
+
+class PermissionTrie(object):
+    """
+    The compiled grants of an identity. Grants are strings of parts
+    separated by ``:``, where a part is ``*`` to match any value or a list of
+    values separated by ``,`` to match any of them. A grant with fewer parts
+    than a permission implies every permission beneath it::
+
+        trie = PermissionTrie(["project:42", "project:*:issues:view,edit"])
+
+        trie.implies("project:42:wiki:edit")  # True
+        trie.implies("project:7:issues:edit")  # True
+        trie.implies("project:7:issues:delete")  # False
+
+    Grants using ``*`` are merged into their literal siblings when the trie
+    is compiled, so matching never backtracks.
+
+    :param grants: The grant strings to compile
+    :raises ValueError: If a grant has an empty part
+
+    .. versionadded:: 0.8.0
+    """
+
+    __slots__ = ("_root",)
+
+    def __init__(self, grants):
+        root = _Node()
+        for grant in grants:
+            nodes = [root]
+            for values in _parse(grant):
+                nodes = [node.child(value) for node in nodes for value in values]
+            for node in nodes:
+                node.end = True
+        self._root = _determinize(root, {})
+
+    def implies(self, permission):
+        """
+        Returns True if any grant implies ``permission``, a string without
+        wildcards or a sequence of its parts.
+        """
+        if isinstance(permission, string_types):
+            permission = permission.split(":")
+
+        node = self._root
+        for part in permission:
+            if node.end:
+                return True
+            child = node.children.get(part)
+            node = node.wildcard if child is None else child
+            if node is None:
+                return False
+        return node.implied
+
+
+class WildcardRegistry(object):
+    """
+    Loads the grants of identities and compiles them into a
+    :class:`PermissionTrie`. Tries are cached by the set of grants, so
+    identities holding the same grants share one and each set is compiled
+    once. The trie of each identity is also remembered while the loader keeps
+    returning the same grants object for it, so only the first check of an
+    identity hashes its grants and later checks take one step per part of the
+    permission. Grants changed in place aren't noticed, replace them instead.
+
+    :param loader: Optional. A callable accepting an identity and returning
+        either its grant strings or a :class:`PermissionTrie`, defaults to
+        reading the ``attribute`` of the identity
+    :param attribute: Optional. The attribute read by the default loader
+    :param cache_size: Optional. Number of tries and of identities to cache,
+        each cache is emptied when full
+
+    Identities are held by the cache until it's emptied. To check new
+    identities without hashing their grants, return the grants as a
+    ``frozenset``, which remembers its hash, or return a trie compiled when
+    the identity is loaded::
+
+        def load_user(user_id):
+            user = User.query.get(user_id)
+            user.permission_trie = PermissionTrie(user.permission_strings)
+            return user
+
+        wildcard_permissions.loader = lambda user: user.permission_trie
+
+    .. versionadded:: 0.8.0
+    """
+
+    def __init__(self, loader=None, attribute="permissions", cache_size=1024):
+        self.loader = loader or operator.attrgetter(attribute)
+        self.cache_size = cache_size
+        self._cache = {}
+        self._identities = {}
+
+    def trie(self, identity):
+        """
+        Returns the :class:`PermissionTrie` of the grants of ``identity``.
+        """
+        granted = self.loader(identity)
+        if isinstance(granted, PermissionTrie):
+            return granted
+
+        # the identity is kept in the entry so its id can't be reused while
+        # the entry exists
+        identities = self._identities
+        entry = identities.get(id(identity))
+        if entry is not None and entry[0] is identity and entry[1] is granted:
+            return entry[2]
+
+        trie = self._compiled(granted)
+        if len(identities) >= self.cache_size:
+            identities.clear()
+        identities[id(identity)] = (identity, granted, trie)
+        return trie
+
+    def _compiled(self, granted):
+        # frozenset returns frozensets as they are, keeping their cached hash
+        key = frozenset(granted)
+        cache = self._cache
+
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+
+        trie = PermissionTrie(key)
+        if len(cache) >= self.cache_size:
+            cache.clear()
+        cache[key] = trie
+        return trie
+
+
+#: Default registry of :class:`Permits`, reads ``identity.permissions``
+wildcard_permissions = WildcardRegistry()
+
+
+class Permits(Requirement):
+    """
+    Requirement fulfilled when the grants of the identity imply the
+    permission::
+
+        requires(Permits("project:42:issues:edit"))
+
+    A part listing several values separated by ``,`` requires each of them,
+    ``Permits("project:42:issues:view,edit")`` requires both viewing and
+    editing.
+
+    :param permission: The permission required
+    :param registry: Optional. The :class:`WildcardRegistry` to use,
+        defaults to :data:`wildcard_permissions`
+    :raises ValueError: If the permission has an empty part
+
+    .. versionadded:: 0.8.0
+    """
+
+    __slots__ = ("permission", "registry", "_required")
+
+    shareable = True
+
+    def __init__(self, permission, registry=None):
+        self.permission = permission
+        self.registry = wildcard_permissions if registry is None else registry
+        self._required = list(itertools.product(*_parse(permission)))
+
+    def fulfill(self, user):
+        trie = self.registry.trie(user)
+        for parts in self._required:
+            if not trie.implies(parts):
+                return False
+        return True
+
+    def __eq__(self, other):
+        return (
+            self.__class__ is other.__class__
+            and self.registry is other.registry
+            and self.permission == other.permission
+        )
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.__class__, self.permission))
+
+    def __repr__(self):
+        return "<Permits({!r})>".format(self.permission)
+
+
+class _Node(object):
+    __slots__ = ("children", "wildcard", "end", "implied")
+
+    def __init__(self):
+        self.children = {}
+        # child matching any part
+        self.wildcard = None
+        # a grant ends here and implies everything beneath
+        self.end = False
+        # a grant ends here or continues with wildcards only
+        self.implied = False
+
+    def child(self, value):
+        if value == "*":
+            if self.wildcard is None:
+                self.wildcard = _Node()
+            return self.wildcard
+        return self.children.setdefault(value, _Node())
+
+
+_END = _Node()
+_END.end = _END.implied = True
+
+
+def _parse(permission):
+    "Returns the values of each part of ``permission``"
+    parts = []
+    for part in permission.split(":"):
+        values = part.split(",")
+        if not all(values):
+            raise ValueError("{!r} has an empty part".format(permission))
+        parts.append(values)
+    return parts
+
+
+def _determinize(node, memo):
+    """
+    Returns an equivalent of the trie at ``node`` where the children matching
+    a literal value also hold everything beneath the wildcard child, so only
+    one child ever needs to be followed.
+    """
+    if node.end:
+        # everything beneath a grant's end is implied anyway
+        return _END
+
+    try:
+        return memo[id(node)]
+    except KeyError:
+        pass
+
+    out = memo[id(node)] = _Node()
+    wildcard = node.wildcard
+    for value, child in node.children.items():
+        if wildcard is not None:
+            child = _merge(child, wildcard, memo)
+        out.children[value] = _determinize(child, memo)
+
+    if wildcard is not None:
+        out.wildcard = _determinize(wildcard, memo)
+        out.implied = out.wildcard.implied
+    return out
+
+
+def _merge(a, b, memo):
+    "Returns a trie matching everything either ``a`` or ``b`` matches"
+    key = ("merge", id(a), id(b))
+    try:
+        return memo[key]
+    except KeyError:
+        pass
+
+    merged = memo[key] = _Node()
+    merged.end = a.end or b.end
+    if not merged.end:
+        for value in set(a.children) | set(b.children):
+            left, right = a.children.get(value), b.children.get(value)
+            if left is None or right is None:
+                merged.children[value] = left or right
+            else:
+                merged.children[value] = _merge(left, right, memo)
+
+        if a.wildcard is None or b.wildcard is None:
+            merged.wildcard = a.wildcard or b.wildcard
+        else:
+            merged.wildcard = _merge(a.wildcard, b.wildcard, memo)
+    return merged
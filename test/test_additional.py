@@ -153,3 +153,8 @@ class TestAdditionalManager(object):
         with manager.additional(parent):
             with manager.additional(child, use_parent=True):
                 assert expected == manager.current
+
+
+def test_additional_and_manager_are_slotted():
+    assert not hasattr(Additional(some_requirement), "__dict__")
+    assert not hasattr(AdditionalManager(), "__dict__")
@@ -1,8 +1,13 @@
+try:
+    import tracemalloc
+except ImportError:  # pragma: no cover
+    tracemalloc = None
+
 import pytest
 from flask import Response
 from werkzeug.exceptions import Forbidden
 
-from flask_allows import Allows
+from flask_allows import Allows, And, Not, Or, Requirement
 from flask_allows.additional import Additional, current_additions
 from flask_allows.overrides import Override, current_overrides
 
@@ -239,3 +244,79 @@ def test_req_called_once_even_if_added_multiple_times(member, counter):
 
     assert allows.fulfill([])
     assert counter.count == 1
+
+
+def test_requirement_instances_do_not_warn(member, always):
+    import warnings
+
+    allows = Allows(identity_loader=lambda: member)
+
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter("always", DeprecationWarning)
+        assert allows.fulfill([always, Or(always), And(Not(always), always) | always])
+
+    assert not w
+
+
+def test_old_style_requirement_instance_receives_request(app, member):
+    import warnings
+
+    class OldStyle(Requirement):
+        def fulfill(self, user, request):
+            return request.path == "/old"
+
+    allows = Allows(app, identity_loader=lambda: member)
+
+    with app.test_request_context("/old"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        assert allows.fulfill([OldStyle(), And(OldStyle())])
+
+
+@pytest.mark.skipif(
+    not hasattr(tracemalloc, "reset_peak"), reason="requires tracemalloc.reset_peak"
+)
+def test_fulfill_fast_path_allocations_do_not_grow(app, member, always):
+    allows = Allows(app, identity_loader=lambda: member)
+
+    def peak(requirements):
+        for _ in range(10):
+            allows.fulfill(requirements)
+
+        tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            allows.fulfill(requirements)
+            after, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert after <= before
+        return peak - before
+
+    with app.test_request_context("/"):
+        app.preprocess_request()
+
+        assert peak([always] * 10) == peak([always])
+        assert peak([Or(*[Not(always)] * 10)]) == peak([Or(Not(always))])
+
+        distinct = [lambda user: True for _ in range(100)]
+        assert peak(distinct) == peak(distinct[:1])
+
+
+def test_filter_resolves_contexts_when_called(member, never):
+    allows = Allows(identity_loader=lambda: member)
+    allows.overrides.push(Override(never))
+
+    allowed = allows.filter(range(3), lambda item: never)
+    allows.overrides.pop()
+
+    assert list(allowed) == [0, 1, 2]
+    assert list(allows.filter(range(3), lambda item: never)) == []
+
+
+def test_filter_with_identity(admin, guest, atleastmod):
+    allows = Allows(identity_loader=lambda: guest)
+
+    assert list(allows.filter(range(3), lambda item: atleastmod)) == []
+    assert list(allows.filter(range(3), lambda item: atleastmod, admin)) == [0, 1, 2]
@@ -0,0 +1,203 @@
+import json
+import os
+import threading
+
+import pytest
+
+from flask_allows.allows import Allows
+from flask_allows.audit import AuditLog
+
+
+def is_member(user):
+    return user.permlevel >= 0
+
+
+def broken(user):
+    raise ValueError("nope")
+
+
+def _records(audit):
+    with open(audit.path) as fh:
+        return [json.loads(line) for line in fh]
+
+
+def test_records_denied_checks(tmpdir, member, guest):
+    audit = AuditLog(str(tmpdir), identity_key=lambda user: user.name)
+    allows = Allows(audit=audit)
+
+    allows.fulfill([is_member], identity=member)
+    allows.fulfill([is_member], identity=guest)
+    audit.close()
+
+    records = _records(audit)
+    assert len(records) == 1
+    record = records[0]
+    assert record["identity"] == guest.name
+    assert record["requirements"] == ["{}.is_member".format(__name__)]
+    assert record["result"] is False
+    assert record["error"] is None
+    assert record["endpoint"] is None
+    assert record["elapsed"] >= 0
+
+
+def test_records_sampled_allowed_checks(tmpdir, member):
+    audit = AuditLog(str(tmpdir), allow_sample_rate=1)
+    allows = Allows(audit=audit)
+
+    allows.fulfill([is_member], identity=member)
+    audit.close()
+
+    records = _records(audit)
+    assert len(records) == 1
+    assert records[0]["result"] is True
+    assert records[0]["identity"] == repr(member)
+
+
+def test_records_errors(tmpdir, member):
+    audit = AuditLog(str(tmpdir))
+    allows = Allows(audit=audit)
+
+    with pytest.raises(ValueError):
+        allows.fulfill([broken], identity=member)
+    audit.close()
+
+    (record,) = _records(audit)
+    assert record["result"] is None
+    assert record["error"] == repr(ValueError("nope"))
+
+
+def test_records_endpoint(app, tmpdir, member):
+    audit = AuditLog(str(tmpdir))
+    allows = Allows(app, identity_loader=lambda: member, audit=audit)
+
+    @app.route("/")
+    def index():
+        return str(allows.fulfill([lambda user: False]))
+
+    app.test_client().get("/")
+    audit.close()
+
+    (record,) = _records(audit)
+    assert record["endpoint"] == "index"
+
+
+def test_ignores_other_allows_instances(tmpdir, guest):
+    audit = AuditLog(str(tmpdir))
+    Allows(audit=audit)
+    other = Allows()
+
+    other.fulfill([is_member], identity=guest)
+    audit.close()
+
+    assert not os.path.exists(audit.path)
+
+
+def test_drops_records_when_queue_is_full(tmpdir, guest):
+    audit = AuditLog(str(tmpdir), max_queue=1, flush_interval=0)
+    entered, release = threading.Event(), threading.Event()
+    write_batch = audit._write_batch
+
+    def blocking_write(batch):
+        entered.set()
+        release.wait()
+        write_batch(batch)
+
+    audit._write_batch = blocking_write
+
+    audit.record(guest, [is_member], False, 1)
+    assert entered.wait(1)
+    audit.record(guest, [is_member], False, 2)
+    audit.record(guest, [is_member], False, 3)
+
+    assert audit.dropped == 1
+
+    release.set()
+    audit.close()
+    assert [r["elapsed"] for r in _records(audit)] == [1, 2]
+
+
+def test_rotates_files(tmpdir, guest):
+    audit = AuditLog(str(tmpdir), max_bytes=1, backup_count=2, batch_size=1)
+
+    for i in range(4):
+        audit.record(guest, [is_member], False, i)
+    audit.close()
+
+    assert len(_records(audit)) == 1
+    assert os.path.exists(audit.path + ".1")
+    assert os.path.exists(audit.path + ".2")
+    assert not os.path.exists(audit.path + ".3")
+
+
+def test_rotates_files_by_size_in_bytes(tmpdir, guest):
+    name = b"\xc3\xa9".decode("utf-8") * 100
+    audit = AuditLog(
+        str(tmpdir),
+        identity_key=lambda user: name,
+        batch_size=1,
+        max_bytes=1000,
+        backup_count=5,
+    )
+
+    for i in range(6):
+        audit.record(guest, [is_member], False, i)
+    audit.close()
+
+    paths = [audit.path] + ["{}.{}".format(audit.path, i) for i in range(1, 6)]
+    sizes = [os.path.getsize(p) for p in paths if os.path.exists(p)]
+    assert len(sizes) > 1 and max(sizes) <= 1000
+
+
+def test_ignores_records_after_close(tmpdir, guest):
+    audit = AuditLog(str(tmpdir))
+    audit.close()
+
+    audit.record(guest, [is_member], False, 1)
+
+    assert not os.path.exists(audit.path)
+
+
+def test_rejects_unknown_policy(tmpdir):
+    with pytest.raises(ValueError):
+        AuditLog(str(tmpdir), policy="spill")
+
+
+def test_keeps_writing_after_failures(tmpdir, guest):
+    directory = tmpdir.join("missing")
+    audit = AuditLog(str(directory), policy="block", max_queue=1, flush_interval=0)
+
+    def record_many():
+        for i in range(5):
+            audit.record(guest, [is_member], False, i)
+
+    recorder = threading.Thread(target=record_many)
+    recorder.start()
+    recorder.join(5)
+
+    assert not recorder.is_alive()
+    assert audit._thread.is_alive()
+
+    directory.mkdir()
+    audit.record(guest, [is_member], False, 5)
+    audit.close()
+
+    assert audit.failed + len(_records(audit)) == 6
+    assert _records(audit)[-1]["elapsed"] == 5
+
+
+def test_close_does_not_wait_forever_on_a_stuck_writer(tmpdir, guest):
+    audit = AuditLog(str(tmpdir), max_queue=1, flush_interval=0)
+    entered, release = threading.Event(), threading.Event()
+
+    def stuck_write(batch):
+        entered.set()
+        release.wait()
+
+    audit._write_batch = stuck_write
+
+    audit.record(guest, [is_member], False, 1)
+    assert entered.wait(1)
+    audit.record(guest, [is_member], False, 2)
+
+    audit.close(timeout=0.1)
+    release.set()
@@ -0,0 +1,140 @@
+import time
+
+import pytest
+
+from flask_allows.allows import Allows
+from flask_allows.breakers import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from flask_allows.metrics import MetricsRegistry
+from flask_allows.signals import breaker_state_changed
+
+
+class Flaky(object):
+    def __init__(self):
+        self.calls = 0
+        self.failing = True
+
+    def __call__(self, user):
+        self.calls += 1
+        if self.failing:
+            raise IOError("service unavailable")
+        return True
+
+
+@pytest.fixture
+def flaky():
+    return Flaky()
+
+
+def _fail(allows, times):
+    for _ in range(times):
+        with pytest.raises(IOError):
+            allows.fulfill([allows.breaker])
+
+
+@pytest.fixture
+def allows(member, flaky):
+    allows = Allows(identity_loader=lambda: member)
+    allows.breaker = CircuitBreaker(flaky, failure_threshold=2, reset_timeout=0.05)
+    return allows
+
+
+def test_breaker_opens_after_threshold(allows, flaky):
+    _fail(allows, 2)
+
+    assert allows.breaker.state == OPEN
+    assert not allows.fulfill([allows.breaker])
+    assert flaky.calls == 2
+
+
+def test_breaker_success_resets_failures(allows, flaky):
+    _fail(allows, 1)
+    flaky.failing = False
+    assert allows.fulfill([allows.breaker])
+    flaky.failing = True
+    _fail(allows, 1)
+
+    assert allows.breaker.state == CLOSED
+
+
+def test_breaker_half_open_probe_closes(allows, flaky):
+    _fail(allows, 2)
+    time.sleep(0.06)
+    assert allows.breaker.state == HALF_OPEN
+
+    flaky.failing = False
+    assert allows.fulfill([allows.breaker])
+    assert allows.breaker.state == CLOSED
+
+
+def test_breaker_half_open_failure_reopens(allows, flaky):
+    _fail(allows, 2)
+    time.sleep(0.06)
+
+    _fail(allows, 1)
+    assert allows.breaker.state == OPEN
+    assert flaky.calls == 3
+
+
+def test_breaker_half_open_unrelated_error_keeps_probing(allows, flaky):
+    allows.breaker.failures = (IOError,)
+    _fail(allows, 2)
+    time.sleep(0.06)
+
+    flaky.failing = False
+    allows.breaker.requirement = lambda user: {}["missing"]
+    with pytest.raises(KeyError):
+        allows.fulfill([allows.breaker])
+    assert allows.breaker.state == HALF_OPEN
+
+    allows.breaker.requirement = flaky
+    assert allows.fulfill([allows.breaker])
+    assert allows.breaker.state == CLOSED
+
+
+def test_breaker_slow_calls_count_as_failures(member):
+    def slow(user):
+        time.sleep(0.01)
+        return True
+
+    allows = Allows(identity_loader=lambda: member)
+    breaker = CircuitBreaker(slow, failure_threshold=1, slow_call=0.001)
+
+    assert allows.fulfill([breaker])
+    assert breaker.state == OPEN
+
+
+def test_breaker_sends_state_changes(allows):
+    changes = []
+
+    def receiver(sender, state, previous):
+        changes.append((previous, state))
+
+    with breaker_state_changed.connected_to(receiver, sender=allows.breaker):
+        _fail(allows, 2)
+        allows.breaker.reset()
+
+    assert changes == [(CLOSED, OPEN), (OPEN, CLOSED)]
+
+
+def test_breaker_visible_in_metrics(member, flaky):
+    registry = MetricsRegistry()
+    allows = Allows(identity_loader=lambda: member, metrics=registry)
+    allows.breaker = CircuitBreaker(flaky, failure_threshold=1)
+
+    _fail(allows, 1)
+    allows.fulfill([allows.breaker])
+
+    text = registry.render()
+    label = 'requirement="{!r}"'.format(flaky)
+    assert "flask_allows_circuit_breakers{" + label + ',state="open"} 1' in text
+    decisions = "flask_allows_requirement_decisions_total"
+    assert decisions + '{endpoint="",' + label + ',outcome="rejected"} 1' in text
+
+
+def test_breaker_visible_in_trace(allows):
+    _fail(allows, 2)
+
+    trace = allows.explain([allows.breaker])
+
+    assert trace.nodes[0].annotations == {"circuit": OPEN, "rejected": True}
+    assert "circuit=open" in trace.format()
@@ -0,0 +1,100 @@
+import logging
+import threading
+import time
+
+from flask_allows.allows import Allows
+from flask_allows.budget import LatencyBudget, _Watch
+from flask_allows.requirements import And, Not
+
+
+def fast(user):
+    return True
+
+
+def slow(user):
+    time.sleep(0.05)
+    return True
+
+
+def test_reports_slow_checks_with_running_requirement(member):
+    reports = []
+    budget = LatencyBudget(0.005, sample_rate=1, callback=reports.append)
+    allows = Allows(identity_loader=lambda: member, latency_budget=budget)
+
+    assert allows.fulfill([fast, And(fast, slow)])
+
+    [report] = reports
+    assert report.elapsed > 5000000 and report.budget == 0.005
+    assert report.requirement is slow
+    assert [n.requirement for n in report.running] == [And(fast, slow), slow]
+    assert any("time.sleep" in frame for frame in report.stack)
+    assert report.trace.result is True
+
+
+def test_fast_checks_are_not_reported(member):
+    reports = []
+    budget = LatencyBudget(1, sample_rate=1, callback=reports.append)
+    allows = Allows(identity_loader=lambda: member, latency_budget=budget)
+
+    assert not allows.fulfill([fast, Not(fast)])
+    assert reports == []
+
+
+def test_unsampled_checks_are_not_watched(member):
+    reports = []
+    budget = LatencyBudget(0.001, sample_rate=0, callback=reports.append)
+    allows = Allows(identity_loader=lambda: member, latency_budget=budget)
+
+    assert allows.fulfill([slow])
+    assert reports == []
+
+
+def test_logs_slow_checks_by_default(member, caplog):
+    allows = Allows(
+        identity_loader=lambda: member,
+        latency_budget=LatencyBudget(0.005, sample_rate=1),
+    )
+
+    with caplog.at_level(logging.WARNING, logger="flask_allows.budget"):
+        allows.fulfill([slow])
+
+    [record] = caplog.records
+    assert "budget is 5.000ms" in record.getMessage()
+    assert "Running when budget was exceeded: {}.slow".format(__name__) in (
+        record.getMessage()
+    )
+
+
+def test_finished_checks_do_not_accumulate(member):
+    budget = LatencyBudget(60, sample_rate=1)
+    allows = Allows(identity_loader=lambda: member, latency_budget=budget)
+
+    for _ in range(100):
+        assert allows.fulfill([fast])
+
+    assert len(budget._watchdog._heap) <= 1
+
+
+def test_sampling_does_not_block_other_checks(member, monkeypatch):
+    sampling, release = threading.Event(), threading.Event()
+    sample = _Watch.sample
+
+    def blocking_sample(watch):
+        sampling.set()
+        release.wait(5)
+        sample(watch)
+
+    monkeypatch.setattr(_Watch, "sample", blocking_sample)
+    budget = LatencyBudget(0.005, sample_rate=1, callback=lambda report: None)
+    allows = Allows(identity_loader=lambda: member, latency_budget=budget)
+    checking = threading.Thread(target=allows.fulfill, args=([slow],))
+    checking.start()
+
+    try:
+        assert sampling.wait(5)
+        start = time.time()
+        assert allows.fulfill([fast])
+        assert time.time() - start < 1
+    finally:
+        release.set()
+        checking.join()
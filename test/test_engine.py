@@ -0,0 +1,336 @@
+import pytest
+
+from flask_allows.additional import Additional
+from flask_allows.allows import Allows
+from flask_allows.engine import Engine
+from flask_allows.overrides import Override, OverrideManager
+from flask_allows.requirements import (
+    And,
+    ConditionalRequirement,
+    Not,
+    Or,
+    Requirement,
+)
+from flask_allows.signals import requirement_evaluated
+
+
+def is_member(user):
+    return user.permlevel >= 0
+
+
+def is_admin(user):
+    return user.permlevel >= 2
+
+
+def test_fulfills_without_any_context(member, guest, always):
+    engine = Engine()
+
+    assert engine.fulfill([is_member, always], member)
+    assert not engine.fulfill([is_member, always], guest)
+    assert engine.fulfill([Or(is_admin, And(is_member, Not(is_admin)))], member)
+
+
+def test_empty_requirements_are_fulfilled(member):
+    assert Engine().fulfill([], member)
+
+
+def test_checks_additional_requirements_first(member, never, always):
+    engine = Engine()
+
+    assert not engine.fulfill([always], member, additional=Additional(never))
+    assert not always.called
+
+
+def test_skips_overridden_requirements(member):
+    engine = Engine()
+
+    assert engine.fulfill([is_admin], member, overrides=Override(is_admin))
+    assert not engine.fulfill([is_admin], member, overrides=Override())
+
+
+def test_overrides_apply_to_nested_conditionals(member):
+    engine = Engine()
+    policy = And(is_member, Or(is_admin, And(is_admin)))
+
+    assert not engine.fulfill([policy], member)
+    assert engine.fulfill([policy], member, overrides=Override(is_admin))
+
+
+def test_overridden_additional_requirements_are_skipped(member, never):
+    engine = Engine()
+
+    assert engine.fulfill(
+        [], member, overrides=Override(never), additional=Additional(never)
+    )
+
+
+def test_ignores_pushed_override_contexts(member):
+    manager = OverrideManager()
+    manager.push(Override(is_admin))
+
+    assert not Engine().fulfill([And(is_admin)], member)
+
+
+def test_calls_conditional_subclasses_with_custom_fulfill(member):
+    class Always(ConditionalRequirement):
+        def fulfill(self, user, request=None):
+            return True
+
+    assert Engine().fulfill([Always(is_admin)], member)
+
+
+def test_sends_requirement_evaluated_for_walked_conditionals(member):
+    calls = []
+    policy = And(is_member)
+
+    def receiver(sender, **kwargs):
+        calls.append((sender, kwargs["result"]))
+
+    with requirement_evaluated.connected_to(receiver):
+        Engine().fulfill([policy], member)
+
+    assert calls == [(is_member, True), (policy, True)]
+
+
+def test_propagates_errors(member):
+    def broken(user):
+        raise ValueError()
+
+    with pytest.raises(ValueError):
+        Engine().fulfill([Or(broken)], member)
+
+
+def test_shared_requirements_are_evaluated_once_per_check(member, counter):
+    engine = Engine()
+    requirements = [Or(is_admin, And(counter)), Or(is_admin, And(counter)), counter]
+
+    assert engine.fulfill(requirements, member, additional=Additional(counter))
+    assert counter.count == 1
+
+    assert engine.fulfill(requirements, member)
+    assert counter.count == 2
+
+
+def test_shared_requirements_honor_overrides(member, counter):
+    requirements = [Or(is_admin, counter), And(is_admin, counter)]
+
+    assert not Engine().fulfill(requirements, member)
+    assert Engine().fulfill(requirements, member, overrides=Override(is_admin))
+    assert counter.count == 2
+
+
+def test_does_not_share_requirements_of_different_classes(member):
+    class Always(ConditionalRequirement):
+        def fulfill(self, user, request=None):
+            return True
+
+    assert Always(is_admin) == ConditionalRequirement(is_admin)
+    assert Engine().fulfill([Always(is_admin)], member)
+    assert not Engine().fulfill(
+        [Always(is_admin), ConditionalRequirement(is_admin)], member
+    )
+
+
+def test_shares_other_requirements_only_with_themselves(member):
+    class Coarse(Requirement):
+        def __init__(self, result):
+            self.result = result
+
+        def fulfill(self, user):
+            return self.result
+
+        def __eq__(self, other):
+            return isinstance(other, Coarse)
+
+        def __hash__(self):
+            return hash(Coarse)
+
+    assert Coarse(True) == Coarse(False)
+    assert not Engine().fulfill([Or(Coarse(True)), Or(Coarse(False))], member)
+
+
+def test_shares_equal_requirements_of_shareable_classes(member):
+    class Shareable(Requirement):
+        shareable = True
+        count = 0
+
+        def fulfill(self, user):
+            Shareable.count += 1
+            return True
+
+        def __eq__(self, other):
+            return isinstance(other, Shareable)
+
+        def __hash__(self):
+            return hash(Shareable)
+
+    assert Engine().fulfill([Or(Shareable()), And(Shareable())], member)
+    assert Shareable.count == 1
+
+
+def test_shares_unhashable_requirements_only_with_themselves(member):
+    class Unhashable(Requirement):
+        shareable = True
+        count = 0
+        __hash__ = None
+
+        def fulfill(self, user):
+            Unhashable.count += 1
+            return True
+
+        def __eq__(self, other):
+            return isinstance(other, Unhashable)
+
+    unhashable = Unhashable()
+
+    assert Engine().fulfill([unhashable, And(unhashable, Unhashable())], member)
+    assert Unhashable.count == 2
+
+
+def test_allows_delegates_to_its_engine(app, member):
+    class RecordingEngine(Engine):
+        def __init__(self):
+            self.calls = []
+
+        def fulfill(self, requirements, identity, *args):
+            self.calls.append((requirements, identity) + args)
+            return False
+
+    allows = Allows(app, identity_loader=lambda: member)
+    allows.engine = RecordingEngine()
+
+    with app.test_request_context("/"):
+        app.preprocess_request()
+        assert not allows.fulfill([is_member])
+
+    [(requirements, identity, overrides, additional, _)] = allows.engine.calls
+    assert requirements == [is_member] and identity is member
+    assert overrides == Override() and additional == Additional()
+
+
+class Owned(Requirement):
+    "Requirement fulfilled when the item belongs to the user"
+
+    checked = []
+
+    def __init__(self, item):
+        self.item = item
+
+    def fulfill(self, user):
+        self.checked.append(self.item)
+        return self.item % 3 == user.permlevel % 3
+
+
+class BatchedOwned(Owned):
+    batches = []
+
+    @classmethod
+    def fulfill_batch(cls, requirements, user):
+        cls.batches.append([r.item for r in requirements])
+        return [r.item % 3 == user.permlevel % 3 for r in requirements]
+
+
+@pytest.fixture(autouse=True)
+def clear_owned():
+    del Owned.checked[:], BatchedOwned.batches[:]
+
+
+def test_filter_yields_allowed_items(member):
+    engine = Engine()
+
+    allowed = engine.filter(range(10), Owned, member)
+
+    assert list(allowed) == [0, 3, 6, 9]
+
+
+def test_filter_is_lazy(member):
+    def items():
+        for i in range(10):
+            yield i
+        raise AssertionError("the items should only be consumed as needed")
+
+    allowed = Engine().filter(items(), Owned, member)
+
+    assert Owned.checked == []
+    assert next(allowed) == 0
+    assert next(allowed) == 3
+    assert Owned.checked == [0, 1, 2, 3]
+
+
+def test_filter_accepts_lists_of_requirements(member):
+    allowed = Engine().filter(range(10), lambda i: [Owned(i), is_admin], member)
+
+    assert list(allowed) == []
+
+
+def test_filter_checks_additional_requirements_once(member, counter):
+    allowed = Engine().filter(range(10), Owned, member, additional=Additional(counter))
+
+    assert list(allowed) == [0, 3, 6, 9]
+    assert counter.count == 1
+    assert (
+        list(Engine().filter(range(10), Owned, member, additional=Additional(is_admin)))
+        == []
+    )
+
+
+def test_filter_skips_overridden_requirements(member):
+    overrides = Override(is_admin)
+
+    allowed = Engine().filter(
+        range(4), lambda i: [Owned(i), is_admin], member, overrides
+    )
+
+    assert list(allowed) == [0, 3]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 4, 100])
+def test_filter_in_chunks(member, chunk_size):
+    allowed = Engine().filter(range(10), BatchedOwned, member, chunk_size=chunk_size)
+
+    assert list(allowed) == [0, 3, 6, 9]
+    assert BatchedOwned.batches == [
+        list(range(10))[i : i + chunk_size] for i in range(0, 10, chunk_size)
+    ]
+
+
+def test_chunks_evaluate_other_requirements_per_item(member):
+    def factory(i):
+        return [BatchedOwned(i), Not(is_admin), Owned(i + 1)]
+
+    allowed = Engine().filter(range(10), factory, member, chunk_size=4)
+
+    # only items passing the batched requirement are checked further
+    assert list(allowed) == []
+    assert Owned.checked == [1, 4, 7, 10]
+
+
+def test_chunks_skip_overridden_batch_requirements(member):
+    overrides = Override(BatchedOwned(1))
+
+    def factory(i):
+        return BatchedOwned(i)
+
+    # BatchedOwned doesn't define equality, only the instance itself matches
+    assert list(Engine().filter(range(3), factory, member, overrides, None, 3)) == [0]
+
+    requirement = BatchedOwned(1)
+    overrides = Override(requirement)
+    allowed = Engine().filter([1], lambda i: requirement, member, overrides, None, 3)
+
+    assert list(allowed) == [1]
+    assert BatchedOwned.batches == [[0, 1, 2]]
+
+
+def test_chunks_are_not_batched_while_instrumented(member):
+    calls = []
+
+    def receiver(sender, **kwargs):
+        calls.append(sender)
+
+    with requirement_evaluated.connected_to(receiver):
+        allowed = Engine().filter(range(4), BatchedOwned, member, chunk_size=4)
+        assert list(allowed) == [0, 3]
+
+    assert BatchedOwned.batches == []
+    assert len(calls) == 4
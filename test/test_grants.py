@@ -0,0 +1,263 @@
+import itertools
+import threading
+from collections import namedtuple
+
+import pytest
+
+from flask_allows.engine import Engine
+from flask_allows.grants import (
+    CompiledGrants,
+    GrantRegistry,
+    HasPermission,
+    HasRole,
+    compile_requirement,
+    permissions,
+)
+from flask_allows.overrides import Override, OverrideManager
+from flask_allows.requirements import And, C, ConditionalRequirement, Not, Or
+from flask_allows.trace import _Tracer
+
+User = namedtuple("User", ["permissions", "roles"])
+
+
+def is_member(user):
+    return True
+
+
+@pytest.fixture
+def registry():
+    return GrantRegistry()
+
+
+def test_registry_assigns_each_name_a_bit(registry):
+    assert registry.bit("read") == 1
+    assert registry.bit("write") == 2
+    assert registry.bit("read") == 1
+    assert registry.mask(["read", "write", "delete"]) == 7
+    assert registry.index("delete") == 2
+    assert registry.names(5) == {"read", "delete"}
+    assert len(registry) == 3
+
+
+def test_registry_assigns_distinct_bits_across_threads(registry):
+    barrier = threading.Barrier(8)
+
+    def register(n):
+        barrier.wait()
+        for i in range(100):
+            registry.bit("perm-{}".format((i + n) % 100))
+
+    threads = [threading.Thread(target=register, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    bits = [registry.bit("perm-{}".format(i)) for i in range(100)]
+    assert sorted(bits) == [1 << i for i in range(100)]
+
+
+def test_registry_lists_names_while_registering(registry):
+    registered = threading.Event()
+    errors = []
+
+    def register():
+        for i in range(50000):
+            registry.index("perm-{}".format(i))
+        registered.set()
+
+    def list_names():
+        while not registered.is_set():
+            try:
+                registry.names(1)
+            except RuntimeError as e:
+                errors.append(e)
+                return
+
+    threads = [threading.Thread(target=f) for f in (register, list_names)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert registry.names(1) == {"perm-0"}
+
+
+def test_registry_loads_names_or_masks():
+    registry = GrantRegistry(loader=lambda user: user)
+
+    assert registry.grants(["read", "write"]) == 3
+    assert registry.grants(2) == 2
+
+
+def test_registry_reads_attribute_by_default():
+    registry = GrantRegistry(attribute="roles")
+
+    assert registry.grants(User([], ["admin"])) == registry.bit("admin")
+
+
+def test_grant_requires_every_name(registry):
+    requirement = HasPermission("read", "write", registry=registry)
+
+    assert requirement(User(["read", "write", "delete"], []))
+    assert not requirement(User(["read"], []))
+
+
+def test_has_role_uses_the_roles(registry):
+    requirement = HasRole("admin", registry=registry)
+
+    assert requirement(User(["admin"], ["admin"]))
+    assert not HasRole("admin")(User(["admin"], []))
+
+
+def test_grants_compare_by_registry_and_names(registry):
+    assert HasPermission("a", "b") == HasPermission("b", "a")
+    assert HasPermission("a") != HasPermission("a", registry=registry)
+    assert HasPermission("a") != HasRole("a")
+    assert len({HasPermission("a"), HasPermission("a")}) == 1
+    assert repr(HasRole("admin", "owner")) == "<HasRole('admin', 'owner')>"
+
+
+def test_operators_build_compiled_grants():
+    either = HasRole("admin") | HasRole("editor")
+    both = HasRole("admin") & HasRole("editor")
+    neither = ~either
+
+    for requirement in (either, both, neither):
+        assert isinstance(requirement, CompiledGrants)
+
+    assert either == Or(HasRole("admin"), HasRole("editor"))
+    assert either(User([], ["editor"]))
+    assert not both(User([], ["editor"]))
+    assert not neither(User([], ["editor"]))
+    assert neither(User([], []))
+
+
+def test_operators_with_other_requirements_build_conditionals():
+    requirement = HasRole("admin") & HasPermission("post.edit")
+
+    assert type(requirement) is ConditionalRequirement
+    assert type(HasRole("admin") | is_member) is ConditionalRequirement
+
+
+def test_compiled_grants_reject_other_requirements():
+    with pytest.raises(ValueError) as excinfo:
+        CompiledGrants.And(HasRole("admin"), is_member)
+
+    assert "can't be compiled" in str(excinfo.value)
+
+    with pytest.raises(ValueError):
+        CompiledGrants.And(HasRole("admin"), HasPermission("post.edit"))
+
+    with pytest.raises(ValueError):
+        CompiledGrants(HasRole("a"), HasRole("b"), op=lambda a, b: a != b)
+
+
+def test_compile_requirement_compiles_grant_subtrees():
+    policy = Or(
+        is_member,
+        And(HasRole("admin"), Or(HasRole("editor"), HasRole("owner"))),
+        Not(HasPermission("post.edit")),
+    )
+
+    compiled = compile_requirement(policy)
+
+    assert type(compiled) is ConditionalRequirement
+    assert compiled.requirements[0] is is_member
+    assert isinstance(compiled.requirements[1], CompiledGrants)
+    assert isinstance(compiled.requirements[2], CompiledGrants)
+    assert compiled == policy
+    assert hash(compiled) == hash(policy)
+
+
+def test_compile_requirement_leaves_other_requirements_alone():
+    assert compile_requirement(is_member) is is_member
+    grant = HasRole("admin")
+    assert compile_requirement(grant) is grant
+    tree = Or(is_member, And(is_member, grant))
+    assert compile_requirement(tree) is tree
+
+
+def _trees(leaves, depth):
+    if depth == 0:
+        for leaf in leaves:
+            yield leaf
+        return
+
+    for left, right in itertools.product(list(_trees(leaves, depth - 1)), repeat=2):
+        yield And(left, right)
+        yield Or(left, right)
+        yield Not(left, right)
+        yield C(left, right)
+
+
+def test_compiled_trees_match_walked_trees(registry):
+    leaves = [
+        HasPermission("a", registry=registry),
+        HasPermission("b", registry=registry),
+        HasPermission("a", "c", registry=registry),
+        And(),
+    ]
+    grants = [
+        set(names)
+        for n in range(4)
+        for names in itertools.combinations(["a", "b", "c"], n)
+    ]
+    engine = Engine()
+
+    for tree in itertools.chain(_trees(leaves, 1), _trees(leaves[:3], 2)):
+        compiled = compile_requirement(Or(tree))
+        if not isinstance(compiled, CompiledGrants):
+            # trees of empty conditional requirements don't hold any grants
+            assert "HasPermission" not in repr(tree)
+            continue
+
+        for granted in grants:
+            user = User(granted, [])
+            assert compiled.test(registry.grants(user)) == engine.fulfill(
+                [tree], user
+            ), (tree, granted)
+
+
+def test_engine_uses_compiled_test(monkeypatch):
+    requirement = HasRole("admin") | HasRole("editor")
+    calls = []
+    monkeypatch.setattr(
+        HasRole, "fulfill", lambda self, user: calls.append(self) or True
+    )
+
+    assert Engine().fulfill([requirement], User([], ["editor"]))
+    assert calls == []
+
+
+def test_engine_walks_compiled_grants_with_overrides():
+    requirement = HasRole("admin") & HasRole("editor")
+    user = User([], ["editor"])
+
+    assert not Engine().fulfill([requirement], user)
+    assert Engine().fulfill([requirement], user, overrides=Override(HasRole("admin")))
+
+
+def test_compiled_grants_honor_pushed_overrides():
+    requirement = HasRole("admin") & HasRole("editor")
+    user = User([], ["editor"])
+    manager = OverrideManager()
+
+    with manager.override(Override(HasRole("admin"))):
+        assert requirement(user)
+
+    assert not requirement(user)
+
+
+def test_traces_compiled_grants_by_leaf():
+    requirement = HasRole("admin") | HasRole("editor")
+
+    trace = _Tracer(None, None, None).trace([requirement], User([], ["editor"]))
+
+    assert trace.result
+    assert [n.result for n in trace.nodes[0].children] == [False, True]
+
+
+def test_default_registries_are_shared():
+    assert HasPermission("post.edit").registry is permissions
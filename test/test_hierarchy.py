@@ -0,0 +1,192 @@
+import threading
+from collections import namedtuple
+
+import pytest
+
+from flask_allows.engine import Engine
+from flask_allows.grants import GrantRegistry, HasRole, compile_requirement
+from flask_allows.hierarchy import RoleHierarchy
+from flask_allows.requirements import And, Or
+
+Principal = namedtuple("Principal", ["roles"])
+
+
+@pytest.fixture
+def registry():
+    return GrantRegistry(attribute="roles")
+
+
+@pytest.fixture
+def hierarchy(registry):
+    return RoleHierarchy(
+        {"owner": ["admin"], "admin": ["editor", "billing"], "editor": ["viewer"]},
+        registry=registry,
+    )
+
+
+def names(registry, hierarchy, *held):
+    return registry.names(hierarchy.effective(registry.mask(held)))
+
+
+def test_attaches_to_registry(registry, hierarchy):
+    assert registry.hierarchy is hierarchy
+
+
+def test_expands_roles_transitively(registry, hierarchy):
+    assert names(registry, hierarchy, "owner") == {
+        "owner",
+        "admin",
+        "editor",
+        "billing",
+        "viewer",
+    }
+    assert names(registry, hierarchy, "editor") == {"editor", "viewer"}
+    assert names(registry, hierarchy, "viewer", "billing") == {"viewer", "billing"}
+    assert names(registry, hierarchy) == set()
+
+
+def test_implies(hierarchy):
+    assert hierarchy.implies("owner", "viewer")
+    assert hierarchy.implies("viewer", "viewer")
+    assert not hierarchy.implies("viewer", "editor")
+    assert not hierarchy.implies("editor", "billing")
+
+
+def test_has_role_checks_effective_roles(registry, hierarchy):
+    can_edit = HasRole("editor", registry=registry)
+
+    assert can_edit(Principal(["owner"]))
+    assert can_edit(Principal(["editor"]))
+    assert not can_edit(Principal(["viewer"]))
+
+
+def test_compiled_roles_check_effective_roles(registry, hierarchy):
+    policy = compile_requirement(
+        And(
+            HasRole("viewer", registry=registry),
+            Or(HasRole("billing", registry=registry), HasRole("x", registry=registry)),
+        )
+    )
+
+    assert Engine().fulfill([policy], Principal(["owner"]))
+    assert not Engine().fulfill([policy], Principal(["editor"]))
+
+
+def test_add_updates_implying_roles(registry, hierarchy):
+    hierarchy.add("viewer", "guest", "public")
+    hierarchy.add("guest", "anonymous")
+
+    assert names(registry, hierarchy, "owner") >= {"guest", "public", "anonymous"}
+    assert names(registry, hierarchy, "editor") == {
+        "editor",
+        "viewer",
+        "guest",
+        "public",
+        "anonymous",
+    }
+    assert names(registry, hierarchy, "billing") == {"billing"}
+
+
+def test_add_new_roles(registry, hierarchy):
+    hierarchy.add("auditor", "billing", "viewer")
+
+    assert names(registry, hierarchy, "auditor") == {"auditor", "billing", "viewer"}
+    assert not hierarchy.implies("owner", "auditor")
+
+
+def test_add_rejects_cycles(registry, hierarchy):
+    with pytest.raises(ValueError):
+        hierarchy.add("viewer", "owner")
+
+    with pytest.raises(ValueError):
+        hierarchy.add("viewer", "viewer")
+
+    assert not hierarchy.implies("viewer", "owner")
+
+
+def test_constructor_rejects_cycles(registry):
+    with pytest.raises(ValueError):
+        RoleHierarchy({"a": ["b"], "b": ["c"], "c": ["a"]}, registry=registry)
+
+    with pytest.raises(ValueError):
+        RoleHierarchy({"a": ["a"]}, registry=registry)
+
+
+def test_remove_recomputes_implying_roles(registry, hierarchy):
+    hierarchy.remove("admin", "editor")
+
+    assert names(registry, hierarchy, "owner") == {"owner", "admin", "billing"}
+    assert names(registry, hierarchy, "editor") == {"editor", "viewer"}
+
+
+def test_remove_keeps_other_paths(registry, hierarchy):
+    hierarchy.add("owner", "viewer")
+    hierarchy.remove("editor", "viewer")
+
+    assert hierarchy.implies("owner", "viewer")
+    assert not hierarchy.implies("admin", "viewer")
+    assert not hierarchy.implies("editor", "viewer")
+
+
+def test_edits_invalidate_cached_roles(registry, hierarchy):
+    can_bill = HasRole("billing", registry=registry)
+    editor = Principal(["editor"])
+
+    assert not can_bill(editor)
+    hierarchy.add("editor", "billing")
+    assert can_bill(editor)
+    hierarchy.remove("editor", "billing")
+    assert not can_bill(editor)
+
+
+def test_cache_is_bounded(registry):
+    hierarchy = RoleHierarchy({"a": ["b"]}, registry=registry, cache_size=2)
+
+    for role in ["a", "b", "c", "d"]:
+        hierarchy.effective(registry.mask([role]))
+
+    assert len(hierarchy._state[1]) <= 2
+    assert hierarchy.effective(registry.mask(["a"])) == registry.mask(["a", "b"])
+
+
+def test_deep_hierarchies(registry):
+    depth = 5000
+    hierarchy = RoleHierarchy(
+        {"role-{}".format(i): ["role-{}".format(i + 1)] for i in range(depth)},
+        registry=registry,
+    )
+
+    assert hierarchy.implies("role-0", "role-{}".format(depth))
+    hierarchy.remove("role-{}".format(depth // 2), "role-{}".format(depth // 2 + 1))
+    assert not hierarchy.implies("role-0", "role-{}".format(depth))
+    assert hierarchy.implies("role-0", "role-{}".format(depth // 2))
+
+
+def test_checks_during_edits_see_a_whole_hierarchy(registry, hierarchy):
+    stop = threading.Event()
+    seen = []
+
+    def check():
+        owner = registry.mask(["owner"])
+        while not stop.is_set():
+            effective = hierarchy.effective(owner)
+            # either both or neither of the added roles are visible
+            seen.append(
+                (
+                    bool(effective & registry.bit("guest")),
+                    bool(effective & registry.bit("public")),
+                )
+            )
+
+    thread = threading.Thread(target=check)
+    thread.start()
+    try:
+        for _ in range(200):
+            hierarchy.add("viewer", "guest", "public")
+            hierarchy.remove("viewer", "guest", "public")
+    finally:
+        stop.set()
+        thread.join()
+
+    assert seen
+    assert all(guest == public for guest, public in seen)
@@ -0,0 +1,73 @@
+import subprocess
+import sys
+
+import pytest
+from werkzeug.local import LocalProxy
+
+import flask_allows
+
+pytestmark = pytest.mark.skipif(
+    sys.version_info < (3, 7), reason="lazy imports require PEP 562"
+)
+
+
+def _imported_modules(statement):
+    """
+    Runs the statement in a fresh interpreter with ``-X importtime`` and
+    returns the names of the modules it imported.
+    """
+    output = subprocess.check_output(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        stderr=subprocess.STDOUT,
+        universal_newlines=True,
+    )
+    return {
+        line.rsplit("|", 1)[1].strip()
+        for line in output.splitlines()
+        if line.startswith("import time:") and "|" in line
+    }
+
+
+def test_importing_package_does_not_import_flask_or_submodules():
+    modules = _imported_modules("import flask_allows")
+
+    assert "flask_allows" in modules
+    assert "flask" not in modules
+    assert not [m for m in modules if m.startswith("flask_allows.")]
+
+
+def test_importing_requirement_only_imports_what_it_needs():
+    modules = _imported_modules("from flask_allows import Requirement")
+
+    assert "flask_allows.requirements" in modules
+    for unused in ("permission", "views", "metrics", "trace", "audit"):
+        assert "flask_allows." + unused not in modules
+
+
+@pytest.mark.parametrize(
+    "statement",
+    ["from flask_allows import Requirement, And", "from flask_allows import Engine"],
+)
+def test_evaluating_requirements_does_not_import_flask(statement):
+    assert "flask" not in _imported_modules(statement)
+
+
+def test_allows_is_the_proxy_after_importing_submodules():
+    import flask_allows.allows  # noqa: F401
+    import flask_allows.permission  # noqa: F401
+
+    assert isinstance(flask_allows.__dict__["allows"], LocalProxy)
+
+
+def test_exports_are_listed_by_dir():
+    assert set(flask_allows.__all__) <= set(dir(flask_allows))
+
+
+def test_every_export_is_available():
+    for name in flask_allows.__all__:
+        assert getattr(flask_allows, name) is not None
+
+
+def test_unknown_attribute_raises():
+    with pytest.raises(AttributeError):
+        flask_allows.does_not_exist
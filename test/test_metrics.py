@@ -0,0 +1,190 @@
+import json
+import os
+import weakref
+
+import pytest
+from flask import Flask
+
+from flask_allows.allows import Allows
+from flask_allows.metrics import OTHER, MetricsRegistry, metrics_view
+from flask_allows.overrides import Override
+from flask_allows.requirements import And, Requirement
+from flask_allows.residuals import Where
+
+
+def is_member(user):
+    return user.permlevel >= 0
+
+
+def broken(user):
+    raise ValueError()
+
+
+def _decisions(registry):
+    return {
+        (label, endpoint): counts
+        for label, endpoint, counts, _, _ in registry.snapshot()["requirements"]
+    }
+
+
+def test_records_requirement_decisions(member, guest):
+    registry = MetricsRegistry()
+    allows = Allows(metrics=registry)
+
+    allows.fulfill([is_member], identity=member)
+    allows.fulfill([is_member], identity=guest)
+
+    label = "{}.is_member".format(__name__)
+    assert _decisions(registry) == {(label, None): [1, 1, 0, 0, 0, 0]}
+
+
+def test_records_nested_requirements_and_errors(member):
+    registry = MetricsRegistry()
+    allows = Allows(metrics=registry)
+
+    with pytest.raises(ValueError):
+        allows.fulfill([And(is_member, broken)], identity=member)
+
+    decisions = _decisions(registry)
+    conjunction = "And({0}.is_member, {0}.broken)".format(__name__)
+    assert decisions[("{}.broken".format(__name__), None)] == [0, 0, 0, 1, 0, 0]
+    assert decisions[(conjunction, None)] == [0, 0, 0, 1, 0, 0]
+    assert registry.snapshot()["checks"][0][1] == [0, 0, 0, 1, 0, 0]
+
+
+def test_records_overridden_requirements(member):
+    registry = MetricsRegistry()
+    allows = Allows(metrics=registry)
+    allows.overrides.push(Override(broken))
+
+    allows.fulfill([broken], identity=member)
+
+    label = "{}.broken".format(__name__)
+    assert _decisions(registry) == {(label, None): [0, 0, 1, 0, 0, 0]}
+    assert registry.snapshot()["checks"][0][1] == [1, 0, 0, 0, 0, 0]
+    allows.overrides.pop()
+
+
+def test_ignores_checks_of_other_applications(member):
+    first, second = Flask("first"), Flask("second")
+    registry = MetricsRegistry()
+    Allows(first, metrics=registry)
+    other = Allows(second, metrics=MetricsRegistry())
+
+    with second.app_context():
+        other.fulfill([is_member], identity=member)
+
+    assert _decisions(registry) == {}
+    assert registry.snapshot()["checks"] == []
+
+
+def test_observations_fill_histogram_buckets():
+    registry = MetricsRegistry(buckets=[0.001, 0.01])
+
+    registry.observe_check("allow", 500000, "index")
+    registry.observe_check("deny", 5000000, "index")
+    registry.observe_check("deny", 50000000, "index")
+
+    [[endpoint, counts, buckets, total]] = registry.snapshot()["checks"]
+    assert endpoint == "index"
+    assert counts == [1, 2, 0, 0, 0, 0] and buckets == [1, 1, 1]
+    assert total == 55500000
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry(buckets=[0.001])
+    registry.observe_requirement(is_member, "allow", 500000, endpoint='say "hi"')
+
+    text = registry.render()
+
+    label = '{{endpoint="say \\"hi\\"",requirement="{}.is_member"'.format(__name__)
+    assert "# TYPE flask_allows_requirement_decisions_total counter" in text
+    assert (
+        "flask_allows_requirement_decisions_total" + label + ',outcome="allow"} 1'
+    ) in text
+    bucket = "flask_allows_requirement_duration_seconds_bucket" + label
+    assert bucket + ',le="0.001"} 1' in text
+    assert bucket + ',le="+Inf"} 1' in text
+    assert "flask_allows_requirement_duration_seconds_sum" + label + "} 0.0005" in text
+    assert "flask_allows_requirement_duration_seconds_count" + label + "} 1" in text
+
+
+def test_flush_and_merge_directory(tmpdir):
+    directory = str(tmpdir)
+    first = MetricsRegistry(directory=directory)
+    first.observe_check("allow", 1000, "index")
+    first.flush()
+
+    other = MetricsRegistry()
+    other.observe_check("deny", 1000, "index")
+    tmpdir.join("flask-allows-metrics-0.json").write(json.dumps(other.snapshot()))
+
+    merged = MetricsRegistry.merged(directory)
+
+    [[_, counts, _, total]] = merged.snapshot()["checks"]
+    assert counts == [1, 1, 0, 0, 0, 0] and total == 2000
+    assert "flask-allows-metrics-{}.json".format(os.getpid()) in os.listdir(directory)
+
+
+def test_merge_rejects_different_buckets():
+    registry = MetricsRegistry(buckets=[1])
+
+    with pytest.raises(ValueError):
+        registry.load(MetricsRegistry(buckets=[2]).snapshot())
+
+
+def test_metrics_view_uses_configured_registry(app, member):
+    registry = MetricsRegistry()
+    allows = Allows(app, identity_loader=lambda: member, metrics=registry)
+    app.add_url_rule("/metrics", "metrics", metrics_view())
+
+    @app.route("/")
+    @allows.requires(is_member)
+    def index():
+        return "hello"
+
+    client = app.test_client()
+    client.get("/")
+    response = client.get("/metrics")
+
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    body = response.get_data(as_text=True)
+    assert (
+        'flask_allows_check_decisions_total{endpoint="index",outcome="allow"} 1' in body
+    )
+
+
+class CanRead(Requirement):
+    def __init__(self, document):
+        self.document = document
+
+    def fulfill(self, user):
+        return True
+
+
+def test_per_object_requirements_share_a_series(member):
+    registry = MetricsRegistry()
+    allows = Allows(metrics=registry)
+    requirements = [CanRead(i) for i in range(2000)]
+    ref = weakref.ref(requirements[0])
+
+    for requirement in requirements:
+        allows.fulfill([requirement], identity=member)
+    del requirements
+
+    assert _decisions(registry) == {("<CanRead()>", None): [2000, 0, 0, 0, 0, 0]}
+    assert ref() is None
+
+
+def test_bounds_requirement_labels():
+    registry = MetricsRegistry(max_requirements=2)
+
+    for name in ["a", "b", "c", "d"]:
+        registry.observe_requirement(Where(name, "==", 1), "allow", 1)
+
+    assert sorted(_decisions(registry)) == [
+        ("<Where('a', '==', 1)>", None),
+        ("<Where('b', '==', 1)>", None),
+        (OTHER, None),
+    ]
+    assert _decisions(registry)[(OTHER, None)][0] == 2
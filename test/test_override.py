@@ -153,3 +153,8 @@ class TestOverrideManager(object):
         with manager.override(parent):
             with manager.override(child, use_parent=True):
                 assert expected == manager.current
+
+
+def test_override_and_manager_are_slotted():
+    assert not hasattr(Override(some_requirement), "__dict__")
+    assert not hasattr(OverrideManager(), "__dict__")
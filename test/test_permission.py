@@ -1,7 +1,8 @@
 import pytest
+from flask import render_template_string
 from werkzeug.exceptions import Forbidden
 
-from flask_allows import Allows, Permission
+from flask_allows import Additional, Allows, Override, Permission
 
 
 def test_Permission_provide_ident(app, member, ismember):
@@ -71,3 +72,86 @@ def test_Permission_on_fail(app, member, never):
             with p:
                 pass
     assert on_fail.failed
+
+
+def test_Permission_cached_runs_requirements_once(app, member, counter):
+    Allows(app=app, identity_loader=lambda: member)
+
+    with app.app_context():
+        results = [bool(Permission(counter, cache=True)) for _ in range(5)]
+
+    assert all(results) and counter.count == 1
+
+
+def test_Permission_cache_is_scoped_to_context(app, member, counter):
+    Allows(app=app, identity_loader=lambda: member)
+
+    with app.app_context():
+        assert Permission(counter, cache=True)
+
+    with app.app_context():
+        assert Permission(counter, cache=True)
+
+    assert counter.count == 2
+
+
+def test_Permission_cache_keyed_by_identity(app, member, guest, counter):
+    Allows(app=app, identity_loader=lambda: member)
+
+    with app.app_context():
+        assert Permission(counter, cache=True)
+        assert Permission(counter, cache=True, identity=guest)
+        assert Permission(counter, cache=True, identity=member)
+
+    assert counter.count == 2
+
+
+def test_Permission_cache_invalidated_by_overrides(app, member, never):
+    allows = Allows(app=app, identity_loader=lambda: member)
+
+    with app.app_context():
+        assert not Permission(never, cache=True)
+
+        with allows.overrides.override(Override()) as override:
+            assert not Permission(never, cache=True)
+            override.add(never)
+            assert Permission(never, cache=True)
+
+        assert not Permission(never, cache=True)
+
+
+def test_Permission_cache_invalidated_by_additional(app, member, always, never):
+    allows = Allows(app=app, identity_loader=lambda: member)
+
+    with app.app_context():
+        assert Permission(always, cache=True)
+
+        with allows.additional.additional(Additional()) as additional:
+            additional.add(never)
+            assert not Permission(always, cache=True)
+
+        assert Permission(always, cache=True)
+
+
+def test_Permission_cache_skipped_for_unhashable_identity(app, counter):
+    Allows(app=app, identity_loader=lambda: {"name": "member"})
+
+    with app.app_context():
+        assert Permission(counter, cache=True)
+        assert Permission(counter, cache=True)
+
+    assert counter.count == 2
+
+
+def test_can_registered_as_template_global(app, member, counter):
+    Allows(app=app, identity_loader=lambda: member)
+    template = "{% for _ in range(3) %}{{ can(req) }}{% endfor %}"
+
+    with app.test_request_context("/"):
+        result = render_template_string(template, req=counter)
+
+    assert result == "TrueTrueTrue" and counter.count == 1
+
+
+def test_Permission_is_slotted(always):
+    assert not hasattr(Permission(always), "__dict__")
@@ -0,0 +1,414 @@
+import json
+import os
+import time
+
+import pytest
+from flask import request
+from werkzeug.exceptions import Forbidden
+
+from flask_allows.allows import Allows
+from flask_allows.engine import Engine
+from flask_allows.grants import CompiledGrants, GrantRegistry, HasRole
+from flask_allows.policy import PolicyError, PolicyLoader, PolicySet, PolicyWatcher
+from flask_allows.requirements import And, Not, Or
+from flask_allows.signals import policies_reloaded
+from flask_allows.views import exempt_from_requirements
+
+
+def is_member(user):
+    return user.permlevel >= 0
+
+
+def is_admin(user):
+    return user.permlevel >= 2
+
+
+class AtLeast(object):
+    def __init__(self, level):
+        self.level = level
+
+    def __call__(self, user):
+        return user.permlevel >= self.level
+
+    def __eq__(self, other):
+        return isinstance(other, AtLeast) and self.level == other.level
+
+    def __hash__(self):
+        return hash(self.level)
+
+
+roles = GrantRegistry(attribute="roles")
+
+FACTORIES = {
+    "is_member": lambda: is_member,
+    "is_admin": lambda: is_admin,
+    "at_least": AtLeast,
+    "has_role": lambda *names: HasRole(*names, registry=roles),
+}
+
+DOCUMENT = {
+    "policies": {
+        "admin.index": [
+            "is_member",
+            {"or": ["is_admin", {"requirement": "at_least", "args": [1]}]},
+        ],
+        "auth.login": {"not": "is_member"},
+        "reports": {"requirement": "at_least", "kwargs": {"level": 2}},
+        "editors": {"or": [{"requirement": "has_role", "args": ["editor"]}]},
+    }
+}
+
+TOML_DOCUMENT = """
+[policies]
+"auth.login" = { not = "is_member" }
+"admin.index" = [
+    "is_member",
+    { or = ["is_admin", { requirement = "at_least", args = [1] }] },
+]
+"""
+
+
+@pytest.fixture
+def loader():
+    return PolicyLoader(FACTORIES)
+
+
+def test_builds_policies(loader):
+    policies = loader.loads(json.dumps(DOCUMENT))
+
+    assert isinstance(policies, PolicySet)
+    assert len(policies) == 4
+    assert "admin.index" in policies
+    assert set(policies) == set(DOCUMENT["policies"])
+    assert policies.get("missing") is None
+    assert policies["admin.index"] == (is_member, Or(is_admin, AtLeast(1)))
+    assert policies["auth.login"] == (Not(is_member),)
+    assert policies["reports"] == (AtLeast(2),)
+
+
+def test_policies_are_checked(loader, member, moderator, guest):
+    policies = loader.loads(json.dumps(DOCUMENT))
+    engine = Engine()
+
+    assert engine.fulfill(policies["admin.index"], moderator)
+    assert not engine.fulfill(policies["admin.index"], member)
+    assert engine.fulfill(policies["auth.login"], guest)
+
+
+def test_compiles_grants(loader):
+    policies = loader.loads(json.dumps(DOCUMENT))
+
+    (editors,) = policies["editors"]
+    assert isinstance(editors, CompiledGrants)
+    assert editors == Or(HasRole("editor", registry=roles))
+
+
+def test_identical_requirements_are_shared(loader):
+    document = {
+        "policies": {
+            "a": {"and": [{"requirement": "at_least", "args": [1]}, "is_admin"]},
+            "b": {"and": [{"requirement": "at_least", "args": [1]}, "is_admin"]},
+        }
+    }
+
+    policies = loader.loads(json.dumps(document))
+
+    assert policies["a"][0] is policies["b"][0]
+
+
+def test_loads_toml(loader):
+    pytest.importorskip("tomllib")
+
+    policies = loader.loads(TOML_DOCUMENT, fmt="toml")
+
+    assert policies["admin.index"] == (is_member, Or(is_admin, AtLeast(1)))
+    assert policies["auth.login"] == (Not(is_member),)
+
+
+def test_load_picks_format_by_extension(loader, tmpdir):
+    pytest.importorskip("tomllib")
+    toml_path = tmpdir.join("policies.toml")
+    toml_path.write(TOML_DOCUMENT)
+    json_path = tmpdir.join("policies.json")
+    json_path.write(json.dumps(DOCUMENT))
+
+    assert loader.load(str(toml_path))["auth.login"] == (Not(is_member),)
+    assert loader.load(str(json_path))["auth.login"] == (Not(is_member),)
+
+
+@pytest.mark.parametrize(
+    "document, path",
+    [
+        ([], None),
+        ({"policy": {}}, None),
+        ({"policies": []}, "policies"),
+        ({"policies": {"a": 1}}, "policies.a"),
+        ({"policies": {"a": ["is_member", {}]}}, "policies.a[1]"),
+        ({"policies": {"a": {"or": [{"and": [3]}]}}}, "policies.a.or[0].and[0]"),
+        ({"policies": {"a": {"or": [], "and": []}}}, "policies.a"),
+        ({"policies": {"a": {"requirement": 1}}}, "policies.a"),
+        ({"policies": {"a": {"requirement": "x", "args": 1}}}, "policies.a"),
+        ({"policies": {"a": {"requirement": "x", "kwargs": []}}}, "policies.a"),
+        ({"policies": {"a": {"requirement": "x", "arg": []}}}, "policies.a"),
+        ({"policies": {"a": "unknown"}}, "policies.a"),
+    ],
+)
+def test_rejects_invalid_documents(loader, document, path):
+    with pytest.raises(PolicyError) as excinfo:
+        loader.loads(json.dumps(document))
+
+    assert excinfo.value.path == path
+
+
+def test_rejects_invalid_json(loader):
+    with pytest.raises(PolicyError) as excinfo:
+        loader.loads("{")
+
+    assert "invalid JSON" in str(excinfo.value)
+
+
+def test_caches_validated_documents(tmpdir, monkeypatch):
+    loader = PolicyLoader(FACTORIES, cache_dir=str(tmpdir))
+    data = json.dumps(DOCUMENT)
+
+    first = loader.loads(data)
+    assert len(tmpdir.listdir()) == 1
+    assert first.digest in tmpdir.listdir()[0].basename
+
+    def fail(*a):
+        raise AssertionError("the document should be read from the cache")
+
+    monkeypatch.setattr("flask_allows.policy._parse", fail)
+    second = PolicyLoader(FACTORIES, cache_dir=str(tmpdir)).loads(data)
+
+    assert second.digest == first.digest
+    assert second["admin.index"] == first["admin.index"]
+
+
+def test_changed_documents_miss_the_cache(tmpdir):
+    loader = PolicyLoader(FACTORIES, cache_dir=str(tmpdir))
+
+    first = loader.loads(json.dumps(DOCUMENT))
+    second = loader.loads(json.dumps({"policies": {"a": "is_admin"}}))
+
+    assert first.digest != second.digest
+    assert second["a"] == (is_admin,)
+    assert len(tmpdir.listdir()) == 2
+
+
+def test_ignores_corrupt_artifacts(tmpdir):
+    loader = PolicyLoader(FACTORIES, cache_dir=str(tmpdir))
+    data = json.dumps(DOCUMENT)
+    loader.loads(data)
+    (artifact,) = tmpdir.listdir()
+    artifact.write_binary(b"\x00garbage")
+
+    assert loader.loads(data)["reports"] == (AtLeast(2),)
+
+
+def test_unwritable_cache_is_ignored(tmpdir):
+    loader = PolicyLoader(FACTORIES, cache_dir=os.path.join(str(tmpdir), "missing"))
+
+    assert loader.loads(json.dumps(DOCUMENT))["reports"] == (AtLeast(2),)
+
+
+def test_bound_requirements_are_not_cached(tmpdir):
+    data = json.dumps({"policies": {"a": "is_member"}})
+    PolicyLoader(FACTORIES, cache_dir=str(tmpdir)).loads(data)
+
+    factories = dict(FACTORIES, is_member=lambda: is_admin)
+    policies = PolicyLoader(factories, cache_dir=str(tmpdir)).loads(data)
+
+    assert policies["a"] == (is_admin,)
+
+
+def test_combinators_accept_a_single_requirement(loader):
+    document = {"policies": {"a": {"and": "is_member"}, "b": {"not": ["is_admin"]}}}
+
+    policies = loader.loads(json.dumps(document))
+
+    assert policies["a"] == (And(is_member),)
+    assert policies["b"] == (Not(is_admin),)
+
+
+def write(path, document, bump=0):
+    path.write(json.dumps(document))
+    # make sure the modification time changes even on coarse filesystems
+    mtime = path.stat().mtime + bump
+    os.utime(str(path), (mtime, mtime))
+
+
+@pytest.fixture
+def policy_file(tmpdir):
+    path = tmpdir.join("policies.json")
+    write(path, {"policies": {"index": "is_member"}})
+    return path
+
+
+@pytest.fixture
+def watcher(loader, policy_file):
+    watcher = PolicyWatcher(loader, str(policy_file), interval=None)
+    yield watcher
+    watcher.close()
+
+
+def test_watcher_loads_the_document(watcher):
+    assert watcher.current["index"] == (is_member,)
+
+
+def test_watcher_raises_for_invalid_initial_documents(loader, tmpdir):
+    path = tmpdir.join("policies.json")
+    path.write("{")
+
+    with pytest.raises(PolicyError):
+        PolicyWatcher(loader, str(path))
+
+
+def test_check_ignores_unchanged_files(watcher):
+    before = watcher.current
+
+    assert not watcher.check()
+    assert watcher.current is before
+
+
+def test_check_reloads_changed_files(watcher, policy_file):
+    before = watcher.current
+    reloads = []
+
+    def receiver(sender, **kwargs):
+        reloads.append(kwargs)
+
+    write(policy_file, {"policies": {"index": "is_admin"}}, bump=10)
+
+    with policies_reloaded.connected_to(receiver, sender=watcher):
+        assert watcher.check()
+
+    assert watcher.current["index"] == (is_admin,)
+    assert reloads == [{"policies": watcher.current, "previous": before, "error": None}]
+
+
+def test_check_ignores_touched_files(watcher, policy_file):
+    before = watcher.current
+    write(policy_file, {"policies": {"index": "is_member"}}, bump=10)
+
+    assert not watcher.check()
+    assert watcher.current is before
+
+
+def test_check_keeps_policies_when_reload_fails(watcher, policy_file, caplog):
+    before = watcher.current
+    reloads = []
+
+    def receiver(sender, **kwargs):
+        reloads.append(kwargs)
+
+    write(policy_file, {"policies": {"index": "unknown"}}, bump=10)
+
+    with policies_reloaded.connected_to(receiver, sender=watcher):
+        assert not watcher.check()
+
+    assert watcher.current is before
+    assert reloads[0]["policies"] is None
+    assert isinstance(reloads[0]["error"], PolicyError)
+    assert "Keeping previous policies" in caplog.text
+
+
+def test_check_tolerates_missing_files(watcher, policy_file):
+    policy_file.remove()
+
+    assert not watcher.check()
+    assert watcher.current["index"] == (is_member,)
+
+
+def test_watcher_thread_reloads(loader, policy_file):
+    watcher = PolicyWatcher(loader, str(policy_file), interval=0.01)
+    watcher.start()
+    try:
+        write(policy_file, {"policies": {"index": "is_admin"}}, bump=10)
+
+        deadline = time.time() + 5
+        while watcher.current["index"] != (is_admin,) and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        watcher.close()
+
+    assert watcher.current["index"] == (is_admin,)
+
+
+def test_watcher_without_interval_doesnt_start(watcher):
+    watcher.start()
+
+    assert watcher._thread is None
+
+
+@pytest.fixture
+def policed_app(app, watcher, member, guest):
+    users = {"member": member, "guest": guest}
+    allows = Allows(
+        app,
+        identity_loader=lambda: users[request.args["user"]],
+        policies=watcher,
+    )
+
+    @app.route("/")
+    def index():
+        return "index"
+
+    @app.route("/open")
+    def open_view():
+        return "open"
+
+    @app.route("/exempt")
+    @exempt_from_requirements
+    def exempt():
+        return "exempt"
+
+    return app, allows
+
+
+def test_allows_checks_endpoint_policies(policed_app, watcher):
+    app, allows = policed_app
+    watcher.current = PolicySet(
+        {"index": (is_member,), "open_view": (), "exempt": (is_admin,)}
+    )
+    client = app.test_client()
+
+    assert client.get("/?user=member").status_code == 200
+    assert client.get("/?user=guest").status_code == 403
+    assert client.get("/open?user=guest").status_code == 200
+    assert client.get("/exempt?user=guest").status_code == 200
+
+
+def test_allows_starts_watching(app, loader, policy_file):
+    watcher = PolicyWatcher(loader, str(policy_file), interval=60)
+    Allows(app, policies=watcher)
+
+    try:
+        assert watcher._thread is not None
+    finally:
+        watcher.close()
+
+
+def test_requests_keep_their_policies(policed_app, watcher, policy_file):
+    app, allows = policed_app
+    before = watcher.current
+
+    with app.test_request_context("/?user=member"):
+        app.preprocess_request()
+        write(policy_file, {"policies": {"index": "is_admin"}}, bump=10)
+        assert watcher.check()
+
+        assert allows.current_policies is before
+        assert watcher.current is not before
+
+    assert allows.current_policies is watcher.current
+
+    with app.test_request_context("/?user=member"):
+        with pytest.raises(Forbidden):
+            app.preprocess_request()
+
+
+def test_current_policies_without_policies(app):
+    allows = Allows(app)
+
+    assert allows.current_policies is None
@@ -0,0 +1,222 @@
+from collections import namedtuple
+
+import pytest
+
+from flask_allows.engine import Engine
+from flask_allows.overrides import Override
+from flask_allows.relations import MemoryTupleStore, Relation, TupleStore
+
+Principal = namedtuple("Principal", ["subject"])
+
+alice = Principal("user:alice")
+bob = Principal("user:bob")
+anonymous = Principal(None)
+
+
+@pytest.fixture
+def store():
+    store = MemoryTupleStore()
+    store.write_many(
+        [
+            ("team:eng", "member", "user:alice"),
+            ("team:eng", "member", "user:carol"),
+            ("folder:docs", "viewer", "team:eng#member"),
+            ("folder:docs", "editor", "user:bob"),
+            ("folder:guides", "viewer", "folder:docs#viewer"),
+            ("document:readme", "viewer", "folder:guides#viewer"),
+            ("document:readme", "viewer", "user:dave"),
+        ]
+    )
+    return store
+
+
+def test_checks_direct_tuples(store):
+    assert store.check("team:eng", "member", "user:alice")
+    assert store.check("document:readme", "viewer", "user:dave")
+    assert not store.check("team:eng", "member", "user:bob")
+    assert not store.check("team:eng", "owner", "user:alice")
+
+
+def test_checks_through_subject_sets(store):
+    assert store.check("document:readme", "viewer", "user:alice")
+    assert store.check("folder:guides", "viewer", "user:carol")
+    assert not store.check("document:readme", "viewer", "user:bob")
+    assert not store.check("document:readme", "viewer", "team:eng#member")
+
+
+def test_cycles_terminate(store):
+    store.write("team:eng", "member", "document:readme#viewer")
+
+    assert store.check("document:readme", "viewer", "user:alice")
+    assert not store.check("document:readme", "viewer", "user:bob")
+
+
+def test_expands_each_subject_set_once():
+    class CountingStore(MemoryTupleStore):
+        def __init__(self):
+            super(CountingStore, self).__init__()
+            self.expanded = []
+
+        def subject_sets(self, obj, relation):
+            self.expanded.append((obj, relation))
+            return super(CountingStore, self).subject_sets(obj, relation)
+
+    store = CountingStore()
+    # two teams share a group, reached through both of them
+    store.write_many(
+        [
+            ("document:readme", "viewer", "team:a#member"),
+            ("document:readme", "viewer", "team:b#member"),
+            ("team:a", "member", "group:all#member"),
+            ("team:b", "member", "group:all#member"),
+            ("group:all", "member", "user:erin"),
+        ]
+    )
+
+    assert not store.check("document:readme", "viewer", "user:bob")
+    assert store.expanded.count(("group:all", "member")) == 1
+    assert len(store.expanded) == 4
+
+
+def test_delete(store):
+    store.delete("team:eng", "member", "user:alice")
+    store.delete("folder:guides", "viewer", "folder:docs#viewer")
+    store.delete("folder:docs", "owner", "user:bob")
+
+    assert not store.check("team:eng", "member", "user:alice")
+    assert store.check("team:eng", "member", "user:carol")
+    assert not store.check("folder:guides", "viewer", "user:carol")
+    assert store.check("folder:docs", "viewer", "user:carol")
+
+    store.delete("team:eng", "member", "user:carol")
+    assert not store.check("folder:docs", "viewer", "user:carol")
+
+
+def test_len(store):
+    assert len(store) == 7
+
+    store.write("team:eng", "member", "user:alice")
+    assert len(store) == 7
+
+    store.write("team:eng", "member", "user:bob")
+    store.delete("document:readme", "viewer", "user:dave")
+    assert len(store) == 7
+    assert repr(store) == "<MemoryTupleStore tuples=7>"
+
+
+@pytest.mark.parametrize("subject", ["#member", "team:eng#", "#"])
+def test_rejects_invalid_subject_sets(store, subject):
+    with pytest.raises(ValueError):
+        store.write("folder:docs", "viewer", subject)
+
+
+def test_custom_stores_use_the_generic_search():
+    class ListStore(TupleStore):
+        def __init__(self, tuples):
+            super(ListStore, self).__init__()
+            self.tuples = tuples
+
+        def has_subject(self, obj, relation, subject):
+            return (obj, relation, subject) in self.tuples
+
+        def subject_sets(self, obj, relation):
+            return [
+                s for o, r, s in self.tuples if (o, r) == (obj, relation) and "#" in s
+            ]
+
+    store = ListStore(
+        [("team:eng", "member", "user:alice"), ("doc:a", "viewer", "team:eng#member")]
+    )
+
+    assert Relation("viewer", "doc:a", store)(alice)
+    assert not Relation("viewer", "doc:a", store)(bob)
+
+
+def test_incomplete_stores_cant_be_created():
+    class Incomplete(TupleStore):
+        def has_subject(self, obj, relation, subject):
+            return False
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_relation_requirement(store):
+    can_view = Relation("viewer", "document:readme", store)
+
+    assert can_view(alice)
+    assert not can_view(bob)
+    assert Engine().fulfill([can_view], alice)
+    assert repr(can_view) == "<Relation('viewer', 'document:readme')>"
+
+
+def test_relation_without_subject(store):
+    assert not Relation("viewer", "document:readme", store)(anonymous)
+
+
+def test_relation_uses_the_store_loader(store):
+    store.loader = lambda user: "user:{}".format(user.name)
+    User = namedtuple("User", ["name"])
+
+    assert Relation("viewer", "document:readme", store)(User("alice"))
+
+
+def test_relation_equality(store):
+    other = MemoryTupleStore()
+    can_view = Relation("viewer", "document:readme", store)
+
+    assert can_view == Relation("viewer", "document:readme", store)
+    assert hash(can_view) == hash(Relation("viewer", "document:readme", store))
+    assert can_view != Relation("editor", "document:readme", store)
+    assert can_view != Relation("viewer", "document:readme", other)
+
+
+def test_relations_can_be_overridden(store):
+    can_view = Relation("viewer", "document:readme", store)
+    overrides = Override(Relation("viewer", "document:readme", store))
+
+    assert Engine().fulfill([can_view], bob, overrides=overrides)
+
+
+def test_check_many(store):
+    checks = [
+        ("document:readme", "viewer"),
+        ("folder:docs", "editor"),
+        ("folder:guides", "viewer"),
+        ("document:missing", "viewer"),
+    ]
+
+    assert store.check_many(checks, "user:alice") == [True, False, True, False]
+    assert store.check_many(checks, "user:bob") == [False, True, False, False]
+
+
+def test_check_many_skips_exhausted_subject_sets():
+    expanded = []
+
+    class Recording(MemoryTupleStore):
+        def subject_sets(self, obj, relation):
+            expanded.append((obj, relation))
+            return super(Recording, self).subject_sets(obj, relation)
+
+    store = Recording()
+    store.write("folder:docs", "viewer", "team:eng#member")
+    for i in range(3):
+        store.write("document:{}".format(i), "viewer", "folder:docs#viewer")
+
+    checks = [("document:{}".format(i), "viewer") for i in range(3)]
+    assert store.check_many(checks, "user:bob") == [False] * 3
+    assert expanded.count(("folder:docs", "viewer")) == 1
+
+
+def test_relation_fulfill_batch(store):
+    other = MemoryTupleStore()
+    other.write("document:other", "viewer", "user:alice")
+    requirements = [
+        Relation("viewer", "document:readme", store),
+        Relation("viewer", "document:other", other),
+        Relation("editor", "folder:docs", store),
+        Relation("viewer", "document:readme", other),
+    ]
+
+    assert Relation.fulfill_batch(requirements, alice) == [True, True, False, False]
+    assert Relation.fulfill_batch(requirements, anonymous) == [False] * 4
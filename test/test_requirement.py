@@ -3,6 +3,7 @@ import operator
 import pytest
 
 from flask_allows.allows import Allows
+from flask_allows.engine import Engine
 from flask_allows.overrides import Override, OverrideManager
 from flask_allows.requirements import (
     And,
@@ -222,3 +223,42 @@ def test_conditional_skips_overridden_requirements_even_if_nested(
     assert reqs.fulfill(member, request)
 
     manager.pop()
+
+
+def test_ConditionalRequirement_is_slotted(always):
+    import weakref
+
+    cond = And(always)
+
+    assert not hasattr(cond, "__dict__")
+    assert weakref.ref(cond)() is cond
+
+
+def test_ConditionalRequirement_subclasses_may_add_attributes(always, member):
+    class Labelled(ConditionalRequirement):
+        def __init__(self, label, *requirements):
+            super(Labelled, self).__init__(*requirements, until=False)
+            self.label = label
+
+    cond = Labelled("members only", always)
+
+    assert cond.label == "members only"
+    assert cond.fulfill(member)
+
+
+def test_ConditionalRequirement_caches_follow_reassigned_attributes(
+    always, never, member
+):
+    cond = Or(never, And(never))
+    assert cond.shareable and hash(cond) == hash(Or(never, And(never)))
+    assert not Engine().fulfill([cond, cond], member)
+
+    cond.requirements = (always, And(always))
+    assert hash(cond) == hash(Or(always, And(always)))
+    assert Engine().fulfill([cond, cond], member)
+
+    cond.negated = True
+    assert hash(cond) == hash(
+        C(always, And(always), op=operator.or_, until=True, negated=True)
+    )
+    assert not Engine().fulfill([cond, cond], member)
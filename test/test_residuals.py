@@ -0,0 +1,237 @@
+import itertools
+from collections import namedtuple
+
+import pytest
+
+from flask_allows.additional import Additional
+from flask_allows.allows import Allows
+from flask_allows.engine import Engine
+from flask_allows.overrides import Override
+from flask_allows.requirements import And, C, Not, Or
+from flask_allows.residuals import Where, bind, partial_evaluate, to_sqlalchemy
+
+User = namedtuple("User", ["id", "permlevel"])
+Post = namedtuple("Post", ["id", "author_id", "public", "status"])
+
+member = User(1, 0)
+admin = User(2, 2)
+
+POSTS = [
+    Post(id, author_id, public, status)
+    for id, (author_id, public, status) in enumerate(
+        itertools.product([1, 2, 3], [True, False], ["draft", "published"])
+    )
+]
+# rows with NULL fields, which SQL doesn't compare like Python does
+POSTS += [
+    Post(len(POSTS) + id, author_id, public, status)
+    for id, (author_id, public, status) in enumerate(
+        [(None, True, "published"), (1, None, None), (3, False, None)]
+    )
+]
+
+
+def is_admin(user):
+    return user.permlevel >= 2
+
+
+def is_member(user):
+    return user.permlevel >= 0
+
+
+is_author = Where("author_id", "==", lambda user: user.id)
+is_public = Where("public", "==", True)
+is_published = Where("status", "in", ["published"])
+
+POLICIES = [
+    Or(is_admin, is_author),
+    Or(is_public, is_author),
+    And(is_member, Or(And(is_public, is_published), is_author)),
+    And(is_member, Not(is_author)),
+    Not(Or(is_admin, is_public)),
+    Or(Not(is_member), And(is_published, Where("author_id", "!=", 3))),
+    And(is_author, Where("id", ">=", 4), Where("id", "<", 9)),
+    Not(Where("status", "in", ["draft", None])),
+    Or(Where("author_id", "==", None), Where("public", "!=", None)),
+]
+
+
+def test_where_checks_bound_rows():
+    post = POSTS[0]
+
+    assert bind(is_author, post)(member)
+    assert not bind(is_author, post)(admin)
+    assert Where("id", "<=", 0).bind(post)(member)
+    assert not Where("id", ">", 0).bind(post)(member)
+
+
+def test_unbound_where_raises():
+    with pytest.raises(ValueError):
+        is_author(member)
+
+
+def test_rejects_unknown_operators():
+    with pytest.raises(ValueError):
+        Where("id", "~", 1)
+
+
+def test_where_equality_compares_rows():
+    assert bind(is_author, POSTS[0]) == bind(is_author, POSTS[0])
+    assert bind(is_author, POSTS[0]) != bind(is_author, POSTS[1])
+    assert is_author != bind(is_author, POSTS[0])
+    assert bind(is_author, POSTS[0]).unbind() == is_author
+    assert is_author.unbind() is is_author
+    assert is_author != Where("author_id", "!=", is_author.value)
+    assert repr(is_public) == "<Where('public', '==', True)>"
+
+
+def test_bind_rebuilds_conditionals():
+    policy = Or(is_admin, And(is_author, is_public))
+    bound = bind(policy, POSTS[0])
+
+    assert bound != policy and bound == bind(policy, POSTS[0])
+    assert bound.requirements[0] is is_admin
+    assert bound.requirements[1].requirements[0].row is POSTS[0]
+    assert bind(is_admin, POSTS[0]) is is_admin
+
+
+def test_decides_without_rows():
+    assert partial_evaluate([Or(is_admin, is_author)], admin) is True
+    assert partial_evaluate([And(is_admin, is_author)], member) is False
+    assert partial_evaluate([Not(Or(is_member, is_author))], member) is False
+    assert partial_evaluate([], member) is True
+    assert partial_evaluate([Not()], member) is True
+
+
+def test_leaves_residuals_about_rows():
+    residual = partial_evaluate([Or(is_admin, is_author)], member)
+
+    assert residual == Where("author_id", "==", 1)
+    assert partial_evaluate([is_member, is_public, is_author], member) == And(
+        is_public, Where("author_id", "==", 1)
+    )
+    assert partial_evaluate([Not(And(is_member, is_public))], member) == Not(is_public)
+
+
+def test_residuals_match_checking_each_row():
+    engine = Engine()
+
+    for policy, user in itertools.product(POLICIES, [member, admin]):
+        residual = partial_evaluate([policy], user)
+
+        for post in POSTS:
+            expected = engine.fulfill([bind(policy, post)], user)
+            if isinstance(residual, bool):
+                assert residual is expected
+            else:
+                assert engine.fulfill([bind(residual, post)], user) is expected
+
+
+def test_overrides_and_additional():
+    overrides = Override(is_author)
+    additional = Additional(is_public)
+
+    assert partial_evaluate([is_author], member, overrides=overrides) is True
+    assert partial_evaluate(
+        [Or(is_admin, is_author)], member, Override(is_admin)
+    ) == Where("author_id", "==", 1)
+    assert partial_evaluate([Not(is_admin)], member, Override(is_admin)) is True
+    assert (
+        partial_evaluate([is_admin], admin, overrides=overrides, additional=additional)
+        == is_public
+    )
+
+
+def test_overridden_residuals_match_checking_each_row():
+    engine = Engine()
+    overrides = [Override(is_admin), Override(is_author), Override(is_member)]
+
+    for policy, user, override in itertools.product(
+        POLICIES, [member, admin], overrides
+    ):
+        residual = partial_evaluate([policy], user, override)
+
+        for post in POSTS:
+            expected = engine.fulfill([bind(policy, post)], user, override)
+            if isinstance(residual, bool):
+                assert residual is expected
+            else:
+                assert engine.fulfill([bind(residual, post)], user) is expected
+
+
+def test_copies_bound_to_other_rows_are_not_shared():
+    mine, theirs = POSTS[0], POSTS[4]
+    engine = Engine()
+
+    assert engine.fulfill([Or(bind(is_author, mine))], member)
+    assert not engine.fulfill([Or(bind(is_author, theirs))], member)
+    assert not engine.fulfill(
+        [Or(bind(is_author, mine)), Or(bind(is_author, theirs))], member
+    )
+
+
+def test_bound_copies_are_overridden_with_the_unbound_requirement():
+    overrides = Override(is_author)
+
+    assert bind(is_author, POSTS[0]) in overrides
+    assert Engine().fulfill([bind(is_author, POSTS[5])], member, overrides)
+    assert bind(is_author, POSTS[0]) not in Override(bind(is_author, POSTS[1]))
+
+
+def test_rejects_other_reductions_about_rows():
+    with pytest.raises(ValueError):
+        partial_evaluate([C(is_author, is_public, op=lambda a, b: a != b)], member)
+
+    assert partial_evaluate([C(is_member, op=lambda a, b: a != b)], member) is True
+
+
+def test_allows_partial(app):
+    allows = Allows(app, identity_loader=lambda: member)
+
+    with app.test_request_context("/"):
+        assert allows.partial([Or(is_admin, is_author)], identity=admin) is True
+        assert allows.partial([Or(is_admin, is_author)]) == Where("author_id", "==", 1)
+
+        with allows.additional.additional(Additional(is_public)):
+            assert allows.partial([]) == is_public
+
+        with allows.overrides.override(Override(is_author)):
+            assert allows.partial([is_author]) is True
+
+
+@pytest.fixture
+def posts_table():
+    sqlalchemy = pytest.importorskip("sqlalchemy")
+
+    metadata = sqlalchemy.MetaData()
+    posts = sqlalchemy.Table(
+        "posts",
+        metadata,
+        sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True),
+        sqlalchemy.Column("author_id", sqlalchemy.Integer),
+        sqlalchemy.Column("public", sqlalchemy.Boolean),
+        sqlalchemy.Column("status", sqlalchemy.String),
+    )
+    engine = sqlalchemy.create_engine("sqlite://")
+    metadata.create_all(engine)
+
+    with engine.begin() as connection:
+        connection.execute(posts.insert(), [p._asdict() for p in POSTS])
+
+    yield engine, posts
+    engine.dispose()
+
+
+def test_sqlalchemy_filters_match_checking_each_row(posts_table):
+    engine, posts = posts_table
+    checks = Engine()
+
+    for policy, user in itertools.product(POLICIES, [member, admin]):
+        residual = partial_evaluate([policy], user)
+        query = posts.select().where(to_sqlalchemy(residual, posts.c))
+
+        with engine.connect() as connection:
+            allowed = {row.id for row in connection.execute(query)}
+
+        expected = {p.id for p in POSTS if checks.fulfill([bind(policy, p)], user)}
+        assert allowed == expected, policy
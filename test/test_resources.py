@@ -0,0 +1,236 @@
+import random
+import threading
+from collections import namedtuple
+
+import pytest
+
+from flask_allows.engine import Engine
+from flask_allows.resources import CanAccess, ResourceIndex
+
+Principal = namedtuple("Principal", ["groups"])
+
+
+@pytest.fixture
+def index():
+    index = ResourceIndex()
+    # root
+    # |- specs
+    # |  |- drafts
+    # |  |  `- doc:1
+    # |  `- doc:2
+    # `- doc:3
+    index.add("root")
+    index.add("specs", parent="root")
+    index.add("drafts", parent="specs")
+    index.add("doc:1", parent="drafts")
+    index.add("doc:2", parent="specs")
+    index.add("doc:3", parent="root")
+    return index
+
+
+def test_sharing_a_resource_shares_its_subtree(index):
+    index.share("eng", "specs")
+
+    assert index.accessible(["eng"], "specs")
+    assert index.accessible(["eng"], "doc:1")
+    assert index.accessible(["eng"], "doc:2")
+    assert not index.accessible(["eng"], "root")
+    assert not index.accessible(["eng"], "doc:3")
+    assert not index.accessible(["sales"], "doc:1")
+    assert not index.accessible(["eng"], "missing")
+
+
+def test_checks_any_group(index):
+    index.share("eng", "drafts")
+    index.share("sales", "doc:3")
+
+    assert index.accessible(["sales", "eng"], "doc:1")
+    assert index.accessible(["sales", "eng"], "doc:3")
+    assert not index.accessible(["sales", "eng"], "doc:2")
+    assert not index.accessible([], "doc:1")
+
+
+def test_identifiers_that_share_digits_are_distinct():
+    index = ResourceIndex()
+    for i in range(12):
+        index.add(i)
+    index.add("child", parent=1)
+    index.add("other", parent=10)
+    index.share("eng", 1)
+
+    assert index.accessible(["eng"], "child")
+    assert not index.accessible(["eng"], 10)
+    assert not index.accessible(["eng"], "other")
+
+
+def test_unshare_keeps_nested_shares(index):
+    index.share("eng", "specs")
+    index.share("eng", "drafts")
+    index.unshare("eng", "specs")
+
+    assert index.accessible(["eng"], "doc:1")
+    assert not index.accessible(["eng"], "doc:2")
+
+    index.unshare("eng", "drafts")
+    index.unshare("eng", "drafts")
+    index.unshare("sales", "drafts")
+
+    assert not index.accessible(["eng"], "doc:1")
+
+
+def test_matches_walking_ancestors():
+    rng = random.Random(42)
+    index = ResourceIndex()
+    parents = {}
+    shares = {"eng": set(), "sales": set()}
+
+    for i in range(200):
+        parent = rng.choice([None] + list(parents))
+        index.add(i, parent=parent)
+        parents[i] = parent
+
+    for _ in range(500):
+        group, resource = rng.choice(list(shares)), rng.randrange(200)
+        if rng.random() < 0.6:
+            index.share(group, resource)
+            shares[group].add(resource)
+        else:
+            index.unshare(group, resource)
+            shares[group].discard(resource)
+
+    def walked(group, resource):
+        while resource is not None:
+            if resource in shares[group]:
+                return True
+            resource = parents[resource]
+        return False
+
+    for group in shares:
+        for resource in parents:
+            assert index.accessible([group], resource) == walked(group, resource)
+
+
+def test_share_requires_known_resources(index):
+    with pytest.raises(KeyError):
+        index.share("eng", "missing")
+
+
+def test_add_rejects_duplicates(index):
+    with pytest.raises(ValueError):
+        index.add("specs")
+
+    with pytest.raises(KeyError):
+        index.add("doc:4", parent="missing")
+
+
+def test_added_resources_inherit_access(index):
+    index.share("eng", "drafts")
+    index.add("doc:4", parent="drafts")
+
+    assert index.accessible(["eng"], "doc:4")
+
+
+def test_remove_drops_the_subtree_and_its_shares(index):
+    index.share("eng", "drafts")
+    index.share("sales", "doc:2")
+    index.remove("specs")
+
+    assert len(index) == 2
+    assert not index.accessible(["eng"], "doc:1")
+    assert not index.accessible(["sales"], "doc:2")
+
+    index.add("drafts", parent="root")
+    assert not index.accessible(["eng"], "drafts")
+
+
+def test_move_carries_access(index):
+    index.share("eng", "specs")
+    index.share("sales", "drafts")
+    index.move("drafts", "doc:3")
+
+    assert not index.accessible(["eng"], "doc:1")
+    assert index.accessible(["sales"], "doc:1")
+    assert index.accessible(["eng"], "doc:2")
+
+    index.move("drafts", None)
+    index.share("eng", "root")
+    assert not index.accessible(["eng"], "doc:1")
+    assert index.accessible(["sales"], "doc:1")
+
+
+def test_move_rejects_moving_beneath_itself(index):
+    with pytest.raises(ValueError):
+        index.move("specs", "doc:1")
+
+    with pytest.raises(ValueError):
+        index.move("specs", "specs")
+
+
+def test_checks_during_moves_see_a_whole_index(index):
+    index.share("eng", "specs")
+    stop = threading.Event()
+    seen = []
+
+    def check():
+        while not stop.is_set():
+            # drafts and its document are always moved together
+            seen.append(
+                (
+                    index.accessible(["eng"], "drafts"),
+                    index.accessible(["eng"], "doc:1"),
+                )
+            )
+
+    thread = threading.Thread(target=check)
+    thread.start()
+    try:
+        for _ in range(200):
+            index.move("drafts", "doc:3")
+            index.move("drafts", "specs")
+    finally:
+        stop.set()
+        thread.join()
+
+    assert seen
+    assert all(drafts == doc for drafts, doc in seen)
+
+
+def test_can_access(index):
+    index.share("eng", "specs")
+    can_read = CanAccess("doc:1", index)
+
+    assert can_read(Principal(["eng"]))
+    assert not can_read(Principal(["sales"]))
+    assert Engine().fulfill([can_read], Principal(["eng"]))
+    assert repr(can_read) == "<CanAccess('doc:1')>"
+
+
+def test_can_access_uses_the_index_loader(index):
+    index.share("eng", "specs")
+    index.loader = lambda user: [user.team]
+    User = namedtuple("User", ["team"])
+
+    assert CanAccess("doc:2", index)(User("eng"))
+
+
+def test_can_access_equality(index):
+    can_read = CanAccess("doc:1", index)
+
+    assert can_read == CanAccess("doc:1", index)
+    assert hash(can_read) == hash(CanAccess("doc:1", index))
+    assert can_read != CanAccess("doc:2", index)
+    assert can_read != CanAccess("doc:1", ResourceIndex())
+
+
+def test_can_access_fulfill_batch(index):
+    loaded = []
+    index.share("eng", "specs")
+    index.loader = lambda user: loaded.append(user) or user.groups
+    requirements = [CanAccess(r, index) for r in ["doc:1", "doc:3", "doc:2"]]
+
+    assert CanAccess.fulfill_batch(requirements, Principal(["eng"])) == [
+        True,
+        False,
+        True,
+    ]
+    assert len(loaded) == 1
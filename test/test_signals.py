@@ -0,0 +1,142 @@
+import gc
+import sys
+
+import pytest
+from werkzeug.exceptions import Forbidden
+
+from flask_allows import engine
+from flask_allows.allows import Allows
+from flask_allows.overrides import Override
+from flask_allows.requirements import And, Or
+from flask_allows.signals import (
+    fulfill_finished,
+    requirement_evaluated,
+    requirement_overridden,
+    run_finished,
+)
+
+
+class Recorder(object):
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, sender, **kwargs):
+        self.calls.append((sender, kwargs))
+
+
+@pytest.fixture
+def recorder():
+    return Recorder()
+
+
+def test_requirement_evaluated_sent(member, always, recorder):
+    allows = Allows(identity_loader=lambda: member)
+
+    with requirement_evaluated.connected_to(recorder):
+        allows.fulfill([always])
+
+    [(sender, kwargs)] = recorder.calls
+    assert sender is always
+    assert kwargs["user"] is member and kwargs["result"] is True
+    assert kwargs["elapsed"] >= 0 and kwargs["error"] is None
+    assert kwargs["endpoint"] is None
+
+
+def test_requirement_evaluated_sent_for_nested_requirements(
+    member, always, never, recorder
+):
+    allows = Allows(identity_loader=lambda: member)
+    outer = Or(And(always, never), always)
+
+    with requirement_evaluated.connected_to(recorder):
+        assert allows.fulfill([outer])
+
+    # always is evaluated once per check, however many times it appears
+    senders = [sender for sender, _ in recorder.calls]
+    assert senders == [always, never, outer.requirements[0], outer]
+
+
+def test_requirement_evaluated_sent_on_error(member, recorder):
+    allows = Allows(identity_loader=lambda: member)
+
+    def broken(user):
+        raise ValueError("nope")
+
+    with requirement_evaluated.connected_to(recorder):
+        with pytest.raises(ValueError):
+            allows.fulfill([broken])
+
+    [(sender, kwargs)] = recorder.calls
+    assert sender is broken and isinstance(kwargs["error"], ValueError)
+    assert kwargs["result"] is None
+
+
+def test_requirement_evaluated_includes_endpoint(app, member, always, recorder):
+    allows = Allows(app, identity_loader=lambda: member)
+
+    @app.route("/")
+    def index():
+        return str(allows.fulfill([always]))
+
+    with requirement_evaluated.connected_to(recorder):
+        app.test_client().get("/")
+
+    assert recorder.calls[0][1]["endpoint"] == "index"
+
+
+def test_requirement_overridden_sent(member, always, never, recorder):
+    allows = Allows(identity_loader=lambda: member)
+    allows.overrides.push(Override(never))
+
+    with requirement_overridden.connected_to(recorder):
+        assert allows.fulfill([always, never, And(never)])
+
+    assert [sender for sender, _ in recorder.calls] == [never, never]
+    allows.overrides.pop()
+
+
+def test_fulfill_finished_sent(member, never, recorder):
+    allows = Allows(identity_loader=lambda: member)
+
+    with fulfill_finished.connected_to(recorder, sender=allows):
+        allows.fulfill([never])
+
+    [(sender, kwargs)] = recorder.calls
+    assert sender is allows and kwargs["requirements"] == [never]
+    assert kwargs["identity"] is member and kwargs["result"] is False
+    assert kwargs["elapsed"] >= 0
+
+
+def test_run_finished_sent_before_raising(member, never, recorder):
+    allows = Allows(identity_loader=lambda: member)
+
+    with run_finished.connected_to(recorder, sender=allows):
+        with pytest.raises(Forbidden):
+            allows.run([never])
+
+    [(sender, kwargs)] = recorder.calls
+    assert kwargs["result"] is False and kwargs["identity"] is member
+
+
+def test_run_finished_returns_on_fail_result(member, never, recorder):
+    allows = Allows(identity_loader=lambda: member, on_fail="failed")
+
+    with run_finished.connected_to(recorder, sender=allows):
+        assert allows.run([never]) == "failed"
+
+    assert len(recorder.calls) == 1
+
+
+def test_no_timing_without_receivers(member, always, monkeypatch):
+    def fail():
+        raise AssertionError("clock should not be read")
+
+    # receivers of components created by earlier tests may be waiting on the
+    # garbage collector to be disconnected
+    gc.collect()
+    monkeypatch.setattr(sys.modules[Allows.__module__], "perf_counter_ns", fail)
+    monkeypatch.setattr(engine, "perf_counter_ns", fail)
+    allows = Allows(identity_loader=lambda: member)
+
+    assert allows.fulfill([always, And(always)])
+    assert allows.run([always]) is None
@@ -0,0 +1,171 @@
+import threading
+
+import pytest
+
+from flask_allows.allows import Allows
+from flask_allows.singleflight import SingleFlight
+
+
+class Gate(object):
+    "Requirement that blocks until released and counts its calls"
+
+    def __init__(self, result=True, error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, user):
+        self.calls += 1
+        self.entered.set()
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def _check_concurrently(allows, requirement, identities):
+    results = [None] * len(identities)
+
+    def check(index, identity):
+        try:
+            results[index] = allows.fulfill([requirement], identity=identity)
+        except Exception as e:
+            results[index] = e
+
+    threads = [
+        threading.Thread(target=check, args=(i, ident))
+        for i, ident in enumerate(identities)
+    ]
+    threads[0].start()
+    requirement.requirement.entered.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+
+    return threads, results
+
+
+def _finish(requirement, threads):
+    # give the followers time to start waiting on the leader
+    threading.Event().wait(0.05)
+    requirement.requirement.release.set()
+    for thread in threads:
+        thread.join(5)
+
+
+def test_concurrent_checks_share_one_evaluation(member):
+    gate = Gate()
+    requirement = SingleFlight(gate, key=lambda user: user.name)
+    allows = Allows()
+
+    threads, results = _check_concurrently(allows, requirement, [member] * 8)
+    _finish(requirement, threads)
+
+    assert results == [True] * 8
+    assert gate.calls == 1
+
+
+def test_wrappers_of_equal_requirements_share_evaluations(member):
+    gate = Gate()
+    allows = Allows()
+    results = []
+
+    def check():
+        requirement = SingleFlight(gate, key=lambda user: user.name)
+        results.append(allows.fulfill([requirement], identity=member))
+
+    threads = [threading.Thread(target=check) for _ in range(4)]
+    threads[0].start()
+    gate.entered.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    threading.Event().wait(0.05)
+    gate.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == [True] * 4
+    assert gate.calls == 1
+
+
+def test_other_requirements_are_evaluated_separately(member):
+    first, second = Gate(), Gate()
+    first.release.set()
+    second.release.set()
+    allows = Allows()
+
+    assert allows.fulfill([SingleFlight(first)], identity=member)
+    assert allows.fulfill([SingleFlight(second)], identity=member)
+    assert first.calls == second.calls == 1
+
+
+def test_different_keys_are_evaluated_separately(member, guest):
+    gate = Gate()
+    gate.release.set()
+    requirement = SingleFlight(gate, key=lambda user: user.name)
+    allows = Allows()
+
+    assert allows.fulfill([requirement], identity=member)
+    assert allows.fulfill([requirement], identity=guest)
+    assert allows.fulfill([requirement], identity=member)
+    assert gate.calls == 3
+
+
+def test_errors_are_shared_with_waiting_checks(member):
+    gate = Gate(error=IOError("down"))
+    requirement = SingleFlight(gate, key=lambda user: user.name)
+    allows = Allows()
+
+    threads, results = _check_concurrently(allows, requirement, [member] * 4)
+    _finish(requirement, threads)
+
+    assert all(isinstance(r, IOError) for r in results)
+    assert gate.calls == 1
+
+
+def test_base_exceptions_are_shared_with_waiting_checks(member):
+    class Interrupted(BaseException):
+        pass
+
+    gate = Gate(error=Interrupted())
+    requirement = SingleFlight(gate, key=lambda user: user.name)
+    allows = Allows()
+    results = [None] * 4
+
+    def check(index):
+        try:
+            results[index] = allows.fulfill([requirement], identity=member)
+        except Interrupted as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=check, args=(i,)) for i in range(4)]
+    threads[0].start()
+    gate.entered.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    _finish(requirement, threads)
+
+    assert all(isinstance(r, Interrupted) for r in results)
+    assert gate.calls == 1
+
+
+def test_in_flight_calls_are_cleared(member):
+    gate = Gate(error=IOError("down"))
+    gate.release.set()
+    requirement = SingleFlight(gate)
+
+    with pytest.raises(IOError):
+        Allows().fulfill([requirement], identity=member)
+
+    assert requirement._in_flight == {}
+
+
+def test_single_flight_trace_annotation(member):
+    gate = Gate()
+    gate.release.set()
+    allows = Allows()
+
+    trace = allows.explain([SingleFlight(gate)], identity=member)
+
+    assert trace.nodes[0].annotations == {"coalesced": False}
@@ -0,0 +1,114 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from flask import has_app_context, has_request_context
+
+from flask_allows.allows import Allows
+from flask_allows.overrides import Override
+from flask_allows.requirements import And
+from flask_allows.signals import requirement_timed_out
+from flask_allows.timeouts import Timeout
+
+
+@pytest.fixture
+def executor():
+    pool = ThreadPoolExecutor(2)
+    yield pool
+    pool.shutdown(wait=False)
+
+
+def fast(user):
+    return True
+
+
+def test_timeout_returns_requirement_result(member, executor):
+    allows = Allows(identity_loader=lambda: member)
+
+    assert allows.fulfill([Timeout(fast, 1, executor=executor)])
+    assert not allows.fulfill([Timeout(lambda u: False, 1, executor=executor)])
+
+
+def test_timeout_falls_back_to_deny(member, executor):
+    allows = Allows(identity_loader=lambda: member)
+    release = threading.Event()
+
+    def hangs(user):
+        release.wait(5)
+        return True
+
+    start = time.time()
+    result = allows.fulfill([Timeout(hangs, 0.01, executor=executor)])
+    release.set()
+
+    assert result is False and time.time() - start < 1
+
+
+def test_timeout_configurable_fallback_and_signal(member, executor):
+    allows = Allows(identity_loader=lambda: member)
+    release = threading.Event()
+    sent = []
+
+    def hangs(user):
+        release.wait(5)
+        return False
+
+    def receiver(sender, **kwargs):
+        sent.append((sender, kwargs))
+
+    with requirement_timed_out.connected_to(receiver):
+        assert allows.fulfill([Timeout(hangs, 0.01, fallback=True, executor=executor)])
+    release.set()
+
+    [(sender, kwargs)] = sent
+    assert sender is hangs and kwargs["timeout"] == 0.01 and kwargs["fallback"]
+
+
+def test_timeout_logs_when_tripped(member, executor, caplog):
+    allows = Allows(identity_loader=lambda: member)
+    release = threading.Event()
+
+    def hangs(user):
+        release.wait(5)
+
+    allows.fulfill([Timeout(hangs, 0.01, executor=executor)])
+    release.set()
+
+    assert "timed out after 0.01s" in caplog.text
+
+
+def test_timeout_pushes_override_contexts_only(app, member, never, executor):
+    allows = Allows(app, identity_loader=lambda: member)
+    seen = {}
+    teardowns = []
+
+    @app.teardown_request
+    def teardown_request(exc):
+        teardowns.append("request")
+
+    @app.teardown_appcontext
+    def teardown_appcontext(exc):
+        teardowns.append("app")
+
+    def inspects(user):
+        seen["request"] = has_request_context()
+        seen["app"] = has_app_context()
+        return True
+
+    @app.route("/")
+    def index():
+        allows.overrides.current.add(never)
+        return str(
+            allows.fulfill([Timeout(And(inspects, never), 1, executor=executor)])
+        )
+
+    assert app.test_client().get("/").data == b"True"
+    assert seen == {"request": False, "app": False}
+    assert teardowns == ["request", "app"]
+
+
+def test_timeout_equality():
+    assert Timeout(fast, 1) == Timeout(fast, 1)
+    assert Timeout(fast, 1) != Timeout(fast, 2)
+    assert Timeout(fast, 1) in Override(Timeout(fast, 1))
@@ -0,0 +1,167 @@
+import pytest
+
+from flask_allows.additional import Additional
+from flask_allows.allows import Allows
+from flask_allows.overrides import Override
+from flask_allows.requirements import And, Not, Or
+from flask_allows.signals import check_traced
+
+
+def a(user):
+    return True
+
+
+def b(user):
+    return False
+
+
+def c(user):
+    return True
+
+
+def broken(user):
+    raise ValueError("broken")
+
+
+def test_explain_records_tree(member):
+    allows = Allows(identity_loader=lambda: member)
+    requirement = Or(And(a, b), Not(c))
+
+    trace = allows.explain([requirement])
+
+    assert not trace and trace.result is False and trace.identity is member
+    [root] = trace.nodes
+    assert root.requirement is requirement and root.result is False
+    conj, neg = root.children
+    assert [n.result for n in conj.children] == [True, False]
+    assert conj.children[1].short_circuited
+    assert neg.result is False and neg.children[0].result is True
+    assert root.elapsed >= conj.elapsed + neg.elapsed
+
+
+def test_explain_causes_finds_responsible_leaves(member):
+    allows = Allows(identity_loader=lambda: member)
+
+    trace = allows.explain([Or(And(a, b), Not(c))])
+
+    assert [n.requirement for n in trace.causes()] == [b, c]
+
+
+def test_explain_records_skipped_requirements(member):
+    allows = Allows(identity_loader=lambda: member)
+
+    trace = allows.explain([Or(a, b), b, c])
+
+    assert [n.status for n in trace.nodes] == ["allow", "deny", "skipped"]
+    assert [n.status for n in trace.nodes[0].children] == ["allow", "skipped"]
+    assert trace.nodes[0].children[0].short_circuited
+
+
+def test_explain_records_overridden_and_additional(member):
+    allows = Allows(identity_loader=lambda: member)
+    allows.overrides.push(Override(b))
+    allows.additional.push(Additional(c))
+
+    trace = allows.explain([And(a, b)])
+
+    assert trace.result is True
+    added, root = trace.nodes
+    assert added.requirement is c and added.additional
+    assert [n.status for n in root.children] == ["allow", "overridden"]
+
+    allows.additional.pop()
+    allows.overrides.pop()
+
+
+def test_explain_records_errors(member):
+    allows = Allows(identity_loader=lambda: member)
+
+    trace = allows.explain([a, And(a, broken)])
+
+    assert trace.result is None and isinstance(trace.error, ValueError)
+    assert [n.status for n in trace.nodes] == ["allow", "error"]
+    assert [n.requirement for n in trace.causes()] == [broken]
+
+
+def test_explain_matches_fulfill(member, guest, ismember, isauthed):
+    allows = Allows()
+    requirements = [Or(Not(isauthed), ismember), And(ismember, Not(b))]
+
+    for user in [member, guest]:
+        expected = allows.fulfill(requirements, identity=user)
+        assert allows.explain(requirements, identity=user).result == expected
+
+
+def test_trace_format_and_dict(member):
+    allows = Allows(identity_loader=lambda: member)
+
+    trace = allows.explain([Not(c)])
+
+    lines = trace.format().splitlines()
+    assert lines[0].startswith("DENY (")
+    assert lines[1].startswith("  DENY Not({}.c)".format(__name__))
+    assert lines[2].startswith("    ALLOW {}.c".format(__name__))
+
+    as_dict = trace.to_dict()
+    assert as_dict["result"] is False
+    assert as_dict["nodes"][0]["children"][0]["status"] == "allow"
+
+
+def test_trace_request_collects_checks(app, member):
+    allows = Allows(app, identity_loader=lambda: member)
+
+    with app.app_context():
+        assert allows.current_traces is None
+        allows.trace_request()
+        assert allows.fulfill([a])
+        assert not allows.fulfill([Or(b)])
+        traces = allows.current_traces
+
+    assert [t.result for t in traces] == [True, False]
+
+
+def test_tracing_stops_with_the_traced_context(app, member):
+    allows = Allows(app, identity_loader=lambda: member)
+
+    with app.app_context():
+        allows.trace_request()
+        assert allows.fulfill([a])
+        allows.trace_request()
+        assert allows._tracing == 1
+        assert len(allows.current_traces) == 1
+
+    assert allows._tracing == 0
+    with app.app_context():
+        assert allows.fulfill([a])
+        assert allows.current_traces is None
+
+
+def test_traced_requests_raise_errors(app, member):
+    allows = Allows(app, identity_loader=lambda: member)
+
+    with app.app_context():
+        allows.trace_request()
+        with pytest.raises(ValueError):
+            allows.fulfill([broken])
+
+        assert allows.current_traces[0].error is not None
+
+
+def test_sampled_requests_send_check_traced(app, member):
+    allows = Allows(app, identity_loader=lambda: member, trace_sample_rate=1)
+    received = []
+
+    @app.route("/")
+    @allows.requires(a, Not(b))
+    def index():
+        return "hello"
+
+    def receiver(sender, trace):
+        received.append(trace)
+
+    with check_traced.connected_to(receiver, sender=allows):
+        app.test_client().get("/")
+
+    [trace] = received
+    assert trace.result is True and trace.endpoint == "index"
+    assert [n.requirement for n in trace.nodes] == [a, Not(b)]
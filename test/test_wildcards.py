@@ -0,0 +1,172 @@
+import itertools
+import random
+from collections import namedtuple
+
+import pytest
+
+from flask_allows.engine import Engine
+from flask_allows.wildcards import (
+    PermissionTrie,
+    Permits,
+    WildcardRegistry,
+    wildcard_permissions,
+)
+
+User = namedtuple("User", ["permissions"])
+
+
+def implied_by(grant, permission):
+    "Reference matcher comparing a grant to a permission part by part"
+    grant, permission = grant.split(":"), permission.split(":")
+
+    for i, part in enumerate(permission):
+        if i >= len(grant):
+            return True
+        if grant[i] != "*" and part not in grant[i].split(","):
+            return False
+
+    return all(part == "*" for part in grant[len(permission) :])
+
+
+@pytest.mark.parametrize(
+    "grants, permission, expected",
+    [
+        (["project:42:issues:edit"], "project:42:issues:edit", True),
+        (["project:42:issues:edit"], "project:42:issues:view", False),
+        (["project:*:issues:*"], "project:42:issues:edit", True),
+        (["project:*:issues:*"], "project:42:wiki:edit", False),
+        (["project:42"], "project:42:issues:edit", True),
+        (["project:42:issues"], "project:42", False),
+        (["project:42:*:*"], "project:42", True),
+        (["project:42,43:issues"], "project:43:issues:edit", True),
+        (["project:42,43:issues"], "project:44:issues:edit", False),
+        (["*"], "anything:at:all", True),
+        (["project:42:issues:edit"], "project:*", False),
+        (["project:*"], "project:*", True),
+        ([], "project", False),
+    ],
+)
+def test_implies(grants, permission, expected):
+    assert PermissionTrie(grants).implies(permission) is expected
+
+
+def test_wildcards_and_literals_combine():
+    trie = PermissionTrie(["project:*:issues:view", "project:42:issues:edit"])
+
+    assert trie.implies("project:42:issues:view")
+    assert trie.implies("project:42:issues:edit")
+    assert trie.implies("project:7:issues:view")
+    assert not trie.implies("project:7:issues:edit")
+
+
+def test_matches_reference_implementation():
+    rng = random.Random(42)
+    values = ["a", "b", "c"]
+
+    def part():
+        choice = rng.random()
+        if choice < 0.3:
+            return "*"
+        if choice < 0.45:
+            return ",".join(rng.sample(values, 2))
+        return rng.choice(values)
+
+    for _ in range(200):
+        grants = [
+            ":".join(part() for _ in range(rng.randint(1, 4)))
+            for _ in range(rng.randint(1, 6))
+        ]
+        trie = PermissionTrie(grants)
+
+        for length in range(1, 5):
+            for parts in itertools.product(values, repeat=length):
+                permission = ":".join(parts)
+                expected = any(implied_by(g, permission) for g in grants)
+                assert trie.implies(permission) is expected, (grants, permission)
+
+
+@pytest.mark.parametrize("grant", ["", "a::b", "a:b,", ":a"])
+def test_rejects_empty_parts(grant):
+    with pytest.raises(ValueError):
+        PermissionTrie([grant])
+
+    with pytest.raises(ValueError):
+        Permits(grant)
+
+
+def test_registry_caches_tries_by_grants():
+    registry = WildcardRegistry()
+
+    first = registry.trie(User(["project:42"]))
+    assert registry.trie(User(("project:42",))) is first
+    assert registry.trie(User(["project:43"])) is not first
+
+
+def test_registry_cache_is_bounded():
+    registry = WildcardRegistry(cache_size=2)
+
+    for i in range(5):
+        registry.trie(User(["project:{}".format(i)]))
+
+    assert len(registry._cache) <= 2
+    assert len(registry._identities) <= 2
+
+
+def test_registry_caches_tries_by_identity():
+    class Grants(list):
+        hashed = 0
+
+        def __iter__(self):
+            Grants.hashed += 1
+            return super(Grants, self).__iter__()
+
+    registry = WildcardRegistry()
+    user = User(Grants(["project:42"]))
+
+    first = registry.trie(user)
+    assert registry.trie(user) is first
+    assert Grants.hashed == 1
+
+    replaced = user._replace(permissions=["project:43"])
+    assert not registry.trie(replaced).implies("project:42")
+
+
+def test_registry_accepts_compiled_tries():
+    trie = PermissionTrie(["project:42"])
+    registry = WildcardRegistry(loader=lambda user: trie)
+
+    assert registry.trie(User(None)) is trie
+    assert registry._cache == {}
+
+
+def test_permits():
+    requirement = Permits("project:42:issues:edit")
+
+    assert requirement.registry is wildcard_permissions
+    assert requirement(User(["project:*:issues:*"]))
+    assert not requirement(User(["project:7"]))
+    assert Engine().fulfill([requirement], User(["project:42"]))
+    assert repr(requirement) == "<Permits('project:42:issues:edit')>"
+
+
+def test_permits_requires_every_listed_value():
+    requirement = Permits("project:42:issues:view,edit")
+
+    assert requirement(User(["project:42:issues:view,edit"]))
+    assert not requirement(User(["project:42:issues:view"]))
+
+
+def test_permits_uses_its_registry():
+    registry = WildcardRegistry(attribute="grants")
+    Grantee = namedtuple("Grantee", ["grants"])
+
+    assert Permits("a:b", registry=registry)(Grantee(["a"]))
+
+
+def test_permits_equality():
+    registry = WildcardRegistry()
+
+    assert Permits("a:b") == Permits("a:b")
+    assert hash(Permits("a:b")) == hash(Permits("a:b"))
+    assert Permits("a:b") != Permits("a:c")
+    assert Permits("a:b") != Permits("a:b", registry=registry)